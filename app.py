@@ -1,32 +1,92 @@
-import streamlit as st
-import pandas as pd
+import csv
 import os
+import streamlit as st
+from datetime import datetime
+from resibo_parser import CATEGORY_KEYWORDS
+from resibo_storage import SQLiteExpenseStore
+
+# Where the CSV version of this app kept its history, and the file that
+# marks it as copied into the store
+LEGACY_CSV = "expenses.csv"
+IMPORTED_MARKER = LEGACY_CSV + ".imported"
+HISTORY_ROWS = 100
+# This app's old categories under resibo_app's names, since both apps share
+# one ledger and its totals, rankings and duplicate checks
+LEGACY_CATEGORIES = {
+    "Food": "Food & Dining",
+    "Transport": "Transport",
+    "Bills": "Bills & Utilities",
+    "Fun": "Entertainment",
+}
 
 # 1. Setup the Title
 st.title("📊 Resibo: My Expense Tracker")
 
-# 2. The "Brain" Logic (CSV Storage)
-DATA_FILE = "expenses.csv"
+# 2. The "Brain" Logic (shared SQLite storage)
+def resibo_category(category):
+    """resibo_app's name for a category of the CSV history; anything unknown is Miscellaneous"""
+    if category in CATEGORY_KEYWORDS:
+        return category
+    return LEGACY_CATEGORIES.get(category, 'Miscellaneous')
+
+def import_legacy_csv(store):
+    """Copy the expenses.csv history into the store once, and return how many rows came over"""
+    if not os.path.exists(LEGACY_CSV):
+        return 0
+    try:
+        # Claiming the marker first means two processes can't both import
+        open(IMPORTED_MARKER, 'x').close()
+    except FileExistsError:
+        return 0
+    try:
+        expenses = []
+        with open(LEGACY_CSV, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                try:
+                    when = datetime.fromisoformat(row['Date'])
+                    amount = float(row['Amount'])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                expenses.append({
+                    'amount': amount,
+                    'item': row.get('Note') or '',
+                    'category': resibo_category(row.get('Category')),
+                    'timestamp': when.strftime("%Y-%m-%d %H:%M:%S")
+                })
+        if expenses:
+            store.add_many(expenses)
+    except BaseException:
+        os.remove(IMPORTED_MARKER)
+        raise
+    return len(expenses)
+
+@st.cache_resource
+def get_store():
+    store = SQLiteExpenseStore()
+    import_legacy_csv(store)
+    return store
 
-# Check if the file exists, if not, create a blank one
-if not os.path.exists(DATA_FILE):
-    df = pd.DataFrame(columns=["Date", "Category", "Amount", "Note"])
-    df.to_csv(DATA_FILE, index=False)
+store = get_store()
 
 # 3. Simple Form to Add Data
 with st.form("add_expense"):
     date = st.date_input("When?")
-    cat = st.selectbox("Category", ["Food", "Transport", "Bills", "Fun"])
+    cat = st.selectbox("Category", list(LEGACY_CATEGORIES.values()))
     amt = st.number_input("How much?", min_value=0.0)
     note = st.text_input("What for?")
     submit = st.form_submit_button("Save to Brain")
 
 if submit:
-    new_data = pd.DataFrame([[date, cat, amt, note]], columns=["Date", "Category", "Amount", "Note"])
-    new_data.to_csv(DATA_FILE, mode='a', header=False, index=False)
-    st.success("Saved! Refresh the page to see it in the table below.")
+    timestamp = datetime.combine(date, datetime.now().time())
+    store.submit([{
+        'amount': amt,
+        'item': note,
+        'category': cat,
+        'timestamp': timestamp.strftime("%Y-%m-%d %H:%M:%S")
+    }])
+    st.success("Saved!")
 
-# 4. Show the History
+# 4. Show the History (newest first; only the latest rows, so a rerun doesn't read it all)
 st.subheader("History")
-history_df = pd.read_csv(DATA_FILE)
-st.dataframe(history_df)
+st.dataframe(store.recent(HISTORY_ROWS), column_order=["timestamp", "category", "amount", "item"])
+st.caption(f"Your latest {HISTORY_ROWS} expenses")
@@ -0,0 +1,4 @@
+"""Micro-benchmarks for Resibo's hot paths.
+
+Run from the repository root, e.g. ``python -m benchmarks.bench_categorize``.
+"""
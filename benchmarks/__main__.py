@@ -0,0 +1,148 @@
+"""Run the benchmark suite and write the results as JSON
+
+    python -m benchmarks [--quick] [--output bench_results.json]
+
+Each result is one timed operation: its name, the parameters it ran with,
+how many operations one run covers, and the best of several runs. Compare
+two result files with python -m benchmarks.compare.
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import timeit
+from datetime import datetime
+
+from benchmarks import corpus
+from resibo_aggregates import ExpenseAggregates
+from resibo_matcher import KeywordMatcher
+from resibo_parser import (PARSE_CACHE, categorize_item, extract_amount, extract_item, lex_expense,
+                           process_expense_input)
+
+MESSAGES = 20_000
+CUSTOM_CATEGORY_COUNTS = [0, 10, 100, 1_000]
+EXPENSE_COUNTS = [1_000, 100_000, 1_000_000]
+REPEAT = 5
+
+
+def best(func, repeat=REPEAT):
+    """Fastest of several single runs, in seconds"""
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def result(name, seconds, ops, **params):
+    line = f"{name:<36} {' '.join(f'{k}={v}' for k, v in params.items()):<22}"
+    print(f"{line} {seconds / ops * 1e6:>12.3f} us/op")
+    return {'name': name, 'params': params, 'ops': ops, 'seconds': seconds,
+            'us_per_op': seconds / ops * 1e6}
+
+
+def bench_parsing(count):
+    messages = corpus.messages(count, seed=1)
+    amounts = [extract_amount(text) for text in messages]
+    pairs = list(zip(messages, amounts))
+
+    def cold_parse():
+        PARSE_CACHE.clear()
+        for text in messages:
+            process_expense_input(text)
+
+    return [
+        result('parse.lex_expense', best(lambda: [lex_expense(text) for text in messages]),
+               count, messages=count),
+        result('parse.extract_item', best(lambda: [extract_item(text, amount) for text, amount in pairs]),
+               count, messages=count),
+        result('parse.process_expense_input', best(cold_parse), count, messages=count, cache='cold'),
+        result('parse.process_expense_input',
+               best(lambda: [process_expense_input(text) for text in messages]),
+               count, messages=count, cache='warm'),
+    ]
+
+
+def bench_categorization(count):
+    items = [lex_expense(text)[2] for text in corpus.messages(count, seed=2)]
+    results = []
+    for custom in CUSTOM_CATEGORY_COUNTS:
+        matcher = KeywordMatcher(corpus.custom_categories(custom, seed=custom))
+        matcher.match('')  # build the automaton outside the timing
+        results.append(result(
+            'categorize.categorize_item',
+            best(lambda: [categorize_item(item, matcher) for item in items]),
+            count, custom_categories=custom))
+    return results
+
+
+def bench_insights(sizes):
+    from resibo_columns import ExpenseTable
+    from resibo_insights import generate_spending_insights
+
+    results = []
+    for size in sizes:
+        rows = corpus.expense_rows(size, seed=3)
+        expenses = corpus.expenses(size, seed=3)
+        repeat = REPEAT if size < 1_000_000 else 3
+
+        def build_table():
+            table = ExpenseTable()
+            table.extend(rows)
+            return table
+
+        def aggregate():
+            aggregates = ExpenseAggregates()
+            for expense in expenses:
+                aggregates.add(expense)
+            return aggregates
+
+        table = build_table()
+        frame = table.to_frame()
+        aggregates = aggregate()
+        results += [
+            result('insights.table_extend', best(build_table, repeat), size, expenses=size),
+            result('insights.to_frame', best(table.to_frame, repeat), 1, expenses=size),
+            result('insights.generate_spending_insights',
+                   best(lambda: generate_spending_insights(frame, aggregates.total), repeat),
+                   1, expenses=size),
+            result('insights.aggregates_add', best(aggregate, repeat), size, expenses=size),
+            result('insights.top_categories', best(aggregates.top_categories, repeat), 1, expenses=size),
+        ]
+    return results
+
+
+def metadata(quick):
+    import numpy
+    import pandas
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'quick': quick,
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'numpy': numpy.__version__,
+        'pandas': pandas.__version__,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__.splitlines()[0])
+    parser.add_argument('--output', default='bench_results.json', help='where to write the JSON results')
+    parser.add_argument('--quick', action='store_true', help='smaller corpus, skip the 1M-expense run')
+    args = parser.parse_args(argv)
+
+    messages = MESSAGES // 10 if args.quick else MESSAGES
+    sizes = EXPENSE_COUNTS[:-1] if args.quick else EXPENSE_COUNTS
+    results = bench_parsing(messages) + bench_categorization(messages) + bench_insights(sizes)
+
+    with open(args.output, 'w') as f:
+        json.dump({'meta': metadata(args.quick), 'results': results}, f, indent=2)
+    print(f"wrote {len(results)} results to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""Load test of resibo_api with an in-process ASGI client
+
+Requests go straight into the ASGI app on one event loop (no sockets), so
+the numbers are the API's own cost: routing, JSON, the thread-pool hop,
+parsing and SQLite.
+"""
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.corpus import messages
+from resibo_api import create_app
+
+REQUESTS = 5_000
+CONCURRENCY = 50
+
+
+class Client:
+    """Minimal ASGI client: HTTP requests and the lifespan handshake"""
+
+    def __init__(self, app):
+        self.app = app
+        self._events = asyncio.Queue()
+        self._replies = asyncio.Queue()
+        self._lifespan = None
+
+    async def __aenter__(self):
+        scope = {'type': 'lifespan', 'asgi': {'version': '3.0'}, 'state': {}}
+        self._lifespan = asyncio.ensure_future(self.app(scope, self._events.get, self._replies.put))
+        await self._lifespan_event('lifespan.startup')
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._lifespan_event('lifespan.shutdown')
+        await self._lifespan
+
+    async def _lifespan_event(self, event):
+        await self._events.put({'type': event})
+        reply = await self._replies.get()
+        assert reply['type'] == f'{event}.complete', reply
+
+    async def request(self, method, path, body=None, query=''):
+        payload = json.dumps(body).encode() if body is not None else b''
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': method, 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+            'query_string': query.encode(), 'root_path': '',
+            'headers': [(b'content-type', b'application/json')],
+            'client': ('127.0.0.1', 1), 'server': ('testserver', 80),
+        }
+        received = False
+
+        async def receive():
+            nonlocal received
+            if received:
+                await asyncio.Event().wait()
+            received = True
+            return {'type': 'http.request', 'body': payload, 'more_body': False}
+
+        status, chunks = None, []
+
+        async def send(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            elif message['type'] == 'http.response.body':
+                chunks.append(message.get('body', b''))
+
+        await self.app(scope, receive, send)
+        return status, json.loads(b''.join(chunks))
+
+
+def workload(count, seed=21):
+    """Parse-heavy mix, like bots forwarding messages and polling totals"""
+    rng = random.Random(seed)
+    texts = messages(500, seed=seed)
+    requests = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.6:
+            requests.append(('POST', '/parse', {'text': rng.choice(texts)}, ''))
+        elif roll < 0.8:
+            requests.append(('POST', '/expenses',
+                             {'amount': rng.randint(5, 500), 'item': 'merienda', 'category': 'Food & Dining'}, ''))
+        elif roll < 0.95:
+            requests.append(('GET', '/aggregates', None, ''))
+        else:
+            requests.append(('POST', '/batch', {'messages': rng.sample(texts, 20)}, ''))
+    return requests
+
+
+async def load_test(requests):
+    app = create_app(os.path.join(tempfile.mkdtemp(), 'bench.db'))
+    latencies = []
+    pending = list(reversed(requests))
+
+    async with Client(app) as client:
+        status, summary = await client.request('GET', '/aggregates')
+        assert status == 200 and summary['count'] == 0, summary
+
+        async def worker():
+            while pending:
+                method, path, body, query = pending.pop()
+                start = time.perf_counter()
+                status, _ = await client.request(method, path, body, query)
+                latencies.append(time.perf_counter() - start)
+                assert status in (200, 201), (path, status)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(CONCURRENCY)))
+        elapsed = time.perf_counter() - start
+        status, summary = await client.request('GET', '/aggregates')
+    return elapsed, sorted(latencies), summary
+
+
+def run():
+    requests = workload(REQUESTS)
+    elapsed, latencies, summary = asyncio.run(load_test(requests))
+    saves = sum(1 for _, path, _, _ in requests if path == '/expenses')
+    assert summary['count'] == saves, summary
+    print(f"{REQUESTS} requests, {CONCURRENCY} concurrent: {REQUESTS / elapsed:,.0f} req/s, "
+          f"p50 {latencies[len(latencies) // 2] * 1e3:.1f} ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1e3:.1f} ms")
+
+
+if __name__ == '__main__':
+    run()
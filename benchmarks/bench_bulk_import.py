@@ -0,0 +1,22 @@
+"""Throughput of bulk line parsing, serial vs worker processes"""
+import timeit
+
+from benchmarks.corpus import messages
+from resibo_bulk import parse_lines
+
+LINES = 50_000
+
+
+def run():
+    lines = messages(LINES, seed=7)
+    serial = parse_lines(lines, parallel=False)
+    parse_lines(lines[:5000], parallel=True)  # start the worker pool outside the timing
+    assert parse_lines(lines, parallel=True) == serial
+
+    for label, parallel in [('serial', False), ('process pool', True)]:
+        elapsed = min(timeit.repeat(lambda: parse_lines(lines, parallel=parallel), number=1, repeat=3))
+        print(f"{label:>12}: {LINES} lines in {elapsed:.2f}s ({LINES / elapsed:,.0f} lines/s)")
+
+
+if __name__ == '__main__':
+    run()
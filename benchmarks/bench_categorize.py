@@ -0,0 +1,61 @@
+"""Compare the keyword matcher against the per-keyword substring loop"""
+import random
+import string
+import timeit
+
+from benchmarks.corpus import custom_categories
+from resibo_matcher import KeywordMatcher
+
+KEYWORD_COUNTS = [10, 1_000, 10_000]
+KEYWORDS_PER_CATEGORY = 10
+ITEMS = 2_000
+
+
+def loop_categorize(item_text, categories):
+    """The original categorize_item loop: substring test per keyword"""
+    item_lower = item_text.lower()
+    for category, keywords in categories.items():
+        for keyword in keywords:
+            if keyword in item_lower:
+                return category
+    return None
+
+
+def make_items(rng, categories, count):
+    """Item texts where roughly half contain a keyword"""
+    keywords = [kw for kws in categories.values() for kw in kws]
+    items = []
+    for _ in range(count):
+        words = [''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 8)))
+                 for _ in range(rng.randint(1, 4))]
+        if rng.random() < 0.5:
+            words.insert(rng.randrange(len(words) + 1), rng.choice(keywords))
+        items.append(' '.join(words).title())
+    return items
+
+
+def run():
+    rng = random.Random(42)
+    print(f"{'keywords':>9} {'loop us/item':>13} {'matcher us/item':>16} {'build ms':>9} {'speedup':>8}")
+    for count in KEYWORD_COUNTS:
+        categories = custom_categories(count // KEYWORDS_PER_CATEGORY, KEYWORDS_PER_CATEGORY, seed=count)
+        items = make_items(rng, categories, ITEMS)
+
+        start = timeit.default_timer()
+        matcher = KeywordMatcher(categories)
+        matcher.match('')
+        build = timeit.default_timer() - start
+
+        for item in items:
+            assert matcher.match(item) == loop_categorize(item, categories), item
+
+        loop_time = min(timeit.repeat(
+            lambda: [loop_categorize(item, categories) for item in items], number=1, repeat=3))
+        matcher_time = min(timeit.repeat(
+            lambda: [matcher.match(item) for item in items], number=1, repeat=3))
+        print(f"{count:>9} {loop_time / ITEMS * 1e6:>13.2f} {matcher_time / ITEMS * 1e6:>16.2f} "
+              f"{build * 1e3:>9.1f} {loop_time / matcher_time:>7.1f}x")
+
+
+if __name__ == '__main__':
+    run()
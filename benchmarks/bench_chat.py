@@ -0,0 +1,39 @@
+"""Chat history memory and page cost as a conversation grows"""
+import os
+import tempfile
+import timeit
+import tracemalloc
+
+from benchmarks.corpus import messages
+from resibo_chat import ChatHistory
+from resibo_storage import SQLiteExpenseStore
+
+LENGTHS = [100, 10_000, 100_000]
+
+
+def run():
+    store = SQLiteExpenseStore(os.path.join(tempfile.mkdtemp(), 'bench.db'))
+    texts = messages(1_000, seed=5)
+    print(f"{'messages':>9} {'list KB':>9} {'history KB':>11} {'newest page us':>15} {'oldest page us':>15}")
+    for length in LENGTHS:
+        tracemalloc.start()
+        unbounded = [{'role': 'user', 'content': texts[idx % 1_000].encode().decode()} for idx in range(length)]
+        list_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        history = ChatHistory(store, f'bench-{length}')
+        tracemalloc.start()
+        for idx in range(length):
+            history.append('user', texts[idx % 1_000].encode().decode())
+        history_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        newest = min(timeit.repeat(history.page, number=100, repeat=3)) / 100
+        oldest = min(timeit.repeat(lambda: history.page(10), number=100, repeat=3)) / 100
+        print(f"{length:>9} {list_bytes / 1024:>9.0f} {history_bytes / 1024:>11.0f} "
+              f"{newest * 1e6:>15.1f} {oldest * 1e6:>15.1f}")
+        del unbounded
+
+
+if __name__ == '__main__':
+    run()
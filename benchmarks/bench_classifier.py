@@ -0,0 +1,41 @@
+"""Learned categorizer: cost of learning a correction and of scoring history in bulk"""
+import random
+import time
+
+from benchmarks.corpus import CATEGORIES, expenses, random_word
+from resibo_classifier import CategoryClassifier
+
+CORRECTIONS = 1_000
+HISTORY = 100_000
+
+
+def run():
+    rng = random.Random(20)
+    # Corrections to made-up items, so the model has a realistic vocabulary to score against
+    corrections = [(f"{random_word(rng)} {random_word(rng)}", rng.choice(CATEGORIES)) for _ in range(CORRECTIONS)]
+    classifier = CategoryClassifier()
+    start = time.perf_counter()
+    classifier.load(corrections)
+    learn = (time.perf_counter() - start) / CORRECTIONS
+    print(f"learn: {learn * 1e6:.1f} us per correction ({CORRECTIONS:,} corrections, "
+          f"{len(classifier._columns):,} features)")
+
+    history = [expense['item'] for expense in expenses(HISTORY, seed=20)]
+    # Worst case for the per-text dedupe: every item different
+    distinct = [f"{random_word(rng)} {random_word(rng)}" for _ in range(HISTORY)]
+    for label, items in [('history', history), ('all distinct', distinct)]:
+        start = time.perf_counter()
+        results = classifier.predict_many(items)
+        elapsed = time.perf_counter() - start
+        confident = sum(confidence >= 0.6 for _, confidence in results)
+        print(f"predict_many {HISTORY:,} items ({label}, {len(set(items)):,} distinct): "
+              f"{elapsed * 1e3:.0f} ms, {confident:,} at confidence >= 0.6")
+
+    start = time.perf_counter()
+    for item in distinct[:1_000]:
+        classifier.predict(item)
+    print(f"predict one item: {(time.perf_counter() - start) * 1e3:.0f} us")
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,46 @@
+"""Duplicate detection: save-time hash lookups and the linear pass over history"""
+import os
+import tempfile
+import time
+import timeit
+from datetime import datetime
+
+from benchmarks.corpus import expense_rows
+from resibo_columns import ExpenseTable
+from resibo_dedup import DuplicateIndex, find_duplicates
+from resibo_storage import SQLiteExpenseStore
+
+ROWS = 1_000_000
+# Every 50th expense saved twice, as a double-submit would
+REPEAT_EVERY = 50
+
+
+def run():
+    rows = expense_rows(ROWS, seed=12)
+    rows += [(len(rows) + row[0], ) + row[1:] for row in rows[::REPEAT_EVERY]]
+
+    for size in (100_000, 300_000, len(rows)):
+        table = ExpenseTable()
+        table.extend(rows[:size])
+        start = time.perf_counter()
+        pairs = find_duplicates(table)
+        elapsed = time.perf_counter() - start
+        print(f"find_duplicates over {size:,} rows: {elapsed * 1e3:,.0f} ms, {len(pairs):,} duplicates")
+
+    store = SQLiteExpenseStore(os.path.join(tempfile.mkdtemp(), 'bench.db'))
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    store.add_many([
+        {'amount': amount, 'item': item, 'category': category, 'timestamp': timestamp}
+        for _, amount, item, category, _ in rows[:5_000]
+    ])
+    index = store.attach(DuplicateIndex())
+    repeat = {'amount': rows[0][1], 'item': rows[0][2].upper(), 'category': rows[0][3], 'timestamp': timestamp}
+    fresh = dict(repeat, amount=0.01)
+    for label, expense in (('repeat', repeat), ('new', fresh)):
+        per_call = min(timeit.repeat(lambda: index.find(expense), number=1_000, repeat=5)) / 1_000
+        print(f"find() with 5,000 expenses in the window, {label}: {per_call * 1e6:.1f} us")
+    store.close()
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,47 @@
+"""Memory and DataFrame build time: list of dicts vs ExpenseTable"""
+import timeit
+import tracemalloc
+
+import pandas as pd
+
+from benchmarks.corpus import expense_rows
+from resibo_columns import ExpenseTable
+
+ROWS = 1_000_000
+
+
+def traced(build):
+    """Run build() and return (result, bytes it allocated and kept)"""
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def run():
+    rows = expense_rows(ROWS, seed=3)
+    # Fresh string copies, like rows arriving one at a time from the chat
+    dicts, dict_bytes = traced(lambda: [
+        {'amount': amount, 'item': item.encode().decode(), 'category': category,
+         'timestamp': timestamp.encode().decode()}
+        for _, amount, item, category, timestamp in rows
+    ])
+    table, table_bytes = traced(lambda: _table(rows))
+
+    dict_frame = min(timeit.repeat(lambda: pd.DataFrame(dicts), number=1, repeat=3))
+    table_frame = min(timeit.repeat(table.to_frame, number=1, repeat=3))
+
+    print(f"{ROWS:,} expenses")
+    print(f"  bytes/expense   list of dicts {dict_bytes / ROWS:8.1f}   table {table_bytes / ROWS:8.1f}")
+    print(f"  DataFrame build list of dicts {dict_frame * 1e3:8.1f}ms table {table_frame * 1e3:8.2f}ms")
+
+
+def _table(rows):
+    table = ExpenseTable()
+    table.extend(rows)
+    return table
+
+
+if __name__ == '__main__':
+    run()
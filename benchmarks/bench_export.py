@@ -0,0 +1,75 @@
+"""Export time and peak RSS: whole-frame CSV vs chunked CSV, Parquet and Arrow
+
+Each export runs in a fresh interpreter. Peak RSS is reported as growth
+over the interpreter's peak just before the export starts, after the
+libraries are imported. Reads /proc, so Linux only.
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmarks.corpus import expenses
+from resibo_storage import SQLiteExpenseStore
+
+SIZES = [100_000, 1_000_000]
+ROOT = Path(__file__).resolve().parent.parent
+
+CHILD = r'''
+import json, os, sys, time
+sys.path.insert(0, sys.argv[3])
+import pandas, pyarrow, pyarrow.parquet
+from resibo_columns import ExpenseTable
+from resibo_export import write_export
+from resibo_storage import SQLiteExpenseStore
+
+def peak_rss_kb():
+    # VmHWM, unlike ru_maxrss, starts afresh at exec instead of inheriting the parent's peak
+    with open('/proc/self/status') as f:
+        return int(next(line for line in f if line.startswith('VmHWM')).split()[1])
+
+store = SQLiteExpenseStore(sys.argv[1])
+out = os.path.join(os.path.dirname(sys.argv[1]), 'export.out')
+before = peak_rss_kb()
+start = time.perf_counter()
+if sys.argv[2] == 'frame':
+    # The old Settings page: whole history in a DataFrame, then one CSV string
+    table = ExpenseTable()
+    table.load(store)
+    data = table.to_frame().to_csv(index=False)
+    with open(out, 'w') as f:
+        f.write(data)
+else:
+    write_export(store, sys.argv[2], out)
+elapsed = time.perf_counter() - start
+peak = peak_rss_kb()
+print(json.dumps({'seconds': elapsed, 'rss_mb': (peak - before) / 1024, 'bytes': os.path.getsize(out)}))
+'''
+
+
+def measure(path, mode):
+    out = subprocess.run([sys.executable, '-c', CHILD, path, mode, str(ROOT)],
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def run():
+    print(f"{'rows':>9} {'export':>15} {'seconds':>8} {'peak RSS +MB':>13} {'file MB':>8}")
+    for size in SIZES:
+        path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+        store = SQLiteExpenseStore(path)
+        rows = expenses(size, seed=4)
+        for offset in range(0, size, 100_000):
+            store.add_many(rows[offset:offset + 100_000])
+        store.close()
+        for mode in ['frame', 'csv', 'parquet', 'arrow']:
+            result = measure(path, mode)
+            label = 'frame CSV' if mode == 'frame' else f'chunked {mode}'
+            print(f"{size:>9,} {label:>15} {result['seconds']:>8.2f} {result['rss_mb']:>13.1f} "
+                  f"{result['bytes'] / 2**20:>8.1f}")
+
+
+if __name__ == '__main__':
+    run()
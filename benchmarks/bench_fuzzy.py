@@ -0,0 +1,84 @@
+"""Typo-tolerant categorization: symmetric-delete index vs comparing every keyword"""
+import random
+import string
+import time
+import timeit
+
+from benchmarks.corpus import custom_categories, random_word
+from resibo_matcher import KeywordMatcher, word_distance
+
+KEYWORD_COUNTS = [1_000, 10_000]
+KEYWORDS_PER_CATEGORY = 10
+DISTANCES = [1, 2]
+ITEMS = 1_000
+BRUTE_FORCE_ITEMS = 50
+
+
+def typo(rng, word):
+    """word with one random insertion, deletion, substitution or swap"""
+    i = rng.randrange(len(word))
+    kind = rng.randrange(4)
+    if kind == 0:
+        return word[:i] + rng.choice(string.ascii_lowercase) + word[i:]
+    if kind == 1:
+        return word[:i] + word[i + 1:]
+    if kind == 2:
+        return word[:i] + rng.choice(string.ascii_lowercase) + word[i + 1:]
+    i = min(i, len(word) - 2)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+def brute_force(item, categories, max_distance):
+    """Fewest edits from any word of item to any keyword, checking every keyword"""
+    best = None
+    for word in item.lower().split():
+        for keywords in categories.values():
+            for keyword in keywords:
+                distance = word_distance(word, keyword, max_distance)
+                if distance is not None and (best is None or distance < best):
+                    best = distance
+    return best
+
+
+def percentile(samples, fraction):
+    return sorted(samples)[int(len(samples) * fraction)]
+
+
+def run():
+    rng = random.Random(19)
+    print(f"{'keywords':>9} {'distance':>9} {'build ms':>9} {'variants':>9} {'p50 us':>8} {'p99 us':>8} "
+          f"{'hit rate':>9} {'brute us':>10}")
+    for count in KEYWORD_COUNTS:
+        categories = custom_categories(count // KEYWORDS_PER_CATEGORY, KEYWORDS_PER_CATEGORY, seed=count)
+        keywords = [keyword for words in categories.values() for keyword in words]
+        # Half the items carry a misspelt keyword, half are unrelated words
+        items = [
+            f"{random_word(rng)} {typo(rng, rng.choice(keywords))}" if i % 2 else random_word(rng)
+            for i in range(ITEMS)
+        ]
+        for distance in DISTANCES:
+            matcher = KeywordMatcher(categories)
+            start = time.perf_counter()
+            matcher.closest('', distance)
+            build = time.perf_counter() - start
+
+            latencies = []
+            hits = 0
+            for item in items:
+                start = time.perf_counter()
+                hit = matcher.closest(item, distance)
+                latencies.append(time.perf_counter() - start)
+                hits += hit is not None
+            for item in items[:BRUTE_FORCE_ITEMS]:
+                hit = matcher.closest(item, distance)
+                assert (hit and hit[2]) == brute_force(item, categories, distance), item
+            brute = min(timeit.repeat(
+                lambda: [brute_force(item, categories, distance) for item in items[:BRUTE_FORCE_ITEMS]],
+                number=1, repeat=1)) / BRUTE_FORCE_ITEMS
+            print(f"{count:>9,} {distance:>9} {build * 1e3:>9.0f} {len(matcher._fuzzy):>9,} "
+                  f"{percentile(latencies, 0.5) * 1e6:>8.1f} {percentile(latencies, 0.99) * 1e6:>8.1f} "
+                  f"{hits / ITEMS:>9.0%} {brute * 1e6:>10.0f}")
+
+
+if __name__ == '__main__':
+    run()
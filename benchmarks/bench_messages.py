@@ -0,0 +1,181 @@
+"""Confirmation and reply texts: the message catalog vs rebuilding the dicts on every call"""
+import random
+import timeit
+
+from resibo_messages import MessageCatalog
+
+CALLS = 100_000
+EXPENSES = [
+    ('adobo', 'Food & Dining', 85.0, 1.0),
+    ('jeep', 'Transport', 15.0, 1.0),
+    ('new phone', 'Shopping', 15_000.0, 1.0),
+    ('kurente', 'Bills & Utilities', 1_200.0, 0.71),
+    ('dog food', 'Pets', 450.0, 1.0),
+]
+REPLIES = [(language, key) for language in ('english', 'tagalog', 'bisaya')
+           for key in ('missing_amount', 'missing_item', 'saved', 'cancelled')]
+
+
+# The functions the catalog replaced, as they were
+
+
+def rebuilt_response_text(lang, message_type):
+    """Get localized response text"""
+    responses = {
+        'english': {
+            'missing_amount': "I couldn't find the amount. How much did you spend?",
+            'missing_item': "What did you buy or pay for?",
+            'confirm': "Should I save this?",
+            'saved': "✅ Saved!",
+            'cancelled': "Okay, not saved.",
+        },
+        'tagalog': {
+            'missing_amount': "Hindi ko makita ang halaga. Magkano ang ginastos mo?",
+            'missing_item': "Ano ang binili o binayaran mo?",
+            'confirm': "I-save ko ba ito?",
+            'saved': "✅ Na-save na!",
+            'cancelled': "Sige, hindi na-save.",
+        },
+        'bisaya': {
+            'missing_amount': "Wala koy makita nga kantidad. Pila man ang imong gigasto?",
+            'missing_item': "Unsa man ang imong gipalit o gibayaran?",
+            'confirm': "I-save ba nako ni?",
+            'saved': "✅ Na-save na!",
+            'cancelled': "Sige, wala na-save.",
+        }
+    }
+
+    return responses[lang].get(message_type, "")
+
+
+def rebuilt_confirmation(item, category, amount, confidence=1.0):
+    """Generate conversational confirmation message"""
+
+    category_emoji = {
+        'Food & Dining': '🍽️',
+        'Transport': '🚕',
+        'Shopping': '🛍️',
+        'Bills & Utilities': '💡',
+        'Entertainment': '🎮',
+        'Health & Wellness': '💊',
+        'Personal Care': '💇',
+        'Education': '📚',
+        'Gifts & Others': '🎁',
+        'Miscellaneous': '🗂️'
+    }
+
+    emoji = category_emoji.get(category, '📝')
+
+    # Main confirmation
+    confirmation = f"Copy that! Listed **₱{amount:,.2f}** under **{category}**. {emoji}"
+    if 0 < confidence < 1:
+        # The category came from a keyword that was spelled differently
+        confirmation += f" _({confidence:.0%} sure about the category; change it below if I guessed wrong)_"
+
+    # Contextual witty comment
+    witty_comments = {
+        'Food & Dining': [
+            f"Itong \"{item}\" ba talaga yan? 😅",
+            "Busog ka na? 😋",
+            "Sarap nyan! 🤤",
+            "Kumain na ba? 🍴"
+        ],
+        'Transport': [
+            "Saan ka galing? 🛣️",
+            "Malayo ba byahe? 🚗",
+            "Traffic ba? 😅",
+            "Mahal na plete ngayon! 💸"
+        ],
+        'Shopping': [
+            "Need ba talaga yan? 😂",
+            "Sale ba to? 🏷️",
+            "Bagong bili! ✨",
+            "Shopping therapy? 💳"
+        ],
+        'Bills & Utilities': [
+            "Bayad muna bago gala! 💪",
+            "Adulting mode ON! 🎯",
+            "Responsible naman! 👏",
+            "No disconnection today! ✅"
+        ],
+        'Entertainment': [
+            "Enjoy mode activated! 🎉",
+            "You deserve it! ✨",
+            "Happy ka naman? 😊",
+            "Life is short! 🌟"
+        ],
+        'Health & Wellness': [
+            "Health is wealth! 💪",
+            "Alagaan ang sarili! 🌡️",
+            "Investment yan! 💯",
+            "Get well soon! 🏥"
+        ],
+        'Personal Care': [
+            "Pampaganda/poganda! ✨",
+            "Self-care is important! 💅",
+            "Bagong look? 😊",
+            "Treat yourself! 🧖"
+        ],
+        'Education': [
+            "Brain gains! 🧠",
+            "Keep learning! 🎓",
+            "Future-proofing! 💡",
+            "Knowledge is power! 📖"
+        ],
+        'Gifts & Others': [
+            "Mabait ka naman! 🎁",
+            "Good karma yan! ✨",
+            "Generous! 💝",
+            "Blessing others! 🙏"
+        ],
+        'Miscellaneous': [
+            f"Itong \"{item}\" noted! 📝",
+            "Saved! ✅",
+            "Got it! 👍",
+            "Copy that! 📋"
+        ]
+    }
+
+    # Special case for high amounts
+    if amount >= 1000:
+        comments = [
+            f"Whoa! ₱{amount:,.0f}?! Big purchase yarn! 😮",
+            "Worth it ba? 🤔",
+            "Big one! 💸"
+        ]
+        comment = random.choice(comments)
+    else:
+        comments = witty_comments.get(category, witty_comments['Miscellaneous'])
+        comment = random.choice(comments)
+
+    return confirmation, comment
+
+
+def per_call(func):
+    return min(timeit.repeat(func, number=1, repeat=5)) / CALLS
+
+
+def run():
+    catalog = MessageCatalog.load()
+    expenses = EXPENSES * (CALLS // len(EXPENSES))
+    replies = REPLIES * (CALLS // len(REPLIES) + 1)
+    replies = replies[:CALLS]
+
+    load = min(timeit.repeat(MessageCatalog.load, number=1, repeat=5))
+    print(f"catalog load, once per process: {load * 1e3:.2f} ms")
+    cases = [
+        ('reply text', lambda: [rebuilt_response_text(lang, key) for lang, key in replies],
+         lambda: [catalog.text(lang, key) for lang, key in replies]),
+        ('confirmation', lambda: [rebuilt_confirmation(*expense) for expense in expenses],
+         lambda: [catalog.confirmation(*expense) for expense in expenses]),
+    ]
+    for label, before, after in cases:
+        random.seed(0)
+        rebuilt = per_call(before)
+        random.seed(0)
+        cached = per_call(after)
+        print(f"{label:>13}: rebuilt {rebuilt * 1e6:6.2f} us, catalog {cached * 1e6:6.2f} us ({rebuilt / cached:.1f}x)")
+
+
+if __name__ == '__main__':
+    run()
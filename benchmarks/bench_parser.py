@@ -0,0 +1,122 @@
+"""Golden-corpus check and per-message timing of the single-pass lexer
+
+The legacy_* functions are the multi-pass parser the lexer replaced, kept
+verbatim as the reference the lexer must agree with.
+"""
+import random
+import re
+import timeit
+
+from benchmarks.corpus import messages as corpus_messages
+from resibo_parser import (CATEGORY_KEYWORDS, LANGUAGE_PATTERNS, PARSE_CACHE, lex_expense,
+                           process_expense_input)
+
+TEMPLATES = [
+    "{item} {amount}",
+    "{item} {amount} pesos",
+    "{item} {amount} peso",
+    "{item} {amount}php",
+    "{item} ₱{amount}",
+    "₱ {amount} {item}",
+    "I spent {amount} for {item}",
+    "Bought {item} for {amount} pesos",
+    "Paid {amount} PHP for {item}",
+    "Bumili ako ng {item} sa halagang {amount}",
+    "Nagbayad ako ng {amount} para sa {item}",
+    "Gastos ko sa {item} {amount} pesos",
+    "Plete nako sa {item} kay {amount} pesos",
+    "Gipalit nako nga {item} {amount}",
+    "Gibayad nako {amount} sa {item}",
+    "{item}, {item} and {item} = ₱{amount}",
+    "{item}",
+    "{amount}",
+]
+
+EDGE_CASES = [
+    "", "   ", "₱", "₱ ", "50", "₱50", "₱ 50", "₱  \t50 pesos", "50pesos", "50 PESOS",
+    "abc5def", "abc5 def", "abc 5 def", "lunch5", "5lunch", "1.5abc", "a1.5", "12.50 php",
+    "load 50.", "rice 1,200", "ml diamonds 100", "jeep_15", "for 5 for", "Sa ng ko", "FOR",
+    "kape 25 kay 30", "₱₱40", "20 ₱30 40 pesos", "bayad 5", "nagbayad sa kuryente 1500",
+    "gasto sa plete 15", "Gipalit ko og bugas ₱ 200", "merienda\n45", "20.5.3 snacks",
+]
+
+
+def legacy_detect_language(text):
+    text_lower = text.lower()
+    for word in LANGUAGE_PATTERNS['tagalog']:
+        if word in text_lower:
+            return 'tagalog'
+    for word in LANGUAGE_PATTERNS['bisaya']:
+        if word in text_lower:
+            return 'bisaya'
+    return 'english'
+
+
+def legacy_extract_amount(text):
+    patterns = [
+        r'₱\s*(\d+(?:\.\d+)?)',
+        r'(\d+(?:\.\d+)?)\s*(?:pesos?|php)',
+        r'\b(\d+(?:\.\d+)?)\b'
+    ]
+    for pattern in patterns:
+        match = re.search(pattern, text.lower())
+        if match:
+            return float(match.group(1))
+    return None
+
+
+def legacy_extract_item(text, amount):
+    cleaned = re.sub(r'₱?\d+(?:\.\d+)?\s*(?:pesos?|php)?', '', text, flags=re.IGNORECASE)
+    remove_words = ['bumili', 'binili', 'bought', 'paid', 'for', 'ako', 'ng', 'sa', 'nako', 'ko',
+                    'gipalit', 'gibayad', 'spent', 'halagang', 'kay', 'og']
+    for word in remove_words:
+        cleaned = re.sub(r'\b' + word + r'\b', '', cleaned, flags=re.IGNORECASE)
+    cleaned = ' '.join(cleaned.split()).strip()
+    return cleaned if cleaned else None
+
+
+def legacy_lex(text):
+    amount = legacy_extract_amount(text)
+    return legacy_detect_language(text), amount, legacy_extract_item(text, amount)
+
+
+def golden_corpus(count=20_000, seed=11):
+    """Deterministic template phrases, corpus messages and hand-picked edge cases"""
+    rng = random.Random(seed)
+    items = [kw for kws in CATEGORY_KEYWORDS.values() for kw in kws]
+    amounts = ['15', '85', '200', '1500', '12.50', '0.75', '3']
+    corpus = list(EDGE_CASES)
+    for _ in range(count):
+        phrase = rng.choice(TEMPLATES).format(item=rng.choice(items), amount=rng.choice(amounts))
+        corpus.append(phrase.title() if rng.random() < 0.2 else phrase)
+    return corpus + corpus_messages(count, seed)
+
+
+def run():
+    corpus = golden_corpus()
+    mismatches = [text for text in corpus if lex_expense(text) != legacy_lex(text)]
+    for text in mismatches[:10]:
+        print(f"MISMATCH {text!r}: lexer {lex_expense(text)} legacy {legacy_lex(text)}")
+    print(f"golden corpus: {len(corpus) - len(mismatches)}/{len(corpus)} messages match")
+
+    sample = corpus[:5_000]
+    legacy = min(timeit.repeat(lambda: [legacy_lex(text) for text in sample], number=1, repeat=5))
+    lexer = min(timeit.repeat(lambda: [lex_expense(text) for text in sample], number=1, repeat=5))
+    print(f"legacy parse {legacy / len(sample) * 1e6:6.2f} us/message")
+    print(f"lexer        {lexer / len(sample) * 1e6:6.2f} us/message ({legacy / lexer:.1f}x)")
+
+    # Everyday phrases repeat, so most full parses should be a cache lookup
+    daily = golden_corpus(count=200, seed=13)
+    rng = random.Random(17)
+    messages = [rng.choice(daily) for _ in range(5_000)]
+    PARSE_CACHE.clear()
+    PARSE_CACHE.hits = PARSE_CACHE.misses = 0
+    cached = min(timeit.repeat(lambda: [process_expense_input(text) for text in messages],
+                               number=1, repeat=5))
+    print(f"process_expense_input, {len(set(daily))} distinct phrases: "
+          f"{cached / len(messages) * 1e6:6.2f} us/message "
+          f"({PARSE_CACHE.hits} hits, {PARSE_CACHE.misses} misses)")
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,66 @@
+"""Newest, largest and top-category lookups: order-statistics index vs scans"""
+import os
+import tempfile
+import time
+import timeit
+
+from benchmarks.corpus import custom_categories, expenses
+from resibo_aggregates import ExpenseAggregates
+from resibo_columns import ExpenseTable
+from resibo_ranking import ExpenseRanking
+from resibo_storage import SQLiteExpenseStore
+
+ROWS = 1_000_000
+CATEGORIES = 1_000
+
+
+def per_call(func, number=100):
+    return min(timeit.repeat(func, number=number, repeat=5)) / number
+
+
+def run():
+    store = SQLiteExpenseStore(os.path.join(tempfile.mkdtemp(), 'bench.db'))
+    rows = expenses(ROWS, seed=9)
+    # Spread the history over many categories, as with a long custom-category list
+    names = list(custom_categories(CATEGORIES, seed=9))
+    for offset, expense in enumerate(rows):
+        if offset % 2:
+            expense['category'] = names[offset % CATEGORIES]
+    for offset in range(0, ROWS, 100_000):
+        store.add_many(rows[offset:offset + 100_000])
+
+    start = time.perf_counter()
+    ranking = store.attach(ExpenseRanking())
+    print(f"{ROWS:,} expenses, {CATEGORIES + 10:,} categories: "
+          f"ranking loaded in {time.perf_counter() - start:.2f} s")
+    aggregates = store.attach(ExpenseAggregates())
+    table = store.attach(ExpenseTable())
+    frame = table.to_frame()
+    category = names[0]
+
+    def sort_totals():
+        # What top_categories() used to do on every call
+        return sorted(aggregates.category_sums.copy().items(), key=lambda pair: pair[1], reverse=True)[:5]
+
+    cases = [
+        ('recent 3', lambda: ranking.recent(3), lambda: store.recent(3), 'SQL LIMIT'),
+        ('largest 1', lambda: ranking.largest(1), lambda: frame.loc[frame['amount'].idxmax()], 'idxmax'),
+        ('largest 5 in a category', lambda: ranking.largest(5, category),
+         lambda: store.largest(5, category), 'SQL'),
+        ('top 5 categories', lambda: aggregates.top_categories(5), sort_totals, 'sort'),
+    ]
+    print(f"{'lookup':>24} {'index us':>9} {'scan us':>9} {'scan':>10}")
+    for label, indexed, scan, how in cases:
+        print(f"{label:>24} {per_call(indexed) * 1e6:>9.1f} {per_call(scan, 10) * 1e6:>9.1f} {how:>10}")
+
+    batch = expenses(10_000, seed=10)
+    start = time.perf_counter()
+    store.submit(batch)
+    store.flush()
+    elapsed = time.perf_counter() - start
+    print(f"10,000 saves with the ranking, totals and table attached: {10_000 / elapsed:,.0f}/s")
+    store.close()
+
+
+if __name__ == '__main__':
+    run()
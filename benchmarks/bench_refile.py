@@ -0,0 +1,66 @@
+"""Refiling history after a custom category is added: item index vs rescanning every expense"""
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.corpus import expenses, random_word
+from resibo_aggregates import ExpenseAggregates
+from resibo_history import ItemIndex, refile
+from resibo_matcher import KeywordMatcher
+from resibo_parser import categorize_item
+from resibo_storage import SQLiteExpenseStore
+
+ROWS = 200_000
+# Share of expenses with an item seen nowhere else, so the vocabulary grows with the history
+UNIQUE = 0.2
+# Share of those that mention one of the new category's keywords
+AFFECTED = 0.05
+KEYWORDS = ['dog food', 'vet', 'pet']
+
+
+def run():
+    store = SQLiteExpenseStore(os.path.join(tempfile.mkdtemp(), 'bench.db'))
+    rng = random.Random(11)
+    matcher = KeywordMatcher()
+    rows = expenses(ROWS, seed=11)
+    for expense in rows:
+        if rng.random() < UNIQUE:
+            expense['item'] = random_word(rng)
+            if rng.random() < AFFECTED:
+                expense['item'] += rng.choice([' dog food', ' for the vet', ' petsa'])
+        expense['category'] = categorize_item(expense['item'], matcher)
+    store.add_many(rows)
+    store.attach(ExpenseAggregates())
+
+    start = time.perf_counter()
+    index = store.attach(ItemIndex())
+    print(f"{ROWS:,} expenses, {len(index):,} distinct items: index built in {time.perf_counter() - start:.2f} s")
+
+    def categorize(item):
+        return categorize_item(item, matcher)
+
+    start = time.perf_counter()
+    # Everything a full refile would look at: every expense, categorized again
+    scanned = {item for _, _, item, _, _ in store.rows()}
+    changed = 0
+    after = KeywordMatcher({'Pets': KEYWORDS})
+    for item in scanned:
+        changed += categorize_item(item, after) != categorize(item)
+    rescan = time.perf_counter() - start
+
+    start = time.perf_counter()
+    items = index.containing(KEYWORDS) | store.category_items('Pets')
+    before = {item: categorize(item) for item in items}
+    matcher.add('Pets', KEYWORDS)
+    moved = refile(store, index, before, categorize)
+    indexed = time.perf_counter() - start
+
+    print(f"rescan: {rescan * 1e3:,.0f} ms to categorize {len(scanned):,} items again, before any write")
+    print(f"index: {indexed * 1e3:,.0f} ms for {len(items):,} items looked at and {moved:,} expenses moved, "
+          f"written in one transaction")
+    store.close()
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,119 @@
+"""Script runs and time per user action: what one click or entry makes the app execute
+
+Drives resibo_app.py with Streamlit's AppTest on a database of HISTORY
+expenses and counts the traced runs each action causes: full runs of the
+script (including ones cut short by st.rerun) and reruns of one fragment,
+with the time spent in them. Widget callbacks run before any of those, so
+work done in one (saving, refiling) only counts in the action's own time,
+which also includes AppTest's handling of what was drawn.
+To measure another checkout, copy this file into its benchmarks/ and run
+it there.
+
+AppTest only keeps the elements the last run drew, so after a run of
+fragments alone the sidebar's buttons are out of its reach; the page is
+refreshed with an untimed full run first, as a browser would still be
+showing them.
+"""
+import os
+import tempfile
+import time
+from pathlib import Path
+
+os.environ['RESIBO_DB'] = os.path.join(tempfile.mkdtemp(), 'bench.db')
+os.environ['RESIBO_TRACE'] = '1'
+
+from benchmarks.corpus import expenses
+from resibo_storage import SQLiteBackend
+from resibo_trace import TRACER
+
+APP = Path(__file__).resolve().parent.parent / 'resibo_app.py'
+HISTORY = 100_000
+ROUNDS = 3
+
+
+def button(label):
+    return lambda at: next(b for b in at.button if b.label == label)
+
+
+def widget(kind, key):
+    return lambda at: getattr(at, kind)(key=key)
+
+
+def text_input(label):
+    return lambda at: next(t for t in at.text_input if t.label == label)
+
+
+def last_run():
+    runs = TRACER.recent_runs()
+    return runs[0]['run'] if runs else 0
+
+
+def measure(at, find, act):
+    """Run act on the element find() picks
+
+    Returns the full and fragment runs it caused, the seconds spent in
+    them, and the seconds the whole action took.
+    """
+    try:
+        element = find(at)
+    except (StopIteration, KeyError):
+        at.run()
+        element = find(at)
+    since = last_run()
+    start = time.perf_counter()
+    act(element)
+    wall = time.perf_counter() - start
+    assert not at.exception, at.exception
+    runs = [run for run in TRACER.recent_runs() if run['run'] > since]
+    full = sum('fragment' not in run for run in runs)
+    return full, len(runs) - full, sum(run['total_ms'] for run in runs) / 1e3, wall
+
+
+def run():
+    from streamlit.testing.v1 import AppTest
+
+    backend = SQLiteBackend()
+    backend.store().add_many(expenses(HISTORY, seed=14))
+    backend.close()
+
+    def session():
+        """One user's actions from opening the app, each with what it ran"""
+        at = AppTest.from_file(str(APP), default_timeout=120)
+
+        def add_category(name_input):
+            name_input.input("Pets")
+            text_input("Keywords (comma-separated)")(at).input("dog food, vet")
+            button("Add Category")(at).click().run()
+
+        actions = [
+            ('open the app', lambda at: at, lambda at: at.run()),
+            ('go to Log Expenses', button("💬 Log Expenses"), lambda b: b.click().run()),
+            ('type an expense', widget('text_input', 'expense_input'), lambda t: t.input("Lunch 85 pesos").run()),
+            ('change its category', widget('selectbox', 'category_override'),
+             # Earlier sessions taught it where lunch goes, so pick something else
+             lambda s: s.select("Education" if s.value == "Shopping" else "Shopping").run()),
+            ('save it', button("✅ Yes, Save"), lambda b: b.click().run()),
+            ('type another', widget('text_input', 'expense_input'), lambda t: t.input("Plete nako 15").run()),
+            ('cancel it', button("❌ No, Cancel"), lambda b: b.click().run()),
+            ('go to Analytics', button("📊 Analytics"), lambda b: b.click().run()),
+            ('go to Settings', button("⚙️ Settings"), lambda b: b.click().run()),
+            ('add a custom category', text_input("Category Name"), add_category),
+        ]
+        return [(name,) + measure(at, find, act) for name, find, act in actions]
+
+    # Fastest of a few sessions; the first also pays for imports and building the indexes
+    rounds = [session() for _ in range(ROUNDS)]
+    print(f"{HISTORY:,} expenses, best of {ROUNDS} sessions; {APP}")
+    print(f"{'action':<24} {'full runs':>9} {'fragments':>9} {'in runs ms':>10} {'action ms':>10}")
+    totals = [0, 0, 0.0, 0.0]
+    for results in zip(*rounds):
+        name, full, fragments = results[-1][:3]
+        in_runs = min(result[3] for result in results)
+        wall = min(result[4] for result in results)
+        print(f"{name:<24} {full:>9} {fragments:>9} {in_runs * 1e3:>10.1f} {wall * 1e3:>10.1f}")
+        totals = [totals[0] + full, totals[1] + fragments, totals[2] + in_runs, totals[3] + wall]
+    print(f"{'total':<24} {totals[0]:>9} {totals[1]:>9} {totals[2] * 1e3:>10.1f} {totals[3] * 1e3:>10.1f}")
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,41 @@
+"""Period totals from the rollup tables vs filtering the whole history"""
+import os
+import tempfile
+import time
+import timeit
+
+from benchmarks.corpus import expenses
+from resibo_storage import SQLiteExpenseStore, period_buckets
+
+ROWS = 1_000_000
+# What the sidebar used to have to do: parse the timestamp text of every row
+SCAN_DAY = "SELECT COALESCE(SUM(amount), 0) FROM expenses WHERE user_id = ? AND date(timestamp) = ?"
+SCAN_MONTH = "SELECT COALESCE(SUM(amount), 0) FROM expenses WHERE user_id = ? AND strftime('%Y-%m', timestamp) = ?"
+
+
+def run():
+    store = SQLiteExpenseStore(os.path.join(tempfile.mkdtemp(), 'bench.db'))
+    rows = expenses(ROWS, seed=8)
+    start = time.perf_counter()
+    for offset in range(0, ROWS, 100_000):
+        store.add_many(rows[offset:offset + 100_000])
+    print(f"{ROWS:,} expenses saved at {ROWS / (time.perf_counter() - start):,.0f}/s, rollups included")
+
+    last = rows[-1]['timestamp']
+    buckets = period_buckets(last)
+    cases = [
+        ('today', lambda: store.rollup('day', buckets['day']),
+         lambda: store._query(SCAN_DAY, (store.user_id, last[:10]))),
+        ('this month', lambda: store.rollup('month', buckets['month']),
+         lambda: store._query(SCAN_MONTH, (store.user_id, last[:7]))),
+    ]
+    for label, rollup, scan in cases:
+        assert abs(sum(row[3] for row in rollup()) - scan()[0][0]) < 1e-6 * max(1.0, scan()[0][0])
+        fast = min(timeit.repeat(rollup, number=100, repeat=3)) / 100
+        slow = min(timeit.repeat(scan, number=1, repeat=3))
+        print(f"  {label:<11} rollup {fast * 1e6:8.1f} us   full scan {slow * 1e3:8.1f} ms")
+    store.close()
+
+
+if __name__ == '__main__':
+    run()
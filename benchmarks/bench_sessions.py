@@ -0,0 +1,76 @@
+"""Memory per user session and read latency under concurrent sessions
+
+Simulates what each session of resibo_app.py keeps in multi-user mode: the
+user's shared store and running totals, plus the session's own chat
+history and custom categories, all on one pooled database.
+"""
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from benchmarks.corpus import custom_categories, expenses, messages
+from resibo_aggregates import ExpenseAggregates
+from resibo_chat import ChatHistory
+from resibo_matcher import KeywordMatcher
+from resibo_parser import get_default_matcher
+from resibo_storage import SQLiteBackend
+
+SESSIONS = 500
+EXPENSES_PER_USER = 200
+THREADS = 8
+READS_PER_THREAD = 2_000
+
+
+def run():
+    backend = SQLiteBackend(os.path.join(tempfile.mkdtemp(), 'bench.db'))
+    rows = expenses(EXPENSES_PER_USER, seed=9)
+    chat = messages(60, seed=9)
+    get_default_matcher().match('')  # built once per process, shared by every session
+
+    tracemalloc.start()
+    sessions = []
+    for idx in range(SESSIONS):
+        user_id = f'user{idx}'
+        store = backend.store(user_id)
+        store.add_many(rows)
+        aggregates = store.attach(ExpenseAggregates())
+        history = ChatHistory(store, user_id)
+        for text in chat:
+            history.append('user', text)
+        categories = custom_categories(3, seed=idx)
+        sessions.append((store, aggregates, history, categories, KeywordMatcher(categories)))
+    per_session = tracemalloc.get_traced_memory()[0] / SESSIONS
+    tracemalloc.stop()
+
+    latencies = []
+
+    def reader(offset):
+        mine = []
+        for idx in range(READS_PER_THREAD):
+            store = sessions[(offset + idx * THREADS) % SESSIONS][0]
+            start = time.perf_counter()
+            store.sync()
+            store.recent(3)
+            mine.append(time.perf_counter() - start)
+        latencies.extend(mine)
+
+    threads = [threading.Thread(target=reader, args=(idx,)) for idx in range(THREADS)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+
+    print(f"{SESSIONS} sessions, {EXPENSES_PER_USER} expenses each, pool of {backend.pool.size}")
+    print(f"  memory per session   {per_session / 1024:8.1f} KB")
+    print(f"  sidebar reads        {len(latencies) / elapsed:8.0f}/s across {THREADS} threads, "
+          f"p50 {latencies[len(latencies) // 2] * 1e3:.2f} ms, p99 {latencies[int(len(latencies) * 0.99)] * 1e3:.2f} ms")
+    backend.close()
+
+
+if __name__ == '__main__':
+    run()
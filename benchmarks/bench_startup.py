@@ -0,0 +1,71 @@
+"""Cold-start and first-interaction latency of each page of resibo_app.py
+
+Every page is measured in a fresh interpreter so import costs are included.
+Streamlit itself is imported before timing starts, as it is in a running
+server.
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+APP = Path(__file__).resolve().parent.parent / 'resibo_app.py'
+PAGES = ['home', 'log', 'analytics', 'settings']
+SEED_EXPENSES = 1_000
+
+MEASURE = r'''
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+
+at = AppTest.from_file(sys.argv[1], default_timeout=60)
+at.session_state.current_page = sys.argv[2]
+start = time.perf_counter()
+at.run()
+cold = time.perf_counter() - start
+assert not at.exception, at.exception
+
+# First interaction: click the current page's nav button, a plain rerun
+nav = [b for b in at.sidebar.button if b.proto.type == 'primary'][0]
+start = time.perf_counter()
+nav.click().run()
+interaction = time.perf_counter() - start
+
+print(json.dumps({
+    'cold_ms': cold * 1e3,
+    'interaction_ms': interaction * 1e3,
+    'pandas': 'pandas' in sys.modules,
+    'plotly': 'plotly.express' in sys.modules,
+}))
+'''
+
+
+def seed(path, count):
+    sys.path.insert(0, str(APP.parent))
+    from benchmarks.corpus import expenses
+    from resibo_storage import SQLiteExpenseStore
+    store = SQLiteExpenseStore(path)
+    store.add_many(expenses(count))
+    store.close()
+
+
+def measure(page, db_path):
+    env = dict(os.environ, RESIBO_DB=db_path)
+    out = subprocess.run([sys.executable, '-c', MEASURE, str(APP), page],
+                         env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def run():
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    seed(db_path, SEED_EXPENSES)
+    print(f"{'page':>10} {'cold ms':>9} {'1st click ms':>13} {'pandas':>7} {'plotly':>7}")
+    for page in PAGES:
+        result = measure(page, db_path)
+        print(f"{page:>10} {result['cold_ms']:>9.0f} {result['interaction_ms']:>13.0f} "
+              f"{str(result['pandas']):>7} {str(result['plotly']):>7}")
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,52 @@
+"""Spending timeline at 1M expenses: server-side buckets vs sending every point"""
+import time
+
+from benchmarks.corpus import expense_rows
+from resibo_columns import ExpenseTable
+from resibo_timeline import build_spending_timeline, spending_timeline
+
+ROWS = 1_000_000
+DAY = 86400
+
+
+def timed(func):
+    start = time.perf_counter()
+    value = func()
+    return value, time.perf_counter() - start
+
+
+def run():
+    # Imported before timing so the first figure doesn't pay for it
+    import plotly.graph_objects as go
+
+    table = ExpenseTable()
+    table.extend(expense_rows(ROWS, seed=13))
+    times, amounts = table.column('timestamp'), table.column('amount')
+    first, last = int(times.min()), int(times.max())
+    print(f"{ROWS:,} expenses over {(last - first) / DAY / 365:.1f} years")
+
+    ranges = [
+        ('everything', None, None),
+        ('one year', last - 365 * DAY, last),
+        ('one month', last - 30 * DAY, last),
+        ('one week', last - 7 * DAY, last),
+    ]
+    print(f"{'range':>12} {'unit':>6} {'points':>7} {'bucket ms':>10} {'figure ms':>10} {'json ms':>8} {'payload':>10}")
+    for label, start, end in ranges:
+        timeline, bucketing = timed(lambda: spending_timeline(times, amounts, start, end))
+        fig, building = timed(lambda: build_spending_timeline(timeline))
+        payload, serializing = timed(fig.to_json)
+        print(f"{label:>12} {timeline['unit']:>6} {len(timeline['starts']):>7,} {bucketing * 1e3:>10.1f} "
+              f"{building * 1e3:>10.1f} {serializing * 1e3:>8.1f} {len(payload) / 1024:>8.1f} KB")
+
+    def every_point():
+        return go.Figure(go.Scattergl(x=times.astype('datetime64[s]'), y=amounts, mode='markers'))
+
+    fig, building = timed(every_point)
+    payload, serializing = timed(fig.to_json)
+    print(f"{'raw points':>12} {'-':>6} {ROWS:>7,} {'-':>10} {building * 1e3:>10.1f} {serializing * 1e3:>8.1f} "
+          f"{len(payload) / 1024:>8.1f} KB")
+
+
+if __name__ == '__main__':
+    run()
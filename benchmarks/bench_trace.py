@@ -0,0 +1,44 @@
+"""Cost of a tracing span: no span, tracing off, and tracing on"""
+import timeit
+
+from resibo_trace import Tracer
+
+SPANS = 1_000_000
+
+
+def run():
+    off = Tracer(enabled=False)
+    on = Tracer(enabled=True)
+
+    def bare():
+        for _ in range(SPANS):
+            pass
+
+    def traced(tracer):
+        def loop():
+            span = tracer.span
+            for _ in range(SPANS):
+                with span('step'):
+                    pass
+        return loop
+
+    def traced_on():
+        # A run per 1000 spans, about what a long rerun records, so the run doesn't grow unbounded
+        for _ in range(SPANS // 1000):
+            on.begin_run()
+            span = on.span
+            for _ in range(1000):
+                with span('step'):
+                    pass
+            on.end_run()
+
+    baseline = min(timeit.repeat(bare, number=1, repeat=5))
+    print(f"{'no span':>12}: {baseline / SPANS * 1e9:>7.0f} ns/iteration")
+    for label, func in [('tracing off', traced(off)), ('tracing on', traced_on)]:
+        seconds = min(timeit.repeat(func, number=1, repeat=5))
+        print(f"{label:>12}: {seconds / SPANS * 1e9:>7.0f} ns/span "
+              f"(+{(seconds - baseline) / SPANS * 1e9:.0f} ns over no span)")
+
+
+if __name__ == '__main__':
+    run()
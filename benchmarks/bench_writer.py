@@ -0,0 +1,77 @@
+"""Saves per second under a burst, direct commits vs the write-behind queue,
+and what a crash loses
+
+The crash runs submit a burst in a child process and then either exit
+normally (the queue is flushed at exit) or die with os._exit, which skips
+the flush like kill -9 would.
+"""
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.corpus import expenses
+from resibo_storage import SQLiteExpenseStore
+
+BURST = 20_000
+CRASH_BURST = 5_000
+ROOT = Path(__file__).resolve().parent.parent
+
+CHILD = r'''
+import os, sys
+sys.path.insert(0, sys.argv[3])
+from benchmarks.corpus import expenses
+from resibo_storage import SQLiteExpenseStore
+store = SQLiteExpenseStore(sys.argv[1])
+for expense in expenses(int(sys.argv[4]), seed=5):
+    store.submit([expense])
+if sys.argv[2] == 'crash':
+    os._exit(0)
+'''
+
+
+def saved_rows(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM expenses").fetchone()[0]
+
+
+def burst(submit, rows):
+    """Seconds until every save returned, and until it was on disk"""
+    store = SQLiteExpenseStore(os.path.join(tempfile.mkdtemp(), 'bench.db'))
+    start = time.perf_counter()
+    for expense in rows:
+        (store.submit if submit else store.add_many)([expense])
+    returned = time.perf_counter() - start
+    store.flush()
+    durable = time.perf_counter() - start
+    assert saved_rows(store.path) == len(rows)
+    store.close()
+    return returned, durable, store._writer.batches if submit else len(rows)
+
+
+def crash_run(mode):
+    path = os.path.join(tempfile.mkdtemp(), 'crash.db')
+    subprocess.run([sys.executable, '-c', CHILD, path, mode, str(ROOT), str(CRASH_BURST)], check=True)
+    return saved_rows(path)
+
+
+def run():
+    rows = expenses(BURST, seed=5)
+    print(f"burst of {BURST} single-expense saves")
+    for label, submit in [('add (commit each)', False), ('submit (write-behind)', True)]:
+        returned, durable, commits = burst(submit, rows)
+        print(f"  {label:<22} {BURST / returned:>9,.0f} saves/s returned, "
+              f"{BURST / durable:>9,.0f} saves/s on disk, {commits} commits")
+
+    clean = crash_run('exit')
+    assert clean == CRASH_BURST, clean
+    crashed = crash_run('crash')
+    print(f"clean exit: {clean}/{CRASH_BURST} saved; "
+          f"os._exit right after the burst: {crashed}/{CRASH_BURST} saved")
+
+
+if __name__ == '__main__':
+    run()
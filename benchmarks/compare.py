@@ -0,0 +1,34 @@
+"""Compare two benchmark result files
+
+    python -m benchmarks.compare baseline.json candidate.json
+
+Ratios above 1 mean the candidate is faster.
+"""
+import json
+import sys
+
+
+def load(path):
+    with open(path) as f:
+        data = json.load(f)
+    return {(r['name'], json.dumps(r['params'], sort_keys=True)): r for r in data['results']}
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 2:
+        sys.exit(__doc__)
+    baseline, candidate = load(argv[0]), load(argv[1])
+    print(f"{'benchmark':<50} {'baseline us':>12} {'candidate us':>13} {'ratio':>7}")
+    for key, old in baseline.items():
+        new = candidate.get(key)
+        if new is None:
+            continue
+        name, params = key
+        label = f"{name} {' '.join(f'{k}={v}' for k, v in json.loads(params).items())}"
+        print(f"{label:<50} {old['us_per_op']:>12.3f} {new['us_per_op']:>13.3f} "
+              f"{old['us_per_op'] / new['us_per_op']:>6.2f}x")
+
+
+if __name__ == '__main__':
+    main()
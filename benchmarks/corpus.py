@@ -0,0 +1,93 @@
+"""Deterministic synthetic expense data for the benchmarks
+
+Everything is generated from a seeded random.Random, so two runs with the
+same arguments see exactly the same messages, rows and categories.
+"""
+import random
+import string
+from datetime import datetime, timedelta
+
+from resibo_parser import CATEGORY_KEYWORDS, LANGUAGE_PATTERNS
+
+ITEMS = [keyword for keywords in CATEGORY_KEYWORDS.values() for keyword in keywords]
+CATEGORIES = list(CATEGORY_KEYWORDS)
+
+# How people write the amount: bare, with a ₱ sign, or with a pesos/php unit
+AMOUNT_FORMATS = ['{n}', '₱{n}', '₱ {n}', '{n} pesos', '{n} peso', '{n}php', '{n} PHP']
+
+# {verb} comes from LANGUAGE_PATTERNS, so each phrase carries its language's keywords
+PHRASE_TEMPLATES = {
+    'english': [
+        "{item} {amount}",
+        "I spent {amount} for {item}",
+        "Bought {item} for {amount}",
+        "Paid {amount} for {item}",
+        "{item}, {amount}",
+    ],
+    'tagalog': [
+        "{verb} ako ng {item} sa halagang {amount}",
+        "{verb} ako ng {amount} para sa {item}",
+        "{verb} ko sa {item} {amount}",
+        "{item} {amount} {verb}",
+    ],
+    'bisaya': [
+        "{verb} nako sa {item} kay {amount}",
+        "{verb} nako nga {item} {amount}",
+        "{verb} nako {amount} sa {item}",
+    ],
+}
+
+
+def random_amount(rng):
+    """Peso amount skewed towards small everyday spends"""
+    if rng.random() < 0.8:
+        return str(rng.randint(5, 500))
+    if rng.random() < 0.5:
+        return f"{rng.randint(5, 500)}.{rng.randint(0, 99):02d}"
+    return str(rng.randint(500, 20000))
+
+
+def messages(count, seed=0):
+    """Chat-style expense messages in English, Tagalog and Bisaya"""
+    rng = random.Random(seed)
+    languages = list(PHRASE_TEMPLATES)
+    result = []
+    for _ in range(count):
+        language = rng.choice(languages)
+        verb = rng.choice(LANGUAGE_PATTERNS[language]) if language in LANGUAGE_PATTERNS else ''
+        amount = rng.choice(AMOUNT_FORMATS).format(n=random_amount(rng))
+        phrase = rng.choice(PHRASE_TEMPLATES[language]).format(
+            verb=verb, item=rng.choice(ITEMS), amount=amount)
+        result.append(phrase.capitalize() if rng.random() < 0.3 else phrase)
+    return result
+
+
+def expense_rows(count, seed=0, start=datetime(2023, 1, 1)):
+    """(id, amount, item, category, timestamp) tuples, about one every 90 seconds"""
+    rng = random.Random(seed)
+    return [
+        (idx + 1, round(rng.uniform(5, 2000), 2), rng.choice(ITEMS), rng.choice(CATEGORIES),
+         (start + timedelta(seconds=idx * 90)).strftime("%Y-%m-%d %H:%M:%S"))
+        for idx in range(count)
+    ]
+
+
+def expenses(count, seed=0):
+    """The same data as expense_rows(), as dicts ready for ExpenseStore.add_many"""
+    return [
+        {'amount': amount, 'item': item, 'category': category, 'timestamp': timestamp}
+        for _, amount, item, category, timestamp in expense_rows(count, seed)
+    ]
+
+
+def random_word(rng, low=4, high=9):
+    return ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(low, high)))
+
+
+def custom_categories(count, keywords_per_category=5, seed=0):
+    """User-style custom categories with random keywords"""
+    rng = random.Random(seed)
+    return {
+        f'Custom {idx}': [random_word(rng) for _ in range(keywords_per_category)]
+        for idx in range(count)
+    }
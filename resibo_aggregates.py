@@ -0,0 +1,87 @@
+"""Running expense totals for the sidebar and the Analytics tiles"""
+from bisect import bisect_left, insort
+
+
+class ExpenseAggregates:
+    """Total, count and per-category sums kept up to date on every change
+
+    Attach it to an expense store and it is loaded once from the database,
+    then updated on every save, delete and clear, so reading the numbers
+    never touches the expense history. Category totals are also kept in
+    ranked order, so top_categories(k) is O(k) rather than a sort.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.total = 0.0
+        self.count = 0
+        self.category_sums = {}
+        self.category_counts = {}
+        self._ranked = []  # (-total, category), largest total first
+
+    def load(self, store):
+        """Rebuild from the store's per-category totals"""
+        self.clear()
+        for category, count, amount in store.category_stats():
+            self.category_sums[category] = amount
+            self.category_counts[category] = count
+            self.total += amount
+            self.count += count
+        self._ranked = sorted((-amount, category) for category, amount in self.category_sums.items())
+
+    def _rerank(self, category, old, new):
+        # A new list rather than an in-place edit, so readers on other threads never see it half done
+        ranked = self._ranked.copy()
+        if old is not None:
+            del ranked[bisect_left(ranked, (-old, category))]
+        if new is not None:
+            insort(ranked, (-new, category))
+        self._ranked = ranked
+
+    def add(self, expense):
+        category = expense['category']
+        old = self.category_sums.get(category)
+        self.total += expense['amount']
+        self.count += 1
+        self.category_sums[category] = (old or 0.0) + expense['amount']
+        self.category_counts[category] = self.category_counts.get(category, 0) + 1
+        self._rerank(category, old, self.category_sums[category])
+
+    def remove(self, expense):
+        category = expense['category']
+        old = self.category_sums.get(category)
+        if self.category_counts.get(category, 0) <= 1:
+            self.category_sums.pop(category, None)
+            self.category_counts.pop(category, None)
+        else:
+            self.category_sums[category] -= expense['amount']
+            self.category_counts[category] -= 1
+        if old is not None:
+            self._rerank(category, old, self.category_sums.get(category))
+        self.count -= 1
+        # Reset instead of letting float error accumulate once everything is gone
+        self.total = self.total - expense['amount'] if self.count else 0.0
+
+    def recategorize(self, changes):
+        """Move the amounts of (old, new) expense pairs between categories, re-ranking once"""
+        sums, counts = self.category_sums, self.category_counts
+        for old, new in changes:
+            amount = old['amount']
+            sums[old['category']] -= amount
+            counts[old['category']] -= 1
+            sums[new['category']] = sums.get(new['category'], 0.0) + amount
+            counts[new['category']] = counts.get(new['category'], 0) + 1
+        for category in [category for category, count in counts.items() if not count]:
+            del sums[category], counts[category]
+        self._ranked = sorted((-amount, category) for category, amount in sums.items())
+
+    @property
+    def average(self):
+        return self.total / self.count if self.count else 0.0
+
+    def top_categories(self, limit=None):
+        """(category, total) pairs, largest first"""
+        ranked = self._ranked
+        return [(category, -total) for total, category in (ranked[:limit] if limit is not None else ranked)]
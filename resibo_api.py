@@ -0,0 +1,334 @@
+"""Headless HTTP API over the parser and expense storage
+
+    uvicorn resibo_api:app
+
+For services that log expenses without the Streamlit UI (SMS forwarders,
+chat bots). Every endpoint takes an optional "user", as in the app's
+multi-user mode; without it requests use the shared default ledger.
+
+    POST /parse        {"text"}                     process_expense_input result
+    POST /expenses     {"amount", "item", "category"?, "timestamp"?, "skip_duplicates"?}
+    GET  /expenses     ?limit=                      newest expenses first, up to MAX_LIMIT
+    POST /batch        {"messages": [...], "save"?, "skip_duplicates"?}
+                                                    one result per message; with
+                                                    save, a ready one that can't be
+                                                    saved becomes 'invalid'
+    GET  /aggregates                                the sidebar's numbers
+    GET  /export       ?format=csv|parquet|arrow    the whole history, streamed
+
+Parsing and SQLite calls are blocking, so handlers run them in the thread
+pool and the event loop only moves JSON.
+"""
+import contextlib
+import threading
+from datetime import datetime
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+from resibo_aggregates import ExpenseAggregates
+from resibo_bulk import parse_lines
+from resibo_classifier import CategoryClassifier
+from resibo_dedup import DuplicateIndex
+from resibo_export import FORMATS as EXPORT_FORMATS, export_chunks
+from resibo_matcher import KeywordMatcher
+from resibo_parser import categorize_item, process_expense_input
+from resibo_ranking import ExpenseRanking
+from resibo_storage import DEFAULT_DB_PATH, DEFAULT_USER, SQLiteBackend, period_buckets, summarize_rollup
+
+MAX_BATCH = 10_000
+MAX_LIMIT = 1_000
+RECENT_LIMIT = 3
+TOP_CATEGORIES = 3
+
+
+class BadRequest(Exception):
+    """Invalid request body or parameters, reported as HTTP 400"""
+
+
+class ExpenseService:
+    """The blocking work behind the endpoints, shared by every request"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._aggregates = {}
+        self._rankings = {}
+        self._duplicates = {}
+        self._settings = {}
+        self._lock = threading.Lock()
+
+    def store(self, user_id):
+        store = self.backend.store(user_id)
+        store.sync()
+        return store
+
+    def aggregates(self, user_id):
+        with self._lock:
+            if user_id not in self._aggregates:
+                self._aggregates[user_id] = self.backend.store(user_id).attach(ExpenseAggregates())
+            return self._aggregates[user_id]
+
+    def ranking(self, user_id):
+        with self._lock:
+            if user_id not in self._rankings:
+                self._rankings[user_id] = self.backend.store(user_id).attach(ExpenseRanking())
+            return self._rankings[user_id]
+
+    def duplicates(self, user_id):
+        with self._lock:
+            if user_id not in self._duplicates:
+                self._duplicates[user_id] = self.backend.store(user_id).attach(DuplicateIndex())
+            return self._duplicates[user_id]
+
+    def settings(self, user_id):
+        """(revision, custom categories, their matcher, learned classifier) for the user
+
+        Rebuilt only when the store's settings revision moves, so a request
+        costs one lookup instead of rereading every category and correction.
+        """
+        store = self.store(user_id)
+        revision = store.settings_revision()
+        with self._lock:
+            cached = self._settings.get(user_id)
+        if cached is None or cached[0] != revision:
+            # Read after the revision, so a change in between only costs another rebuild
+            categories = store.custom_categories()
+            cached = (revision, categories, KeywordMatcher(categories), CategoryClassifier().load(store.overrides()))
+            with self._lock:
+                self._settings[user_id] = cached
+        return cached
+
+    def custom_matcher(self, user_id):
+        return self.settings(user_id)[2]
+
+    def classifier(self, user_id):
+        return self.settings(user_id)[3]
+
+    def parse(self, text, user_id):
+        return process_expense_input(text, self.custom_matcher(user_id), self.classifier(user_id))
+
+    def save(self, expenses, user_id, skip_duplicates=False, within_batch=True):
+        """Save expenses and set each one's 'id' and 'duplicate_of'
+
+        duplicate_of is the id of the saved expense (or, with within_batch,
+        earlier one in the batch) it repeats, or None. With skip_duplicates
+        a repeat is not saved again and takes the id of the expense it repeats.
+        """
+        if any(expense['category'] is None for expense in expenses):
+            matcher = self.custom_matcher(user_id)
+            classifier = self.classifier(user_id)
+            for expense in expenses:
+                expense['category'] = expense['category'] or categorize_item(expense['item'], matcher, classifier)
+        duplicates = self.duplicates(user_id)
+        store = self.store(user_id)
+        originals = duplicates.find_many(expenses, within_batch)
+        fresh = [expense for expense, original in zip(expenses, originals) if original is None or not skip_duplicates]
+        for expense, expense_id in zip(fresh, store.add_many(fresh) if fresh else ()):
+            expense['id'] = expense_id
+        # In batch order, so an earlier repeat has its id before anything repeating it
+        for expense, original in zip(expenses, originals):
+            expense['duplicate_of'] = None if original is None else original['id']
+            if original is not None and skip_duplicates:
+                expense['id'] = original['id']
+        return expenses
+
+    def recent(self, user_id, limit):
+        ranking = self.ranking(user_id)
+        self.store(user_id)  # sync() brings the ranking up to date with other processes
+        return ranking.recent(limit)
+
+    def summary(self, user_id):
+        """The sidebar's numbers: today's total and top categories, this week and month, recent expenses
+
+        Plus all-time count, total, average and top categories.
+        """
+        aggregates = self.aggregates(user_id)
+        ranking = self.ranking(user_id)
+        store = self.store(user_id)
+        buckets = period_buckets(now())
+        today, today_categories = summarize_rollup(store.rollup('day', buckets['day']))
+        this_week, _ = summarize_rollup(store.rollup('week', buckets['week']))
+        months = store.rollup('month', buckets['month'] - 1, buckets['month'])
+        this_month, _ = summarize_rollup([row for row in months if row[0] == buckets['month']])
+        last_month, _ = summarize_rollup([row for row in months if row[0] != buckets['month']])
+        return {
+            'count': aggregates.count,
+            'total': aggregates.total,
+            'average': aggregates.average,
+            'top_categories_today': [
+                {'category': category, 'total': float(total)}
+                for category, total in today_categories[:TOP_CATEGORIES]
+            ],
+            'top_categories_all_time': [
+                {'category': category, 'total': total}
+                for category, total in aggregates.top_categories(TOP_CATEGORIES)
+            ],
+            'today': float(today),
+            'this_week': float(this_week),
+            'this_month': float(this_month),
+            'last_month': float(last_month),
+            'recent': ranking.recent(RECENT_LIMIT),
+        }
+
+    def batch(self, messages, user_id, save, skip_duplicates=False):
+        _, categories, _, classifier = self.settings(user_id)
+        results = parse_lines(messages, categories, classifier=classifier)
+        if save:
+            timestamp = now()
+            ready, expenses = [], []
+            for result in results:
+                if result['status'] != 'ready':
+                    continue
+                try:
+                    expenses.append(expense_from(result, timestamp))
+                except BadRequest as error:
+                    # e.g. "free lunch 0": parsed, but not something to save
+                    result['status'] = 'invalid'
+                    result['error'] = str(error)
+                    continue
+                ready.append(result)
+            # Every line gets the same timestamp, and a day's notes may well
+            # repeat ("jeep 15" twice), so only already-saved expenses count
+            saved = self.save(expenses, user_id, skip_duplicates, within_batch=False) if expenses else ()
+            for result, expense in zip(ready, saved):
+                result['id'] = expense['id']
+                result['duplicate_of'] = expense['duplicate_of']
+        return results
+
+
+def now():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def expense_from(body, timestamp=None):
+    """Validate an expense from a request body or a parse result; category may be None"""
+    amount = body.get('amount')
+    item = body.get('item')
+    if isinstance(amount, bool) or not isinstance(amount, (int, float)) or amount <= 0:
+        raise BadRequest("amount must be a positive number")
+    if not isinstance(item, str) or not item.strip():
+        raise BadRequest("item must be a non-empty string")
+    category = body.get('category')
+    if category is not None and (not isinstance(category, str) or not category.strip()):
+        raise BadRequest("category must be a non-empty string or null")
+    timestamp = body.get('timestamp') or timestamp or now()
+    try:
+        datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S")
+    except (TypeError, ValueError):
+        raise BadRequest("timestamp must look like 2024-01-31 12:00:00")
+    return {
+        'amount': float(amount),
+        'item': item,
+        'category': category,
+        'timestamp': timestamp,
+    }
+
+
+async def read_json(request):
+    try:
+        body = await request.json()
+    except ValueError:
+        raise BadRequest("body must be JSON")
+    if not isinstance(body, dict):
+        raise BadRequest("body must be a JSON object")
+    return body
+
+
+def user_of(request, body=None):
+    user_id = (body or {}).get('user', request.query_params.get('user', DEFAULT_USER))
+    if not isinstance(user_id, str):
+        raise BadRequest("user must be a string")
+    return user_id
+
+
+async def parse(request):
+    body = await read_json(request)
+    text = body.get('text')
+    if not isinstance(text, str):
+        raise BadRequest("text must be a string")
+    service = request.app.state.service
+    return JSONResponse(await run_in_threadpool(service.parse, text, user_of(request, body)))
+
+
+async def save_expense(request):
+    body = await read_json(request)
+    expense = expense_from(body)
+    service = request.app.state.service
+    skip = bool(body.get('skip_duplicates'))
+    saved, = await run_in_threadpool(service.save, [expense], user_of(request, body), skip)
+    # 200, not 201, when the expense was already there and nothing new was saved
+    return JSONResponse(saved, status_code=200 if skip and saved['duplicate_of'] is not None else 201)
+
+
+async def list_expenses(request):
+    try:
+        limit = int(request.query_params.get('limit', 20))
+    except ValueError:
+        raise BadRequest("limit must be an integer")
+    if not 1 <= limit <= MAX_LIMIT:
+        raise BadRequest(f"limit must be between 1 and {MAX_LIMIT}")
+    service = request.app.state.service
+    return JSONResponse(await run_in_threadpool(service.recent, user_of(request), limit))
+
+
+async def batch(request):
+    body = await read_json(request)
+    messages = body.get('messages')
+    if not isinstance(messages, list) or not all(isinstance(text, str) for text in messages):
+        raise BadRequest("messages must be an array of strings")
+    if len(messages) > MAX_BATCH:
+        raise BadRequest(f"at most {MAX_BATCH} messages per batch")
+    service = request.app.state.service
+    results = await run_in_threadpool(service.batch, messages, user_of(request, body),
+                                      bool(body.get('save')), bool(body.get('skip_duplicates')))
+    return JSONResponse(results)
+
+
+async def aggregates(request):
+    service = request.app.state.service
+    return JSONResponse(await run_in_threadpool(service.summary, user_of(request)))
+
+
+async def export(request):
+    fmt = request.query_params.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        raise BadRequest(f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    _, extension, mime = EXPORT_FORMATS[fmt]
+    store = await run_in_threadpool(request.app.state.service.store, user_of(request))
+    # A plain iterator: Starlette pulls each chunk in the thread pool
+    return StreamingResponse(export_chunks(store, fmt), media_type=mime, headers={
+        'Content-Disposition': f'attachment; filename="resibo_expenses.{extension}"',
+    })
+
+
+async def bad_request(request, exc):
+    return JSONResponse({'error': str(exc)}, status_code=400)
+
+
+def create_app(path=DEFAULT_DB_PATH):
+    """The API as an ASGI app; the database is opened at startup"""
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        backend = SQLiteBackend(path)
+        app.state.service = ExpenseService(backend)
+        yield
+        backend.close()
+
+    return Starlette(
+        routes=[
+            Route('/parse', parse, methods=['POST']),
+            Route('/expenses', save_expense, methods=['POST']),
+            Route('/expenses', list_expenses, methods=['GET']),
+            Route('/batch', batch, methods=['POST']),
+            Route('/aggregates', aggregates, methods=['GET']),
+            Route('/export', export, methods=['GET']),
+        ],
+        exception_handlers={BadRequest: bad_request},
+        lifespan=lifespan,
+    )
+
+
+app = create_app()
@@ -1,8 +1,24 @@
+import functools
+import os
 import streamlit as st
-import pandas as pd
 from datetime import datetime
-import re
-import random
+from pathlib import Path
+import uuid
+from resibo_aggregates import ExpenseAggregates
+from resibo_bulk import parse_lines, split_lines
+from resibo_cache import VersionedCache
+from resibo_chat import ChatHistory
+from resibo_classifier import CategoryClassifier
+from resibo_dedup import DuplicateIndex, find_duplicates
+from resibo_export import FORMATS as EXPORT_FORMATS, ExportReader
+from resibo_history import ItemIndex, refile
+from resibo_insights import build_category_pie, build_top_categories_bar, generate_spending_insights
+from resibo_matcher import KeywordMatcher
+from resibo_messages import get_catalog
+from resibo_parser import CATEGORY_KEYWORDS, categorize_item, get_response_text, process_expense_input
+from resibo_ranking import ExpenseRanking
+from resibo_storage import DEFAULT_USER, SQLiteBackend, period_buckets, summarize_rollup
+from resibo_trace import TRACER, build_waterfall
 
 # Page configuration
 st.set_page_config(
@@ -12,839 +28,708 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Custom CSS - Airbnb-inspired design
-st.markdown("""
-<style>
-    /* Import Inter font */
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;600;700&display=swap');
-    
-    /* Global styles */
-    * {
-        font-family: 'Inter', sans-serif;
-    }
-    
-    /* Dark mode colors */
-    :root {
-        --bg-primary: #0F1419;
-        --bg-surface: #1A1F26;
-        --bg-elevated: #242B33;
-        --border-color: #2D3339;
-        --text-primary: #FFFFFF;
-        --text-secondary: #8E949E;
-        --accent: #10B981;
-        --accent-hover: #059669;
-    }
-    
-    /* Main container */
-    .main {
-        background-color: var(--bg-primary);
-        padding: 0;
-    }
-    
-    /* Sidebar */
-    [data-testid="stSidebar"] {
-        background-color: var(--bg-surface);
-        border-right: 1px solid var(--border-color);
-        padding-top: 2rem;
-    }
-    
-    [data-testid="stSidebar"] .element-container {
-        padding: 0.5rem 1rem;
-    }
-    
-    /* Hide default streamlit elements */
-    #MainMenu {visibility: hidden;}
-    footer {visibility: hidden;}
-    header {visibility: hidden;}
-    
-    /* Card style */
-    .card {
-        background-color: var(--bg-surface);
-        border-radius: 12px;
-        padding: 1.5rem;
-        margin-bottom: 1rem;
-        border: 1px solid var(--border-color);
-        box-shadow: 0 1px 3px rgba(0,0,0,0.3);
-    }
-    
-    /* Chat message styles */
-    .user-message {
-        background-color: var(--bg-elevated);
-        border-radius: 12px;
-        padding: 0.75rem 1rem;
-        margin: 0.5rem 0;
-        margin-left: auto;
-        max-width: 70%;
-        text-align: right;
-        color: var(--text-primary);
-    }
-    
-    .assistant-message {
-        background-color: var(--bg-surface);
-        border-radius: 12px;
-        padding: 0.75rem 1rem;
-        margin: 0.5rem 0;
-        max-width: 70%;
-        border-left: 3px solid var(--accent);
-        color: var(--text-primary);
-    }
-    
-    /* Buttons */
-    .stButton > button {
-        background-color: var(--accent);
-        color: white;
-        border: none;
-        border-radius: 8px;
-        padding: 0.75rem 1.5rem;
-        font-weight: 600;
-        transition: all 0.2s;
-        width: 100%;
-    }
-    
-    .stButton > button:hover {
-        background-color: var(--accent-hover);
-        transform: translateY(-1px);
-        box-shadow: 0 4px 12px rgba(16, 185, 129, 0.3);
-    }
-    
-    /* Input box */
-    .stTextInput > div > div > input {
-        background-color: var(--bg-surface);
-        border: 1px solid var(--border-color);
-        border-radius: 8px;
-        color: var(--text-primary);
-        padding: 0.75rem 1rem;
-    }
-    
-    .stTextInput > div > div > input:focus {
-        border-color: var(--accent);
-        box-shadow: 0 0 0 2px rgba(16, 185, 129, 0.2);
-    }
-    
-    /* Metrics */
-    [data-testid="stMetricValue"] {
-        color: var(--accent);
-        font-size: 1.5rem;
-        font-weight: 700;
-    }
-    
-    /* Selectbox */
-    .stSelectbox > div > div {
-        background-color: var(--bg-surface);
-        border: 1px solid var(--border-color);
-        border-radius: 8px;
-    }
-    
-    /* Headers */
-    h1, h2, h3 {
-        color: var(--text-primary);
-        font-weight: 700;
-    }
-    
-    /* Text */
-    p, span, div {
-        color: var(--text-secondary);
-    }
-    
-    /* Expander */
-    .streamlit-expanderHeader {
-        background-color: var(--bg-surface);
-        border-radius: 8px;
-        border: 1px solid var(--border-color);
-    }
-    
-    /* Fixed chat input container */
-    .fixed-chat-container {
-        position: fixed;
-        bottom: 0;
-        left: 0;
-        right: 0;
-        background-color: var(--bg-primary);
-        padding: 1rem;
-        border-top: 1px solid var(--border-color);
-        z-index: 999;
-        box-shadow: 0 -4px 12px rgba(0,0,0,0.4);
-    }
-    
-    /* Welcome card */
-    .welcome-card {
-        background: linear-gradient(135deg, var(--bg-surface) 0%, var(--bg-elevated) 100%);
-        border-radius: 16px;
-        padding: 3rem 2rem;
-        text-align: center;
-        border: 1px solid var(--border-color);
-        margin: 2rem 0;
-    }
-    
-    .welcome-title {
-        font-size: 2rem;
-        font-weight: 700;
-        color: var(--text-primary);
-        margin-bottom: 1rem;
-    }
-    
-    .welcome-subtitle {
-        font-size: 1.1rem;
-        color: var(--text-secondary);
-        margin-bottom: 2rem;
-    }
-    
-    .feature-list {
-        text-align: left;
-        max-width: 500px;
-        margin: 0 auto;
-    }
-    
-    .feature-item {
-        display: flex;
-        align-items: center;
-        padding: 0.5rem 0;
-        color: var(--text-primary);
-    }
-</style>
-""", unsafe_allow_html=True)
+# Timing spans for this rerun; a no-op unless RESIBO_TRACE=1 or enabled in Settings
+TRACER.begin_run()
+
+# Custom CSS - Airbnb-inspired design, served from static/resibo.css
+STYLESHEET = Path(__file__).parent / 'static' / 'resibo.css'
+
+@st.cache_resource
+def load_stylesheet():
+    """Read the stylesheet once per server process"""
+    return STYLESHEET.read_text(encoding='utf-8')
+
+def inject_styles():
+    """Apply the stylesheet without resending it on every rerun"""
+    if st.get_option("server.enableStaticServing"):
+        # A tiny link tag per rerun; the browser fetches and caches the file once
+        st.markdown('<link rel="stylesheet" href="app/static/resibo.css">', unsafe_allow_html=True)
+    else:
+        st.markdown(f"<style>{load_stylesheet()}</style>", unsafe_allow_html=True)
+
+with TRACER.span('inject_styles'):
+    inject_styles()
+
+# Multi-user mode: each ?user=<name> gets its own expenses and categories
+MULTI_USER = os.environ.get('RESIBO_MULTI_USER') == '1'
+# Whether ?debug=1 may switch tracing on and off for the whole server
+TRACE_TOGGLE = os.environ.get('RESIBO_TRACE_TOGGLE') == '1'
+
+@st.cache_resource
+def get_backend():
+    """Open the expense database once per server process"""
+    backend = SQLiteBackend()
+    # Sessions don't outlive the server, so neither does their spilled chat
+    backend.store().clear_messages()
+    return backend
+
+def get_store(user_id):
+    """The user's store, shared by all of their sessions"""
+    return get_backend().store(user_id)
+
+@st.cache_resource
+def get_aggregates(user_id):
+    """Running totals shared by the user's sessions and kept in step with the store"""
+    return get_store(user_id).attach(ExpenseAggregates())
+
+@st.cache_resource
+def get_classifier(user_id):
+    """Categorizer trained on the user's past category corrections, shared by their sessions"""
+    return CategoryClassifier().load(get_store(user_id).overrides())
+
+@st.cache_resource
+def get_duplicates(user_id):
+    """The user's expenses of the last hour or so, hashed for spotting double saves"""
+    return get_store(user_id).attach(DuplicateIndex())
+
+@st.cache_resource
+def get_ranking(user_id):
+    """The user's newest and largest expenses, kept in step with the store"""
+    return get_store(user_id).attach(ExpenseRanking())
+
+@st.cache_resource
+def get_expense_table(user_id):
+    """Columnar copy of the user's history for Analytics and exports
+
+    Built on first use so the Home and Log pages never import NumPy/pandas.
+    """
+    from resibo_columns import ExpenseTable
+    return get_store(user_id).attach(ExpenseTable())
+
+@st.cache_resource
+def get_item_index(user_id):
+    """Which of the user's past expenses mention a keyword; built the first time categories change"""
+    return get_store(user_id).attach(ItemIndex())
+
+@st.cache_resource
+def get_render_cache():
+    """Insights and figures keyed on the store's data version"""
+    return VersionedCache(maxsize=32)
+
+def get_user_id():
+    """Who this session logs expenses for; everyone shares one ledger unless MULTI_USER"""
+    if not MULTI_USER:
+        return DEFAULT_USER
+    user_id = st.query_params.get('user', '').strip()
+    if not user_id:
+        st.markdown("### 💰 Resibo")
+        name = st.text_input("Your name", placeholder="Who's logging expenses?")
+        if name.strip():
+            st.query_params['user'] = name.strip()
+            st.rerun()
+        st.stop()
+    return user_id
+
+user_id = get_user_id()
+store = get_store(user_id)
+aggregates = get_aggregates(user_id)
+ranking = get_ranking(user_id)
+duplicates = get_duplicates(user_id)
+classifier = get_classifier(user_id)
+store.sync()
 
 # Initialize session state
-if 'expenses' not in st.session_state:
-    st.session_state.expenses = []
 if 'pending_expense' not in st.session_state:
     st.session_state.pending_expense = None
 if 'chat_history' not in st.session_state:
-    st.session_state.chat_history = []
+    st.session_state.chat_history = ChatHistory(store, uuid.uuid4().hex)
 if 'custom_categories' not in st.session_state:
-    st.session_state.custom_categories = {}
+    st.session_state.custom_categories = store.custom_categories()
 if 'current_page' not in st.session_state:
     st.session_state.current_page = 'home'
-if 'show_load_more' not in st.session_state:
-    st.session_state.show_load_more = False
-if 'messages_to_show' not in st.session_state:
-    st.session_state.messages_to_show = 10
-
-# Language detection keywords
-LANGUAGE_PATTERNS = {
-    'tagalog': ['bumili', 'binili', 'binayad', 'bayad', 'gastos', 'gumastos', 'nagbayad'],
-    'bisaya': ['plete', 'palit', 'gipalit', 'gibayad', 'bayad', 'gasto']
-}
+if 'chat_cursors' not in st.session_state:
+    st.session_state.chat_cursors = []
+if 'bulk_results' not in st.session_state:
+    st.session_state.bulk_results = None
+if 'duplicate_scan' not in st.session_state:
+    st.session_state.duplicate_scan = None
+if 'timeline_zoom' not in st.session_state:
+    st.session_state.timeline_zoom = []  # (start, end) epoch seconds, innermost last
+    st.session_state.timeline_key = 0
+if 'custom_matcher' not in st.session_state:
+    st.session_state.custom_matcher = KeywordMatcher(st.session_state.custom_categories)
+if 'notices' not in st.session_state:
+    st.session_state.notices = {}  # fragment key -> (st function name, message) to show once
+# Keys of the fragments drawn by this full run; invalidate() only reruns these
+st.session_state.fragments_shown = set()
 
-# Category keywords for auto-classification
-CATEGORY_KEYWORDS = {
-    'Food & Dining': [
-        'food', 'meal', 'lunch', 'dinner', 'breakfast', 'snack', 'merienda',
-        'rice', 'bigas', 'ulam', 'kaon', 'pagkaon', 'sud-an',
-        'restaurant', 'jollibee', 'mcdo', 'mcdonald', 'kfc', 'pizza', 'burger',
-        'coffee', 'kape', 'starbucks', 'cafe', 'carinderia', 'turo-turo',
-        'grocery', 'groceries', 'palengke', 'market', 'supermarket', 'sari-sari',
-        'vegetables', 'gulay', 'meat', 'karne', 'fish', 'isda', 'fruits', 'prutas', 'egg', 'itlog'
-    ],
-    'Transport': [
-        'transport', 'fare', 'plete', 'pamasahe', 
-        'jeep', 'jeepney', 'tricycle', 'trike', 'habal-habal', 'motor',
-        'bus', 'taxi', 'grab', 'angkas', 'uber', 'sakay',
-        'gas', 'gasolina', 'diesel', 'fuel', 'parking'
-    ],
-    'Bills & Utilities': [
-        'bill', 'bills', 'bayad', 'utilities',
-        'electric', 'electricity', 'kuryente', 'meralco',
-        'water', 'tubig', 'maynilad',
-        'internet', 'wifi', 'pldt', 'globe', 'smart',
-        'phone', 'mobile', 'postpaid', 'plan'
-    ],
-    'Shopping': [
-        'shopping', 'shop', 'clothes', 'clothing', 'damit',
-        'shirt', 'pants', 'shoes', 'sapatos', 'sandals', 'tsinelas',
-        'bag', 'wallet', 'watch', 'accessories',
-        'gadget', 'phone', 'cellphone', 'laptop', 'earphones', 'charger'
-    ],
-    'Health & Wellness': [
-        'health', 'medicine', 'gamot', 'bulong', 'tambal',
-        'doctor', 'doktor', 'hospital', 'clinic', 'checkup',
-        'vitamins', 'supplement', 'pharmacy', 'botika', 'mercury',
-        'gym', 'fitness', 'workout', 'yoga', 'massage', 'hilot'
-    ],
-    'Personal Care': [
-        'haircut', 'gupit', 'salon', 'barber', 'parlor',
-        'shampoo', 'soap', 'sabon', 'toothpaste', 'deodorant',
-        'cosmetics', 'makeup', 'skincare', 'lotion', 'perfume', 'pabango',
-        'grooming', 'beauty', 'nails', 'spa'
-    ],
-    'Entertainment': [
-        'entertainment', 'movie', 'cinema', 'netflix', 'spotify',
-        'concert', 'gig', 'show', 'theater',
-        'games', 'gaming', 'ps5', 'xbox', 'nintendo', 'mobile legends', 'ml',
-        'hobby', 'books', 'libro', 'magazine', 'comics'
-    ],
-    'Education': [
-        'education', 'school', 'eskwela', 'tuition', 'enrollment',
-        'books', 'libro', 'notebook', 'pen', 'ballpen', 'school supplies',
-        'course', 'training', 'seminar', 'workshop', 'online class',
-        'photocopies', 'xerox', 'print', 'printing'
-    ],
-    'Gifts & Others': [
-        'gift', 'regalo', 'birthday', 'kaarawan',
-        'donation', 'donasyon', 'charity', 'church', 'simbahan',
-        'offering', 'abuloy', 'contribution'
-    ],
-    'Miscellaneous': []
-}
+# The session tag lets the debug panel show a session only its own runs
+session_id = st.session_state.chat_history.session_id
+TRACER.annotate(page=st.session_state.current_page, user=user_id, session=session_id)
 
-def detect_language(text):
-    """Detect if text is in English, Tagalog, or Bisaya"""
-    text_lower = text.lower()
-    
-    for word in LANGUAGE_PATTERNS['tagalog']:
-        if word in text_lower:
-            return 'tagalog'
-    
-    for word in LANGUAGE_PATTERNS['bisaya']:
-        if word in text_lower:
-            return 'bisaya'
-    
-    return 'english'
-
-def extract_amount(text):
-    """Extract numerical amount from text"""
-    patterns = [
-        r'₱\s*(\d+(?:\.\d+)?)',
-        r'(\d+(?:\.\d+)?)\s*(?:pesos?|php)',
-        r'\b(\d+(?:\.\d+)?)\b'
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, text.lower())
-        if match:
-            return float(match.group(1))
-    
-    return None
+def categorize(item):
+    """Category a new expense for item would get right now"""
+    return categorize_item(item, st.session_state.custom_matcher, classifier)
 
-def extract_item(text, amount):
-    """Extract item/service from text"""
-    cleaned = re.sub(r'₱?\d+(?:\.\d+)?\s*(?:pesos?|php)?', '', text, flags=re.IGNORECASE)
-    
-    remove_words = ['bumili', 'binili', 'bought', 'paid', 'for', 'ako', 'ng', 'sa', 'nako', 'ko', 
-                    'gipalit', 'gibayad', 'spent', 'halagang', 'kay', 'og']
-    
-    for word in remove_words:
-        cleaned = re.sub(r'\b' + word + r'\b', '', cleaned, flags=re.IGNORECASE)
-    
-    cleaned = ' '.join(cleaned.split()).strip()
-    
-    return cleaned if cleaned else None
+def add_custom_category(name, keywords):
+    """Add or replace a custom category, update its matcher and refile past expenses
 
-def categorize_item(item_text):
-    """Auto-assign category based on item keywords"""
-    if not item_text:
-        return 'Miscellaneous'
-    
-    item_lower = item_text.lower()
-    
-    # First check custom categories
-    for category, keywords in st.session_state.custom_categories.items():
-        for keyword in keywords:
-            if keyword.lower() in item_lower:
-                return category
-    
-    # Then check default categories
-    for category, keywords in CATEGORY_KEYWORDS.items():
-        if category == 'Miscellaneous':
-            continue
-        for keyword in keywords:
-            if keyword in item_lower:
-                return category
-    
-    return 'Miscellaneous'
-
-def get_response_text(lang, message_type):
-    """Get localized response text"""
-    responses = {
-        'english': {
-            'missing_amount': "I couldn't find the amount. How much did you spend?",
-            'missing_item': "What did you buy or pay for?",
-            'confirm': "Should I save this?",
-            'saved': "✅ Saved!",
-            'cancelled': "Okay, not saved.",
-        },
-        'tagalog': {
-            'missing_amount': "Hindi ko makita ang halaga. Magkano ang ginastos mo?",
-            'missing_item': "Ano ang binili o binayaran mo?",
-            'confirm': "I-save ko ba ito?",
-            'saved': "✅ Na-save na!",
-            'cancelled': "Sige, hindi na-save.",
-        },
-        'bisaya': {
-            'missing_amount': "Wala koy makita nga kantidad. Pila man ang imong gigasto?",
-            'missing_item': "Unsa man ang imong gipalit o gibayaran?",
-            'confirm': "I-save ba nako ni?",
-            'saved': "✅ Na-save na!",
-            'cancelled': "Sige, wala na-save.",
-        }
-    }
-    
-    return responses[lang].get(message_type, "")
+    Only expenses whose item has one of the old or new keywords, is filed
+    under the category, or is in Miscellaneous (which a keyword can now
+    reach through a typo) are looked at. Returns how many moved.
+    """
+    history = get_item_index(user_id)
+    items = (history.containing(list(st.session_state.custom_categories.get(name, ())) + list(keywords))
+             | store.category_items(name) | store.category_items('Miscellaneous'))
+    before = {item: categorize(item) for item in items}
+    store.save_custom_category(name, keywords)
+    st.session_state.custom_categories[name] = keywords
+    st.session_state.custom_matcher.add(name, keywords)
+    return refile(store, history, before, categorize)
+
+def delete_custom_category(name):
+    """Delete a custom category, drop its keywords from the matcher and refile its expenses"""
+    history = get_item_index(user_id)
+    before = dict.fromkeys(store.category_items(name), name)
+    store.delete_custom_category(name)
+    del st.session_state.custom_categories[name]
+    st.session_state.custom_matcher.remove(name)
+    classifier.forget(name)
+    return refile(store, history, before, categorize)
+
+def learn_correction(item, category):
+    """Remember a category the user picked over the suggested one"""
+    store.save_override(item, category)
+    classifier.learn(item, category)
+
+def submit_expense_input():
+    """Parse what was typed into the chat box, then empty the box
+
+    As an on_change callback this runs once per entry; read on every
+    rerun, the text would be parsed (and the chat replied to) again.
+    """
+    user_input = st.session_state.expense_input
+    st.session_state.expense_input = ''
+    if not user_input.strip():
+        invalidate('input')
+        return
+    add_chat_message('user', user_input)
+    
+    with TRACER.span('process_expense_input'):
+        result = process_expense_input(user_input, st.session_state.custom_matcher, classifier)
+    
+    if result['status'] == 'ready':
+        st.session_state.pending_expense = result
+    else:
+        add_chat_message('assistant', result['message'])
+    invalidate('input', 'chat', 'pending')
+
+def find_duplicate(expense, timestamp):
+    """A saved expense that saving this one now would repeat, or None"""
+    return duplicates.find({'amount': expense['amount'], 'item': expense['item'],
+                            'category': expense['category'], 'timestamp': timestamp})
+
+def add_chat_message(role, content):
+    """Append to this session's chat and jump back to the newest messages"""
+    st.session_state.chat_history.append(role, content)
+    st.session_state.chat_cursors = []
+
+def get_all_categories():
+    """Sorted default and custom category names for pickers"""
+    all_categories = list(CATEGORY_KEYWORDS.keys()) + list(st.session_state.custom_categories.keys())
+    return sorted(set(all_categories))
 
 def calculate_total():
     """Calculate total expenses"""
-    if not st.session_state.expenses:
-        return 0
-    return sum(exp['amount'] for exp in st.session_state.expenses)
+    return aggregates.total
 
-def generate_conversational_confirmation(item, category, amount):
+def generate_conversational_confirmation(item, category, amount, confidence=1.0):
     """Generate conversational confirmation message"""
-    
-    category_emoji = {
-        'Food & Dining': '🍽️',
-        'Transport': '🚕',
-        'Shopping': '🛍️',
-        'Bills & Utilities': '💡',
-        'Entertainment': '🎮',
-        'Health & Wellness': '💊',
-        'Personal Care': '💇',
-        'Education': '📚',
-        'Gifts & Others': '🎁',
-        'Miscellaneous': '🗂️'
-    }
-    
-    emoji = category_emoji.get(category, '📝')
-    
-    # Main confirmation
-    confirmation = f"Copy that! Listed **₱{amount:,.2f}** under **{category}**. {emoji}"
-    
-    # Contextual witty comment
-    witty_comments = {
-        'Food & Dining': [
-            f"Itong \"{item}\" ba talaga yan? 😅",
-            "Busog ka na? 😋",
-            "Sarap nyan! 🤤",
-            "Kumain na ba? 🍴"
-        ],
-        'Transport': [
-            "Saan ka galing? 🛣️",
-            "Malayo ba byahe? 🚗",
-            "Traffic ba? 😅",
-            "Mahal na plete ngayon! 💸"
-        ],
-        'Shopping': [
-            "Need ba talaga yan? 😂",
-            "Sale ba to? 🏷️",
-            "Bagong bili! ✨",
-            "Shopping therapy? 💳"
-        ],
-        'Bills & Utilities': [
-            "Bayad muna bago gala! 💪",
-            "Adulting mode ON! 🎯",
-            "Responsible naman! 👏",
-            "No disconnection today! ✅"
-        ],
-        'Entertainment': [
-            "Enjoy mode activated! 🎉",
-            "You deserve it! ✨",
-            "Happy ka naman? 😊",
-            "Life is short! 🌟"
-        ],
-        'Health & Wellness': [
-            "Health is wealth! 💪",
-            "Alagaan ang sarili! 🌡️",
-            "Investment yan! 💯",
-            "Get well soon! 🏥"
-        ],
-        'Personal Care': [
-            "Pampaganda/poganda! ✨",
-            "Self-care is important! 💅",
-            "Bagong look? 😊",
-            "Treat yourself! 🧖"
-        ],
-        'Education': [
-            "Brain gains! 🧠",
-            "Keep learning! 🎓",
-            "Future-proofing! 💡",
-            "Knowledge is power! 📖"
-        ],
-        'Gifts & Others': [
-            "Mabait ka naman! 🎁",
-            "Good karma yan! ✨",
-            "Generous! 💝",
-            "Blessing others! 🙏"
-        ],
-        'Miscellaneous': [
-            f"Itong \"{item}\" noted! 📝",
-            "Saved! ✅",
-            "Got it! 👍",
-            "Copy that! 📋"
-        ]
-    }
-    
-    # Special case for high amounts
-    if amount >= 1000:
-        comments = [
-            f"Whoa! ₱{amount:,.0f}?! Big purchase yarn! 😮",
-            f"Worth it ba? 🤔",
-            "Big one! 💸"
-        ]
-        comment = random.choice(comments)
+    return get_catalog().confirmation(item, category, amount, confidence)
+
+def show_page(page):
+    """Switch pages; as a button callback this costs one rerun, not two"""
+    st.session_state.current_page = page
+
+def notify(key, kind, message):
+    """Show message with st.<kind> (success, error, ...) the next time fragment key runs"""
+    st.session_state.notices[key] = (kind, message)
+
+def show_notice(key):
+    notice = st.session_state.notices.pop(key, None)
+    if notice is not None:
+        kind, message = notice
+        getattr(st, kind)(message)
+
+# Parts of the page that rerun on their own, and the data each shows. An
+# action calls invalidate() with what it changed, and only the fragments on
+# screen that show any of it rerun: a save reruns the sidebar summary, the
+# chat and the confirmation, not the stylesheet, navigation or the rest.
+FRAGMENT_TOPICS = {
+    'summary': {'expenses'},
+    'bulk_add': {'bulk', 'categories'},
+    'chat_log': {'chat'},
+    'pending_expense': {'pending', 'expenses', 'categories'},
+    'chat_input': {'input'},
+    'analytics': {'expenses'},
+    'timeline': {'expenses', 'timeline'},
+    'insights': {'expenses', 'insights'},
+    'settings': {'expenses', 'categories', 'duplicates'},
+}
+
+def fragment(key):
+    """st.fragment that invalidate() can rerun by key; reruns of it alone are traced as their own runs"""
+    def decorate(func):
+        @st.fragment(key=key)
+        @functools.wraps(func)
+        def run_fragment():
+            shown = st.session_state.fragments_shown
+            if key in shown:
+                # Rerunning alone: nothing above it ran, so sync the store here
+                TRACER.begin_run(page=st.session_state.current_page, user=user_id, session=session_id,
+                                 fragment=key)
+                store.sync()
+                func()
+                TRACER.end_run()
+            else:
+                shown.add(key)
+                with TRACER.span(key):
+                    func()
+        return run_fragment
+    return decorate
+
+def invalidate(*topics):
+    """From a widget callback, rerun just the fragments on screen that show any of topics
+
+    Ends the callback. If none of them is on screen, the interaction's
+    usual rerun goes ahead instead.
+    """
+    keys = [key for key in st.session_state.fragments_shown if not FRAGMENT_TOPICS[key].isdisjoint(topics)]
+    if keys:
+        st.rerun(keys)
+
+def clear_all():
+    store.clear()
+    st.session_state.chat_history.clear()
+    st.session_state.chat_cursors = []
+    st.session_state.pending_expense = None
+    invalidate('expenses', 'chat', 'pending')
+
+def bulk_review_frame(ready):
+    """Review table of parsed bulk lines; repeats start unchecked"""
+    import pandas as pd
+    return pd.DataFrame({
+        'save': [not r.get('duplicate', False) for r in ready],
+        'amount': [r['amount'] for r in ready],
+        'item': [r['item'] for r in ready],
+        'category': [r['category'] for r in ready],
+        'duplicate': [r.get('duplicate', False) for r in ready]
+    })
+
+def parse_bulk_lines():
+    """Parse the pasted or uploaded lines for review"""
+    bulk_file = st.session_state.bulk_file
+    text = bulk_file.getvalue().decode('utf-8', errors='replace') if bulk_file else st.session_state.bulk_text
+    lines = split_lines(text)
+    if lines:
+        with TRACER.span('parse_lines'):
+            results = parse_lines(lines, st.session_state.custom_categories, classifier=classifier)
+        # Lines already saved by an earlier import start unchecked; lines of
+        # this paste all get the same timestamp, so they aren't compared
+        # with each other (a week of notes may each say "jeep 15")
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        ready = [result for result in results if result['status'] == 'ready']
+        for result, original in zip(ready, duplicates.find_many([dict(result, timestamp=timestamp)
+                                                                 for result in ready], within_batch=False)):
+            result['duplicate'] = original is not None
+        st.session_state.bulk_results = results
     else:
-        comments = witty_comments.get(category, witty_comments['Miscellaneous'])
-        comment = random.choice(comments)
-    
-    return confirmation, comment
+        notify('bulk_add', 'error', "Paste some expenses or upload a file first")
+    invalidate('bulk')
 
-def generate_spending_insights(df, total):
-    """Generate AI-powered insights"""
-    
-    category_totals = df.groupby('category')['amount'].sum().sort_values(ascending=False)
-    top_category = category_totals.index[0]
-    top_category_amount = category_totals.iloc[0]
-    top_category_pct = (top_category_amount / total) * 100
-    
-    num_expenses = len(df)
-    avg_expense = total / num_expenses
-    
-    category_counts = df['category'].value_counts()
-    most_frequent_category = category_counts.index[0]
-    most_frequent_count = category_counts.iloc[0]
-    
-    largest_expense = df.loc[df['amount'].idxmax()]
-    
-    insights = f"""
-**Overview:**
-You've logged **{num_expenses} expenses** totaling **₱{total:,.2f}**. Your average expense is **₱{avg_expense:,.2f}**.
+def save_bulk_results():
+    """Save the rows left checked in the bulk review, learning from recategorized ones"""
+    review_df = bulk_review_frame([r for r in st.session_state.bulk_results if r['status'] == 'ready'])
+    # The callback runs before the editor does, so apply its edits here
+    edited = review_df.copy()
+    for row, changes in st.session_state.bulk_review['edited_rows'].items():
+        for column, value in changes.items():
+            edited.at[int(row), column] = value
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    to_save = edited[edited['save']]
+    for row in edited[edited['save'] & (edited['category'] != review_df['category'])].itertuples():
+        learn_correction(row.item, row.category)
+    store.submit([
+        {
+            'amount': float(row.amount),
+            'item': row.item,
+            'category': row.category,
+            'timestamp': timestamp
+        }
+        for row in to_save.itertuples()
+    ])
 
-**🎯 Top Spending Category:**
-Your biggest spending area is **{top_category}** at **₱{top_category_amount:,.2f}** ({top_category_pct:.1f}% of total). 
-"""
-    
-    category_advice = {
-        'Food & Dining': "💡 **Tip:** Food takes up a large portion of your budget. Consider meal prepping or cooking at home more often to save money!",
-        'Transport': "💡 **Tip:** Transport costs add up quickly. Consider carpooling, using public transport, or planning your trips to minimize travel expenses.",
-        'Shopping': "💡 **Tip:** Shopping is your top expense. Try the 24-hour rule: wait a day before buying non-essentials to avoid impulse purchases.",
-        'Bills & Utilities': "💡 **Tip:** Bills are essential but check if you can optimize—compare internet/mobile plans, or save electricity with energy-efficient habits.",
-        'Entertainment': "💡 **Tip:** Entertainment spending is high. Look for free alternatives like parks, free events, or share subscriptions with friends/family.",
-        'Health & Wellness': "💡 **Tip:** Health is important! Consider generic medicines when possible, and use health insurance benefits to reduce costs.",
-        'Personal Care': "💡 **Tip:** Personal care matters, but check if you can DIY some services or find affordable alternatives.",
-        'Education': "💡 **Tip:** Education is an investment! Look for free online courses, second-hand books, or library resources to reduce costs.",
-    }
-    
-    if top_category in category_advice:
-        insights += f"\n{category_advice[top_category]}\n"
-    
-    insights += f"""
-**📊 Spending Behavior:**
-You spend most frequently on **{most_frequent_category}** ({most_frequent_count} transactions). 
-"""
-    
-    top_3_pct = (category_totals.head(3).sum() / total) * 100
-    if top_3_pct > 70:
-        insights += f"\n**🔍 Pattern Alert:** {top_3_pct:.0f}% of your spending is concentrated in just 3 categories. Consider if this balance aligns with your priorities."
+    total = calculate_total()
+    add_chat_message('assistant', f"✅ Saved {len(to_save)} expenses. Running total: ₱{total:,.2f}")
+    st.session_state.bulk_results = None
+    invalidate('expenses', 'chat', 'bulk')
+
+def discard_bulk_results():
+    st.session_state.bulk_results = None
+    invalidate('bulk')
+
+def show_earlier_messages(cursor):
+    st.session_state.chat_cursors.append(cursor)
+    invalidate('chat')
+
+def show_newer_messages():
+    st.session_state.chat_cursors.pop()
+    invalidate('chat')
+
+def override_category():
+    """Refile the pending expense under the category picked for it"""
+    exp = st.session_state.pending_expense
+    selected_category = st.session_state.category_override
+    if selected_category != exp['category']:
+        exp['category'] = selected_category
+        exp['confidence'] = 1.0
+        exp['corrected'] = True
+    invalidate('pending')
+
+def save_pending_expense():
+    exp = st.session_state.pending_expense
+    if exp.get('corrected'):
+        learn_correction(exp['item'], exp['category'])
+    store.submit([{
+        'amount': exp['amount'],
+        'item': exp['item'],
+        'category': exp['category'],
+        'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    }])
+
+    total = calculate_total()
+    confirm_msg = f"{get_response_text(exp['language'], 'saved')} Running total: ₱{total:,.2f}"
+    add_chat_message('assistant', confirm_msg)
+
+    st.session_state.pending_expense = None
+    invalidate('expenses', 'chat', 'pending')
+
+def cancel_pending_expense():
+    exp = st.session_state.pending_expense
+    cancel_msg = get_response_text(exp['language'], 'cancelled')
+    add_chat_message('assistant', cancel_msg)
+
+    st.session_state.pending_expense = None
+    invalidate('chat', 'pending')
+
+def zoom_timeline():
+    """Zoom into the stretch of time boxed on the timeline"""
+    from resibo_timeline import selected_range
+    event = st.session_state[f"timeline_{st.session_state.timeline_key}"]
+    picked = selected_range(event.selection)
+    if picked is not None:
+        st.session_state.timeline_zoom.append(picked)
+        # A new key per zoom level, so the box that picked this range isn't picked up again
+        st.session_state.timeline_key += 1
+    invalidate('timeline')
+
+def zoom_out_timeline():
+    st.session_state.timeline_zoom.pop()
+    st.session_state.timeline_key += 1
+    invalidate('timeline')
+
+def add_category_from_form():
+    """Add the custom category typed into Settings"""
+    name = st.session_state.new_cat_name
+    keywords = st.session_state.new_cat_keywords
+    # An empty keyword ("dog food, ") would match every item
+    keywords_list = [k.strip() for k in keywords.split(',') if k.strip()] if keywords else []
+    if name and keywords_list:
+        moved = add_custom_category(name, keywords_list)
+        notify('settings', 'success',
+               f"✅ Added category: {name}" + (f" and refiled {moved} past expenses" if moved else ""))
+        invalidate('categories', 'expenses')
     else:
-        insights += f"\n**✅ Balanced Spending:** Your expenses are well-distributed across {len(category_totals)} categories."
-    
-    insights += f"""
+        notify('settings', 'error', "Please fill in a name and at least one keyword")
+        invalidate('categories')
 
-**🏆 Biggest Single Expense:**
-₱{largest_expense['amount']:,.2f} on **{largest_expense['item']}** ({largest_expense['category']})
-"""
-    
-    if num_expenses >= 10:
-        insights += "\n\n**🎉 Great job tracking!** You're building great financial awareness by consistently logging your expenses. Keep it up!"
-    elif num_expenses >= 5:
-        insights += "\n\n**👍 Good start!** Keep logging expenses to get more detailed insights and better understand your spending patterns."
-    
-    return insights
+def remove_category(name):
+    delete_custom_category(name)
+    invalidate('categories', 'expenses')
 
-def process_expense_input(user_input):
-    """Process user input and extract expense data"""
-    detected_lang = detect_language(user_input)
-    
-    amount = extract_amount(user_input)
-    item = extract_item(user_input, amount)
-    
-    if amount is None:
-        return {
-            'status': 'missing_amount',
-            'language': detected_lang,
-            'message': get_response_text(detected_lang, 'missing_amount')
-        }
-    
-    if item is None or item == '':
-        return {
-            'status': 'missing_item',
-            'language': detected_lang,
-            'amount': amount,
-            'message': get_response_text(detected_lang, 'missing_item')
-        }
-    
-    category = categorize_item(item)
-    
-    return {
-        'status': 'ready',
-        'language': detected_lang,
-        'amount': amount,
-        'item': item,
-        'category': category
-    }
+def scan_duplicates():
+    pairs = find_duplicates(get_expense_table(user_id), st.session_state.duplicate_window)
+    st.session_state.duplicate_scan = (store.version, [duplicate for duplicate, _ in pairs])
+    invalidate('duplicates')
 
-# Sidebar
-with st.sidebar:
-    st.markdown("### 💰 Resibo")
-    st.markdown("---")
-    
-    # Navigation
-    if st.button("🏠 Home", use_container_width=True, type="primary" if st.session_state.current_page == 'home' else "secondary"):
-        st.session_state.current_page = 'home'
-        st.rerun()
-    
-    if st.button("💬 Log Expenses", use_container_width=True, type="primary" if st.session_state.current_page == 'log' else "secondary"):
-        st.session_state.current_page = 'log'
-        st.rerun()
-    
-    if st.button("📊 Analytics", use_container_width=True, type="primary" if st.session_state.current_page == 'analytics' else "secondary"):
-        st.session_state.current_page = 'analytics'
-        st.rerun()
-    
-    if st.button("⚙️ Settings", use_container_width=True, type="primary" if st.session_state.current_page == 'settings' else "secondary"):
-        st.session_state.current_page = 'settings'
-        st.rerun()
-    
-    st.markdown("---")
-    
-    # Daily Log Summary
+def delete_duplicates():
+    store.delete_many(st.session_state.duplicate_scan[1])
+    st.session_state.duplicate_scan = None
+    invalidate('expenses')
+
+def category_totals():
+    import pandas as pd
+    return pd.DataFrame(aggregates.top_categories(), columns=['Category', 'Amount'])
+
+@fragment('summary')
+def sidebar_summary():
+    """Today's, this week's and this month's spending, and the latest expenses"""
     st.markdown("### 📊 Today's Summary")
-    
-    if st.session_state.expenses:
-        total = calculate_total()
-        st.metric("Total Spent", f"₱{total:,.2f}")
-        
-        df = pd.DataFrame(st.session_state.expenses)
-        category_totals = df.groupby('category')['amount'].sum().sort_values(ascending=False).head(3)
-        
-        st.markdown("**Top Categories:**")
-        for cat, amt in category_totals.items():
-            st.markdown(f"• {cat}: ₱{amt:,.2f}")
-        
+
+    error = store.pop_write_error()
+    if error is not None:
+        st.error(f"⚠️ Some expenses couldn't be saved and were left out: {error}")
+
+    if aggregates.count:
+        with TRACER.span('sidebar_aggregation'):
+            buckets = period_buckets(datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+            today_total, today_categories = summarize_rollup(store.rollup('day', buckets['day']))
+            week_total, _ = summarize_rollup(store.rollup('week', buckets['week']))
+            months = store.rollup('month', buckets['month'] - 1, buckets['month'])
+            month_total, _ = summarize_rollup([row for row in months if row[0] == buckets['month']])
+            last_month_total, _ = summarize_rollup([row for row in months if row[0] != buckets['month']])
+            recent = ranking.recent(3)
+
+        st.metric("Spent Today", f"₱{today_total:,.2f}")
+        week_col, month_col = st.columns(2)
+        week_col.metric("This Week", f"₱{week_total:,.0f}")
+        month_col.metric("This Month", f"₱{month_total:,.0f}",
+                         delta=f"₱{month_total - last_month_total:,.0f} vs last month", delta_color="inverse")
+
+        if today_categories:
+            st.markdown("**Top Categories Today:**")
+            for cat, amt in today_categories[:3]:
+                st.markdown(f"• {cat}: ₱{amt:,.2f}")
+
         st.markdown("**Recent:**")
-        for exp in list(reversed(st.session_state.expenses))[:3]:
+        for exp in recent:
             st.markdown(f"• ₱{exp['amount']:,.0f} - {exp['item']}")
-        
-        if st.button("🗑️ Clear All", use_container_width=True):
-            st.session_state.expenses = []
-            st.session_state.chat_history = []
-            st.session_state.pending_expense = None
-            st.rerun()
+
+        st.button("🗑️ Clear All", use_container_width=True, on_click=clear_all)
     else:
         st.info("No expenses yet!")
 
-# Main content area
-if st.session_state.current_page == 'home':
-    st.markdown("""
-    <div class="welcome-card">
-        <div class="welcome-title">Track. Analyze. Save. 💰</div>
-        <div class="welcome-subtitle">Your multilingual budget companion</div>
-        <div class="feature-list">
-            <div class="feature-item">✅ Natural language logging</div>
-            <div class="feature-item">✅ AI-powered insights</div>
-            <div class="feature-item">✅ Taglish supported</div>
-        </div>
-        <p style="margin-top: 2rem; color: var(--text-secondary);">
-            Start by clicking <strong>💬 Log Expenses</strong> in the sidebar!
+@fragment('bulk_add')
+def bulk_add():
+    """Bulk mode: parse a whole paste or file, review once, save once"""
+    with st.expander("📋 Bulk add - paste many lines or upload a .txt file",
+                     expanded=st.session_state.bulk_results is not None):
+        st.text_area(
+            "One expense per line",
+            placeholder="Lunch 85 pesos\nPlete nako 15\nBumili bigas 200",
+            key="bulk_text",
+            height=150
+        )
+        st.file_uploader("Or upload a .txt file", type=["txt"], key="bulk_file")
+
+        st.button("🔍 Parse Lines", use_container_width=True, on_click=parse_bulk_lines)
+        show_notice('bulk_add')
+
+        if st.session_state.bulk_results is not None:
+            results = st.session_state.bulk_results
+            ready = [r for r in results if r['status'] == 'ready']
+            skipped = [r['line'] for r in results if r['status'] != 'ready']
+
+            st.markdown(f"**{len(ready)} expenses found** - uncheck or recategorize before saving.")
+            if skipped:
+                st.caption(f"Skipped {len(skipped)} lines without an amount or item: "
+                           + ", ".join(f'"{line}"' for line in skipped[:5])
+                           + (" ..." if len(skipped) > 5 else ""))
+            repeats = sum(r.get('duplicate', False) for r in ready)
+            if repeats:
+                st.caption(f"{repeats} look like expenses you just saved or repeat an earlier line, "
+                           "so they start unchecked.")
+
+            st.data_editor(
+                bulk_review_frame(ready),
+                key="bulk_review",
+                hide_index=True,
+                use_container_width=True,
+                column_config={
+                    'save': st.column_config.CheckboxColumn("Save"),
+                    'amount': st.column_config.NumberColumn("Amount", format="₱%.2f", min_value=0),
+                    'item': st.column_config.TextColumn("Item"),
+                    'category': st.column_config.SelectboxColumn(
+                        "Category", options=get_all_categories(), required=True
+                    ),
+                    'duplicate': st.column_config.CheckboxColumn("Repeat?", disabled=True)
+                }
+            )
+
+            col1, col2 = st.columns(2)
+
+            with col1:
+                st.button("💾 Save All", type="primary", use_container_width=True, on_click=save_bulk_results)
+
+            with col2:
+                st.button("🗑️ Discard", use_container_width=True, on_click=discard_bulk_results)
+
+@fragment('chat_log')
+def chat_log():
+    """Chat history, one page at a time"""
+    cursors = st.session_state.chat_cursors
+    messages_to_display, earlier = st.session_state.chat_history.page(cursors[-1] if cursors else None)
+
+    if earlier is not None:
+        st.button("↑ Load earlier messages", on_click=show_earlier_messages, args=(earlier,))
+
+    if messages_to_display:
+        st.markdown(''.join(
+            f'<div class="{"user-message" if msg["role"] == "user" else "assistant-message"}">{msg["content"]}</div>'
+            for msg in messages_to_display
+        ), unsafe_allow_html=True)
+
+    if cursors:
+        st.button("↓ Newer messages", on_click=show_newer_messages)
+
+@fragment('pending_expense')
+def pending_expense():
+    """Pending expense confirmation (conversational format)"""
+    if not st.session_state.pending_expense:
+        return
+    exp = st.session_state.pending_expense
+
+    confirmation, comment = generate_conversational_confirmation(
+        exp['item'],
+        exp['category'],
+        exp['amount'],
+        exp.get('confidence', 1.0)
+    )
+
+    st.markdown(f"""
+    <div class="card">
+        <p style="color: var(--text-primary); font-size: 1.1rem; margin-bottom: 1rem;">
+            {confirmation}
+        </p>
+        <p style="color: var(--text-secondary); font-size: 1rem; margin-bottom: 1.5rem;">
+            {comment}
         </p>
     </div>
     """, unsafe_allow_html=True)
 
-elif st.session_state.current_page == 'log':
-    st.markdown("### 💬 Log Your Expenses")
-    st.markdown("Type naturally - 'Lunch 85 pesos', 'Plete nako 15', 'Bumili bigas 200'")
-    
-    # Chat history with load more
-    messages_to_display = st.session_state.chat_history[-st.session_state.messages_to_show:]
-    
-    if len(st.session_state.chat_history) > st.session_state.messages_to_show:
-        if st.button("↑ Load earlier messages"):
-            st.session_state.messages_to_show += 10
-            st.rerun()
-    
-    for msg in messages_to_display:
-        if msg['role'] == 'user':
-            st.markdown(f'<div class="user-message">{msg["content"]}</div>', unsafe_allow_html=True)
-        else:
-            st.markdown(f'<div class="assistant-message">{msg["content"]}</div>', unsafe_allow_html=True)
-    
-    # Pending expense confirmation (conversational format)
-    if st.session_state.pending_expense:
-        exp = st.session_state.pending_expense
-        
-        confirmation, comment = generate_conversational_confirmation(
-            exp['item'], 
-            exp['category'], 
-            exp['amount']
-        )
-        
-        st.markdown(f"""
-        <div class="card">
-            <p style="color: var(--text-primary); font-size: 1.1rem; margin-bottom: 1rem;">
-                {confirmation}
-            </p>
-            <p style="color: var(--text-secondary); font-size: 1rem; margin-bottom: 1.5rem;">
-                {comment}
-            </p>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        st.markdown("📂 **Category** (you can change it):")
-        
-        all_categories = list(CATEGORY_KEYWORDS.keys()) + list(st.session_state.custom_categories.keys())
-        all_categories = sorted(set(all_categories))
-        
-        current_idx = all_categories.index(exp['category']) if exp['category'] in all_categories else 0
-        
-        selected_category = st.selectbox(
-            "Select category",
-            options=all_categories,
-            index=current_idx,
-            key="category_override",
-            label_visibility="collapsed"
-        )
-        
-        if selected_category != exp['category']:
-            st.session_state.pending_expense['category'] = selected_category
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            if st.button("✅ Yes, Save", type="primary", use_container_width=True):
-                exp = st.session_state.pending_expense
-                st.session_state.expenses.append({
-                    'amount': exp['amount'],
-                    'item': exp['item'],
-                    'category': exp['category'],
-                    'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                })
-                
-                total = calculate_total()
-                confirm_msg = f"{get_response_text(exp['language'], 'saved')} Running total: ₱{total:,.2f}"
-                st.session_state.chat_history.append({'role': 'assistant', 'content': confirm_msg})
-                
-                st.session_state.pending_expense = None
-                st.rerun()
-        
-        with col2:
-            if st.button("❌ No, Cancel", use_container_width=True):
-                exp = st.session_state.pending_expense
-                cancel_msg = get_response_text(exp['language'], 'cancelled')
-                st.session_state.chat_history.append({'role': 'assistant', 'content': cancel_msg})
-                
-                st.session_state.pending_expense = None
-                st.rerun()
-    
-    # Chat input
+    original = find_duplicate(exp, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    if original is not None:
+        st.warning(f"⚠️ You already saved ₱{original['amount']:,.2f} for {original['item']} "
+                   f"at {original['timestamp'][11:16]}. Save it again?")
+
+    st.markdown("📂 **Category** (you can change it):")
+
+    all_categories = get_all_categories()
+
+    current_idx = all_categories.index(exp['category']) if exp['category'] in all_categories else 0
+
+    st.selectbox(
+        "Select category",
+        options=all_categories,
+        index=current_idx,
+        key="category_override",
+        on_change=override_category,
+        label_visibility="collapsed"
+    )
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.button("✅ Yes, Save", type="primary", use_container_width=True, on_click=save_pending_expense)
+
+    with col2:
+        st.button("❌ No, Cancel", use_container_width=True, on_click=cancel_pending_expense)
+
+@fragment('chat_input')
+def chat_input():
+    """Chat input, handled once per entry by submit_expense_input"""
     st.markdown("<br><br>", unsafe_allow_html=True)
-    user_input = st.text_input(
+    st.text_input(
         "Type your expense...",
         placeholder="e.g., 'I bought lunch for 85 pesos' or 'Plete nako 20'",
         key="expense_input",
+        on_change=submit_expense_input,
         label_visibility="collapsed"
     )
-    
-    if user_input:
-        st.session_state.chat_history.append({'role': 'user', 'content': user_input})
-        
-        result = process_expense_input(user_input)
-        
-        if result['status'] == 'ready':
-            st.session_state.pending_expense = result
-        else:
-            st.session_state.chat_history.append({'role': 'assistant', 'content': result['message']})
-        
-        st.rerun()
 
-elif st.session_state.current_page == 'analytics':
-    st.markdown("### 📊 Analytics & Insights")
-    
-    if not st.session_state.expenses:
+@fragment('analytics')
+def analytics_overview():
+    """Totals and the category charts"""
+    if not aggregates.count:
         st.info("📊 No expenses yet! Start logging in the Log Expenses tab to see your analytics here.")
-    else:
-        df = pd.DataFrame(st.session_state.expenses)
-        total = calculate_total()
-        
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            st.metric("Total Spent", f"₱{total:,.2f}")
-        with col2:
-            st.metric("Total Expenses", len(st.session_state.expenses))
-        with col3:
-            avg_expense = total / len(st.session_state.expenses)
-            st.metric("Avg per Expense", f"₱{avg_expense:,.2f}")
-        
-        st.markdown("---")
-        
-        chart_col1, chart_col2 = st.columns(2)
-        
-        with chart_col1:
-            st.markdown("#### 📊 Spending by Category")
-            category_totals = df.groupby('category')['amount'].sum().reset_index()
-            category_totals.columns = ['Category', 'Amount']
-            
-            import plotly.express as px
-            fig_pie = px.pie(
-                category_totals, 
-                values='Amount', 
-                names='Category',
-                hole=0.4,
-                color_discrete_sequence=px.colors.qualitative.Set3
-            )
-            fig_pie.update_traces(textposition='inside', textinfo='percent+label')
-            fig_pie.update_layout(showlegend=False, height=350, paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
+        return
+    render_cache = get_render_cache()
+    version = (user_id, store.version)
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Total Spent", f"₱{aggregates.total:,.2f}")
+    with col2:
+        st.metric("Total Expenses", aggregates.count)
+    with col3:
+        st.metric("Avg per Expense", f"₱{aggregates.average:,.2f}")
+
+    st.markdown("---")
+
+    chart_col1, chart_col2 = st.columns(2)
+
+    with chart_col1:
+        st.markdown("#### 📊 Spending by Category")
+        with TRACER.span('build_category_pie'):
+            fig_pie = render_cache.get('category_pie', version, lambda: build_category_pie(category_totals()))
+        with TRACER.span('plotly_chart pie'):
             st.plotly_chart(fig_pie, use_container_width=True)
-        
-        with chart_col2:
-            st.markdown("#### 📈 Top Spending Categories")
-            top_categories = category_totals.sort_values('Amount', ascending=False).head(5)
-            
-            fig_bar = px.bar(
-                top_categories,
-                x='Amount',
-                y='Category',
-                orientation='h',
-                color='Amount',
-                color_continuous_scale='Greens'
-            )
-            fig_bar.update_layout(
-                showlegend=False,
-                height=350,
-                yaxis={'categoryorder': 'total ascending'},
-                paper_bgcolor='rgba(0,0,0,0)',
-                plot_bgcolor='rgba(0,0,0,0)'
-            )
-            fig_bar.update_traces(text=top_categories['Amount'].apply(lambda x: f"₱{x:,.0f}"), textposition='outside')
+
+    with chart_col2:
+        st.markdown("#### 📈 Top Spending Categories")
+        with TRACER.span('build_top_categories_bar'):
+            fig_bar = render_cache.get('top_categories_bar', version,
+                                       lambda: build_top_categories_bar(category_totals()))
+        with TRACER.span('plotly_chart bar'):
             st.plotly_chart(fig_bar, use_container_width=True)
-        
-        st.markdown("---")
-        
-        st.markdown("#### 🤖 AI Spending Insights")
-        
-        with st.expander("💡 Your Personalized Analysis", expanded=True):
-            insights = generate_spending_insights(df, total)
-            st.markdown(insights)
-            
-            if st.button("🔄 Refresh Insights", use_container_width=True):
-                st.rerun()
 
-elif st.session_state.current_page == 'settings':
-    st.markdown("### ⚙️ Settings")
-    
+@fragment('timeline')
+def spending_over_time():
+    """Spending per hour, day, week or month, zoomed by dragging across it"""
+    if not aggregates.count:
+        return
+    from resibo_timeline import build_spending_timeline, spending_timeline
+    st.markdown("#### 📅 Spending Over Time")
+    zoom = st.session_state.timeline_zoom
+    visible = zoom[-1] if zoom else (None, None)
+
+    def timeline_figure():
+        table = get_expense_table(user_id)
+        return build_spending_timeline(spending_timeline(table.column('timestamp'), table.column('amount'),
+                                                         *visible))
+
+    with TRACER.span('build_spending_timeline'):
+        fig_timeline = get_render_cache().get(('spending_timeline',) + visible, (user_id, store.version),
+                                              timeline_figure)
+    with TRACER.span('plotly_chart timeline'):
+        st.plotly_chart(fig_timeline, use_container_width=True, on_select=zoom_timeline,
+                        selection_mode="box", key=f"timeline_{st.session_state.timeline_key}")
+    if zoom:
+        st.button("🔍 Zoom out", use_container_width=True, on_click=zoom_out_timeline)
+    else:
+        st.caption("Drag across the chart to zoom into a stretch of time.")
+
+@fragment('insights')
+def spending_insights():
+    if not aggregates.count:
+        return
+    st.markdown("---")
+
+    st.markdown("#### 🤖 AI Spending Insights")
+
+    with st.expander("💡 Your Personalized Analysis", expanded=True):
+        with TRACER.span('generate_spending_insights'):
+            insights = get_render_cache().get(
+                'insights', (user_id, store.version),
+                lambda: generate_spending_insights(get_expense_table(user_id).to_frame(), aggregates.total,
+                                                   ranking.largest(1)[0])
+            )
+        st.markdown(insights)
+
+        st.button("🔄 Refresh Insights", use_container_width=True, on_click=invalidate, args=('insights',))
+
+@fragment('settings')
+def settings():
     st.markdown("#### 🏷️ Manage Categories")
-    
+
     with st.expander("➕ Add Custom Category"):
-        new_cat_name = st.text_input("Category Name", placeholder="e.g., Pets, Subscriptions")
-        new_cat_keywords = st.text_input("Keywords (comma-separated)", 
-                                         placeholder="e.g., dog food, vet, pet")
-        
-        if st.button("Add Category", use_container_width=True):
-            if new_cat_name and new_cat_keywords:
-                keywords_list = [k.strip() for k in new_cat_keywords.split(',')]
-                st.session_state.custom_categories[new_cat_name] = keywords_list
-                st.success(f"✅ Added category: {new_cat_name}")
-                st.rerun()
-            else:
-                st.error("Please fill in both fields")
-    
+        st.text_input("Category Name", placeholder="e.g., Pets, Subscriptions", key="new_cat_name")
+        st.text_input("Keywords (comma-separated)",
+                      placeholder="e.g., dog food, vet, pet", key="new_cat_keywords")
+
+        st.button("Add Category", use_container_width=True, on_click=add_category_from_form)
+        show_notice('settings')
+
     if st.session_state.custom_categories:
         st.markdown("**Your Custom Categories:**")
         for cat, keywords in st.session_state.custom_categories.items():
@@ -852,26 +737,127 @@ elif st.session_state.current_page == 'settings':
             with col1:
                 st.markdown(f"**{cat}:** {', '.join(keywords[:3])}")
             with col2:
-                if st.button("🗑️", key=f"del_{cat}"):
-                    del st.session_state.custom_categories[cat]
-                    st.rerun()
-    
+                st.button("🗑️", key=f"del_{cat}", on_click=remove_category, args=(cat,))
+
     with st.expander("📋 Default Categories"):
         for cat in CATEGORY_KEYWORDS.keys():
             if cat != 'Miscellaneous':
                 st.markdown(f"• {cat}")
         st.caption("Miscellaneous (catch-all)")
-    
+
     st.markdown("---")
-    
-    if st.session_state.expenses:
+
+    if aggregates.count:
         st.markdown("#### 📥 Export Data")
-        df = pd.DataFrame(st.session_state.expenses)
-        csv = df.to_csv(index=False)
+        export_format = st.selectbox("Format", options=list(EXPORT_FORMATS),
+                                     format_func=lambda fmt: EXPORT_FORMATS[fmt][0])
+        label, extension, mime = EXPORT_FORMATS[export_format]
+        # A callable is only run when the button is clicked, not on every render,
+        # and downloading changes nothing on screen, so it doesn't rerun anything.
+        # The reader hands the export over a chunk at a time as it is read
         st.download_button(
-            label="Download CSV",
-            data=csv,
-            file_name=f"resibo_expenses_{datetime.now().strftime('%Y%m%d')}.csv",
-            mime="text/csv",
+            label=f"Download {label}",
+            data=lambda store=store, fmt=export_format: ExportReader(store, fmt),
+            file_name=f"resibo_expenses_{datetime.now().strftime('%Y%m%d')}.{extension}",
+            mime=mime,
+            on_click="ignore",
             use_container_width=True
         )
+
+        st.markdown("#### 🧹 Duplicates")
+        windows = {600: "10 minutes", 3600: "an hour", 86400: "a day"}
+        st.selectbox("Same amount, item and category saved within", options=list(windows),
+                     index=1, format_func=windows.get, key="duplicate_window")
+        st.button("Find Duplicates", use_container_width=True, on_click=scan_duplicates)
+        scan = st.session_state.duplicate_scan
+        # A scan from before the last change could point at the wrong expenses
+        if scan is not None and scan[0] == store.version:
+            if not scan[1]:
+                st.success("No duplicates found")
+            else:
+                st.button(f"🗑️ Delete {len(scan[1])} duplicates (keeps the first of each)",
+                          use_container_width=True, on_click=delete_duplicates)
+
+    # Hidden unless the page is opened with ?debug=1
+    if st.query_params.get('debug') == '1':
+        st.markdown("---")
+        with st.expander("⏱️ Rerun Timings", expanded=True):
+            # Tracing is process-wide, so only the operator's RESIBO_TRACE_TOGGLE lets a page switch it
+            if TRACE_TOGGLE:
+                TRACER.enabled = st.toggle("Trace reruns", value=TRACER.enabled)
+            elif not TRACER.enabled:
+                st.caption("Tracing is off. Start the server with RESIBO_TRACE=1 to turn it on.")
+            runs = TRACER.recent_runs(session=session_id)
+            if not runs:
+                st.caption("No traced reruns yet. Use the app with tracing on; each of your reruns shows up here.")
+            else:
+                shown = st.slider("Reruns to show", 1, len(runs), min(5, len(runs)))
+                for run in runs[:shown]:
+                    st.plotly_chart(build_waterfall(run), use_container_width=True, key=f"trace_{run['run']}")
+                st.download_button(
+                    label="Download traces (JSON lines)",
+                    data=TRACER.to_jsonl(session=session_id),
+                    file_name=f"resibo_traces_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl",
+                    mime="application/jsonl",
+                    on_click="ignore",
+                    use_container_width=True
+                )
+            if TRACER.dump_path:
+                st.caption(f"Also appending every run to {TRACER.dump_path}")
+
+# Sidebar
+with st.sidebar:
+    st.markdown("### 💰 Resibo")
+    if MULTI_USER:
+        st.caption(f"Logging as {user_id}")
+    st.markdown("---")
+
+    # Navigation
+    for page, label in (('home', "🏠 Home"), ('log', "💬 Log Expenses"), ('analytics', "📊 Analytics"),
+                        ('settings', "⚙️ Settings")):
+        st.button(label, use_container_width=True, on_click=show_page, args=(page,),
+                  type="primary" if st.session_state.current_page == page else "secondary")
+
+    st.markdown("---")
+
+    sidebar_summary()
+
+# Main content area
+if st.session_state.current_page == 'home':
+    st.markdown("""
+    <div class="welcome-card">
+        <div class="welcome-title">Track. Analyze. Save. 💰</div>
+        <div class="welcome-subtitle">Your multilingual budget companion</div>
+        <div class="feature-list">
+            <div class="feature-item">✅ Natural language logging</div>
+            <div class="feature-item">✅ AI-powered insights</div>
+            <div class="feature-item">✅ Taglish supported</div>
+        </div>
+        <p style="margin-top: 2rem; color: var(--text-secondary);">
+            Start by clicking <strong>💬 Log Expenses</strong> in the sidebar!
+        </p>
+    </div>
+    """, unsafe_allow_html=True)
+
+elif st.session_state.current_page == 'log':
+    st.markdown("### 💬 Log Your Expenses")
+    st.markdown("Type naturally - 'Lunch 85 pesos', 'Plete nako 15', 'Bumili bigas 200'")
+
+    bulk_add()
+    chat_log()
+    pending_expense()
+    chat_input()
+
+elif st.session_state.current_page == 'analytics':
+    st.markdown("### 📊 Analytics & Insights")
+
+    analytics_overview()
+    spending_over_time()
+    spending_insights()
+
+elif st.session_state.current_page == 'settings':
+    st.markdown("### ⚙️ Settings")
+
+    settings()
+
+TRACER.end_run()
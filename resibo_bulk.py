@@ -0,0 +1,73 @@
+"""Bulk parsing of pasted or uploaded expense notes
+
+Lines are parsed with the same process_expense_input pipeline as the chat,
+spread over a pool of worker processes once the paste is large enough to
+pay for the hand-off.
+"""
+import atexit
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from resibo_matcher import KeywordMatcher
+from resibo_parser import apply_classifier, process_expense_input
+
+# Below this many lines the pool start-up and pickling cost more than they save
+PARALLEL_THRESHOLD = 2000
+CHUNK_SIZE = 1000
+
+_pool = None
+_worker_cache = None
+
+
+def split_lines(text):
+    """Split pasted or uploaded text into non-empty expense lines"""
+    return [line.strip() for line in text.splitlines() if line.strip()]
+
+
+def _parse_chunk(args):
+    global _worker_cache
+    custom_categories, lines = args
+    # Workers outlive a single import, so only recompile when the categories change
+    if _worker_cache is None or _worker_cache[0] != custom_categories:
+        _worker_cache = (custom_categories, KeywordMatcher(custom_categories))
+    matcher = _worker_cache[1]
+    return [process_expense_input(line, matcher) for line in lines]
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        # spawn keeps workers independent of the server's threads
+        _pool = ProcessPoolExecutor(
+            max_workers=os.cpu_count() or 1,
+            mp_context=multiprocessing.get_context('spawn'),
+        )
+        atexit.register(_pool.shutdown)
+    return _pool
+
+
+def parse_lines(lines, custom_categories=None, parallel=None, classifier=None):
+    """Parse expense lines, in worker processes when there are many of them
+
+    Returns one process_expense_input result per line, in input order, with
+    the source text added under 'line'. A classifier of the user's past
+    corrections is applied afterwards, to every line in one batch.
+    """
+    custom_categories = dict(custom_categories or {})
+    if parallel is None:
+        parallel = len(lines) >= PARALLEL_THRESHOLD and (os.cpu_count() or 1) > 1
+
+    if parallel:
+        chunks = [(custom_categories, lines[i:i + CHUNK_SIZE])
+                  for i in range(0, len(lines), CHUNK_SIZE)]
+        parsed = [result for chunk in _get_pool().map(_parse_chunk, chunks) for result in chunk]
+    else:
+        matcher = KeywordMatcher(custom_categories)
+        parsed = [process_expense_input(line, matcher) for line in lines]
+
+    if classifier is not None:
+        apply_classifier(parsed, classifier)
+    for line, result in zip(lines, parsed):
+        result['line'] = line
+    return parsed
@@ -0,0 +1,46 @@
+"""Bounded cache for values derived from versioned data"""
+import threading
+from collections import OrderedDict
+
+
+class VersionedCache:
+    """LRU cache keyed on (name, data version)
+
+    Callers pass the current version of the data a value is derived from,
+    e.g. the expense store's version, so a write invalidates every entry
+    computed from older data without anyone having to clear the cache.
+    Stale entries simply age out once maxsize is reached.
+    """
+
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, name, version, compute):
+        """Return the cached value for name at version, computing it on a miss"""
+        key = (name, version)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        # Compute outside the lock so a slow chart doesn't block other sessions
+        value = compute()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,56 @@
+"""Bounded per-session chat history for the Log page"""
+from collections import deque
+from itertools import islice
+
+CAPACITY = 50
+PAGE_SIZE = 10
+
+
+class ChatHistory:
+    """A session's chat messages: the newest in memory, older ones on disk
+
+    The newest `capacity` messages sit in a ring buffer; appending to a full
+    buffer writes the oldest one to the store. Every message gets a sequence
+    number, and pages are addressed by cursor (the number of the oldest
+    message already shown), so reading a page costs the same however long
+    the conversation has run.
+    """
+
+    def __init__(self, store, session_id, capacity=CAPACITY):
+        self.store = store
+        self.session_id = session_id
+        self._recent = deque(maxlen=capacity)
+        self._first_seq = 0
+        self._next_seq = 0
+
+    def __len__(self):
+        return self._next_seq - self._first_seq
+
+    def append(self, role, content):
+        if len(self._recent) == self._recent.maxlen:
+            self.store.save_messages(self.session_id, [self._recent[0]])
+        self._recent.append((self._next_seq, role, content))
+        self._next_seq += 1
+
+    def page(self, before=None, limit=PAGE_SIZE):
+        """Up to limit messages older than cursor `before` (None for the newest), oldest first
+
+        Returns the messages and the cursor of the page before them, which
+        is None once the first message is on this page.
+        """
+        before = self._next_seq if before is None else before
+        ring_start = self._recent[0][0] if self._recent else self._next_seq
+        end = max(before - ring_start, 0)
+        rows = list(islice(self._recent, max(end - limit, 0), end))
+        missing = limit - len(rows)
+        if missing and self._first_seq < ring_start:
+            rows = self.store.messages_before(self.session_id, min(before, ring_start), missing) + rows
+        oldest = rows[0][0] if rows else before
+        cursor = oldest if oldest > self._first_seq else None
+        return [{'role': role, 'content': content} for _, role, content in rows], cursor
+
+    def clear(self):
+        self.store.clear_messages(self.session_id)
+        self._recent.clear()
+        # Numbers keep counting up so stale cursors never point at new messages
+        self._first_seq = self._next_seq
@@ -0,0 +1,298 @@
+"""Naive Bayes categorizer that learns from the user's category corrections
+
+Items become word and character-trigram features, so correcting
+"pandesal" also tells the model about "pandesal at bakery" and "pandesals".
+learn() updates the counts in O(features); scoring goes through NumPy
+for a whole batch at once, hashing the features of every item in one
+pass and summing their log-likelihoods with np.bincount. NumPy is only imported once there is
+something learned to score against.
+"""
+import re
+import threading
+
+from resibo_matcher import WORD
+
+# Additive smoothing for unseen feature/category pairs
+ALPHA = 0.5
+INITIAL_CATEGORIES = 16
+INITIAL_FEATURES = 1024
+LT, GT = ord('<'), ord('>')
+# Words are hashed as the polynomial sum of code * HASH_BASE**i, wrapping at 64 bits
+HASH_BASE = 0x100000001B3
+HASH_INVERSE = pow(HASH_BASE, -1, 1 << 64)
+# Fibonacci hashing spreads the learned codes over the buckets of the lookup table
+BUCKET_MIX = 0x9E3779B97F4A7C15
+# Separates the items joined for normalize_many(); never part of a word
+SEPARATOR = '\x00'
+# What between words isn't already a single space
+NON_WORD = re.compile(r"[^\w'\-\x00]{2,}|[^\w'\-\x00 ]")
+
+
+def normalize(item):
+    return ' '.join(WORD.findall(item.lower()))
+
+
+def normalize_many(items):
+    """normalize() of every item, in a few regex passes over all of them joined"""
+    if not items:
+        return []
+    joined = SEPARATOR.join(items).lower()
+    if joined.count(SEPARATOR) != len(items) - 1:
+        return [normalize(item) for item in items]
+    joined = NON_WORD.sub(' ', joined).replace(' ' + SEPARATOR, SEPARATOR).replace(SEPARATOR + ' ', SEPARATOR)
+    return joined.strip(' ').split(SEPARATOR)
+
+
+def word_features(word):
+    """The word itself plus its letter trigrams, with < and > marking its ends"""
+    padded = f'<{word}>'
+    return ['=' + word] + [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def features(text):
+    """Features of every word of normalized text"""
+    return [feature for word in text.split() for feature in word_features(word)]
+
+
+def wrapped_chars(texts):
+    """Code points of normalized texts with every word wrapped in < >, and the text each belongs to"""
+    import numpy as np
+
+    wrapped = '<' + SEPARATOR.join(texts).replace(' ', '><').replace(SEPARATOR, '>' + SEPARATOR + '<') + '>'
+    chars = np.frombuffer(wrapped.encode('utf-32-le'), dtype=np.uint32).astype(np.int64)
+    return chars, np.cumsum(chars == 0)
+
+
+def word_hashes(chars):
+    """64-bit hash of every < >-wrapped word in chars, and where each word's < is"""
+    import numpy as np
+
+    opens, closes = np.flatnonzero(chars == LT), np.flatnonzero(chars == GT)
+    powers = np.ones(len(chars), dtype=np.uint64)
+    inverses = np.ones(len(chars), dtype=np.uint64)
+    np.cumprod(np.full(len(chars) - 1, HASH_BASE, dtype=np.uint64), out=powers[1:])
+    np.cumprod(np.full(len(chars) - 1, HASH_INVERSE, dtype=np.uint64), out=inverses[1:])
+    # Prefix sums of code * base**position; a word's slice of them, shifted back to position 0
+    prefix = np.zeros(len(chars) + 1, dtype=np.uint64)
+    np.cumsum(chars.astype(np.uint64) * powers, out=prefix[1:])
+    starts = opens + 1
+    return ((prefix[closes] - prefix[starts]) * inverses[starts]).view(np.int64), opens
+
+
+def buckets(codes, bits):
+    """Bucket of every packed code in a table of 2**bits buckets"""
+    import numpy as np
+
+    return (codes.view(np.uint64) * np.uint64(BUCKET_MIX) >> np.uint64(64 - bits)).astype(np.intp)
+
+
+class CategoryClassifier:
+    """Multinomial naive Bayes over the items the user re-categorized
+
+    An item corrected before is recalled exactly. Anything else is scored,
+    and the confidence is the best category's posterior times the share
+    of the item's features the model has seen, so text unlike anything
+    learned scores near 0 instead of going to the only category learned.
+    """
+
+    def __init__(self, alpha=ALPHA):
+        self.alpha = alpha
+        self.version = 0
+        self.categories = []
+        self._rows = {}
+        self._columns = {}
+        self._counts = None  # categories x features, grown by doubling
+        self._totals = None  # features counted per category
+        self._docs = None    # items learned per category
+        self._recalled = {}  # normalized item -> the category it was last filed under
+        self._index = None
+        self._token = object()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._recalled)
+
+    def fingerprint(self):
+        """Changes whenever learning could change a prediction; unique to this classifier
+
+        None while nothing is learned, since every empty classifier predicts
+        alike, so users without corrections share cached parses.
+        """
+        if not len(self):
+            return None
+        return (self._token, self.version)
+
+    def load(self, overrides):
+        """Learn a sequence of (item, category) corrections, oldest first"""
+        for item, category in overrides:
+            self.learn(item, category)
+        return self
+
+    def learn(self, item, category):
+        import numpy as np
+
+        text = normalize(item)
+        if not text:
+            return
+        found = features(text)
+        with self._lock:
+            row = self._row(category)
+            columns = [self._column(feature) for feature in found]
+            np.add.at(self._counts[row], columns, 1)
+            self._totals[row] += len(columns)
+            self._docs[row] += 1
+            self._recalled[text] = category
+            self.version += 1
+
+    def forget(self, category):
+        """Drop everything learned about a category, e.g. a deleted custom category"""
+        with self._lock:
+            row = self._rows.get(category)
+            if row is None:
+                return
+            self._counts[row] = 0
+            self._totals[row] = 0
+            self._docs[row] = 0
+            self._recalled = {text: filed for text, filed in self._recalled.items() if filed != category}
+            self.version += 1
+
+    def recall(self, item):
+        """The category this exact item was corrected to, or None"""
+        return self._recalled.get(normalize(item)) if self._recalled else None
+
+    def predict(self, item):
+        return self.predict_many([item])[0]
+
+    def predict_many(self, items):
+        """(category, confidence) per item; (None, 0.0) where nothing learned applies"""
+        if not self._recalled:
+            return [(None, 0.0)] * len(items)
+
+        # Histories repeat the same few items, so each distinct text is scored once
+        texts = normalize_many(items)
+        distinct = list(dict.fromkeys(texts))
+        recalled = self._recalled
+        outcomes = [(recalled[text], 1.0) if text in recalled else (None, 0.0) for text in distinct]
+        unknown = [index for index, text in enumerate(distinct) if text and text not in recalled]
+        if unknown:
+            self._score([distinct[index] for index in unknown], unknown, outcomes)
+        if len(distinct) == len(texts):
+            return outcomes
+        index_of = {text: index for index, text in enumerate(distinct)}
+        return [outcomes[index_of[text]] for text in texts]
+
+    def _score(self, texts, at, outcomes):
+        """Fill outcomes[at[i]] with the best category for texts[i], where any learned feature applies"""
+        import numpy as np
+
+        with self._lock:
+            codes, bits, bounds, log_likelihood, log_prior = self._feature_index()
+        entries, owners, found = self._known_features(texts, codes, bits, bounds)
+        if not len(owners) or np.isneginf(log_prior).all():
+            return
+        # Per category, sum the log-likelihoods of each text's known features
+        known = np.bincount(owners, minlength=len(texts))
+        scored = np.flatnonzero(known)
+        scores = np.stack([np.bincount(owners, weights=row[entries], minlength=len(texts))[scored]
+                           for row in log_likelihood]) + log_prior[:, None]
+        scores -= scores.max(axis=0)
+        posterior = np.exp(scores)
+        posterior /= posterior.sum(axis=0)
+        best = posterior.argmax(axis=0)
+        confidence = posterior[best, np.arange(len(scored))] * known[scored] / found[scored]
+
+        categories = self.categories
+        for index, row, score in zip(scored.tolist(), best.tolist(), confidence.tolist()):
+            outcomes[at[index]] = (categories[row], score)
+
+    def _known_features(self, texts, codes, bits, bounds):
+        """Index in codes of the learned features in texts, the text each came from, and features per text
+
+        All texts go through NumPy in one pass: each word wrapped in < >,
+        every window of three characters packed into an int64 and every
+        word hashed into one, then looked up together in the bucketed codes.
+        """
+        import numpy as np
+
+        chars, owner = wrapped_chars(texts)
+        first, middle, last = chars[:-2], chars[1:-1], chars[2:]
+        inside = (first != GT) & (middle != LT) & (middle != GT) & (last != LT)
+        words, opens = word_hashes(chars)
+        packed = np.concatenate([(first << 42 | middle << 21 | last)[inside], words])
+        owner = np.concatenate([owner[:-2][inside], owner[opens]])
+        found = np.bincount(owner, minlength=len(texts))
+        # Probe every feature's bucket one slot at a time; buckets hold a couple of codes at most
+        slot = buckets(packed, bits)
+        stop = bounds[slot + 1]
+        pending = np.flatnonzero(bounds[slot] < stop)
+        probe = bounds[slot[pending]]
+        entries = np.full(len(packed), -1, dtype=np.intp)
+        while len(pending):
+            match = codes[probe] == packed[pending]
+            entries[pending[match]] = probe[match]
+            probe += 1
+            more = ~match & (probe < stop[pending])
+            pending, probe = pending[more], probe[more]
+        hit = entries >= 0
+        return entries[hit], owner[hit], found
+
+    def _feature_index(self):
+        """Packed codes of the learned features grouped by bucket, the table's bits and bucket bounds,
+        the log-likelihood of each code per category, and the log priors
+
+        Rebuilt after learning, so scoring only looks up and gathers. A word
+        hash that collides with a trigram code is vanishingly rare.
+        """
+        import numpy as np
+
+        if self._index is None or self._index[0] != self.version:
+            size, vocabulary = len(self.categories), len(self._columns)
+            trigrams = [(feature, column) for feature, column in self._columns.items() if feature[0] != '=']
+            words = [(feature[1:], column) for feature, column in self._columns.items() if feature[0] == '=']
+            codes = np.concatenate([
+                np.array([ord(a) << 42 | ord(b) << 21 | ord(c) for (a, b, c), _ in trigrams], dtype=np.int64),
+                word_hashes(wrapped_chars([word for word, _ in words])[0])[0] if words else np.zeros(0, dtype=np.int64),
+            ])
+            columns = np.array([column for _, column in trigrams + words], dtype=np.intp)
+            counts = self._counts[:size, columns].T
+            # A forgotten category's features keep their columns but no longer count as known
+            held = counts.any(axis=1)
+            codes, counts = codes[held], counts[held]
+            # About two buckets per code
+            bits = len(codes).bit_length() + 1
+            slots = buckets(codes, bits)
+            order = np.argsort(slots, kind='stable')
+            bounds = np.searchsorted(slots[order], np.arange((1 << bits) + 1))
+            totals, docs = self._totals[:size], self._docs[:size]
+            log_likelihood = np.log(counts[order].T + self.alpha) - np.log(totals + self.alpha * vocabulary)[:, None]
+            with np.errstate(divide='ignore'):
+                log_prior = np.where(docs > 0, np.log(docs / max(docs.sum(), 1)), -np.inf)
+            self._index = (self.version, codes[order], bits, bounds, log_likelihood, log_prior)
+        return self._index[1:]
+
+    def _row(self, category):
+        import numpy as np
+
+        row = self._rows.get(category)
+        if row is None:
+            row = self._rows[category] = len(self.categories)
+            self.categories.append(category)
+            if self._counts is None:
+                self._counts = np.zeros((INITIAL_CATEGORIES, INITIAL_FEATURES))
+                self._totals = np.zeros(INITIAL_CATEGORIES)
+                self._docs = np.zeros(INITIAL_CATEGORIES)
+            elif row == len(self._totals):
+                self._counts = np.vstack([self._counts, np.zeros_like(self._counts)])
+                self._totals = np.concatenate([self._totals, np.zeros_like(self._totals)])
+                self._docs = np.concatenate([self._docs, np.zeros_like(self._docs)])
+        return row
+
+    def _column(self, feature):
+        import numpy as np
+
+        column = self._columns.get(feature)
+        if column is None:
+            column = self._columns[feature] = len(self._columns)
+            if column == self._counts.shape[1]:
+                self._counts = np.hstack([self._counts, np.zeros_like(self._counts)])
+        return column
@@ -0,0 +1,158 @@
+"""Columnar in-memory expense table for Analytics and exports"""
+import numpy as np
+import pandas as pd
+
+INITIAL_CAPACITY = 1024
+
+
+def to_epoch_seconds(timestamps):
+    """'%Y-%m-%d %H:%M:%S' wall-clock strings to int64 seconds since 1970-01-01"""
+    return np.array(timestamps, dtype='datetime64[s]').astype(np.int64)
+
+
+class StringPool:
+    """Interns strings to small integer codes"""
+
+    def __init__(self):
+        self.values = []
+        self._codes = {}
+        self._index = None
+
+    def code(self, value):
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def codes(self, values):
+        return np.fromiter((self.code(value) for value in values), dtype=np.int32, count=len(values))
+
+    def index(self):
+        """The pool as a pandas Index, rebuilt only after new strings arrive"""
+        if self._index is None or len(self._index) != len(self.values):
+            self._index = pd.Index(self.values)
+        return self._index
+
+
+class ExpenseTable:
+    """Expense history as parallel NumPy columns instead of a list of dicts
+
+    Amounts are float64, timestamps int64 epoch seconds, and categories and
+    items int32 codes into string pools, so an expense costs a few dozen
+    bytes. Rows are kept in id order. to_frame() wraps the live buffers
+    without copying them, so buffers are never modified in place once
+    handed out: appends only write past the current end, and deletes build
+    new arrays.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def __len__(self):
+        return self._size
+
+    def clear(self):
+        self.categories = StringPool()
+        self.items = StringPool()
+        self._size = 0
+        self._allocate(INITIAL_CAPACITY)
+
+    def _allocate(self, capacity, keep=0):
+        old = getattr(self, '_columns', None)
+        columns = {
+            'id': np.empty(capacity, dtype=np.int64),
+            'amount': np.empty(capacity, dtype=np.float64),
+            'timestamp': np.empty(capacity, dtype=np.int64),
+            'category': np.empty(capacity, dtype=np.int32),
+            'item': np.empty(capacity, dtype=np.int32),
+        }
+        if keep:
+            for name, column in columns.items():
+                column[:keep] = old[name][:keep]
+        self._columns = columns
+
+    def _reserve(self, extra):
+        needed = self._size + extra
+        capacity = max(len(self._columns['id']), INITIAL_CAPACITY)
+        if needed > len(self._columns['id']):
+            while capacity < needed:
+                capacity *= 2
+            self._allocate(capacity, keep=self._size)
+
+    def load(self, store):
+        self.clear()
+        self.extend(store.rows())
+
+    def extend(self, rows):
+        """Append (id, amount, item, category, timestamp) tuples"""
+        rows = list(rows)
+        if not rows:
+            return
+        ids, amounts, items, categories, timestamps = zip(*rows)
+        start, end = self._size, self._size + len(rows)
+        self._reserve(len(rows))
+        columns = self._columns
+        columns['id'][start:end] = ids
+        columns['amount'][start:end] = amounts
+        columns['timestamp'][start:end] = to_epoch_seconds(timestamps)
+        columns['category'][start:end] = self.categories.codes(categories)
+        columns['item'][start:end] = self.items.codes(items)
+        self._size = end
+        ids = columns['id'][:end]
+        # Another store or process can commit lower ids between our own saves
+        if (start and ids[start] < ids[start - 1]) or (np.diff(ids[start:]) < 0).any():
+            order = np.argsort(ids, kind='stable')
+            self._columns = {name: column[:end][order] for name, column in columns.items()}
+
+    def add(self, expense):
+        self.extend([(expense['id'], expense['amount'], expense['item'],
+                      expense['category'], expense['timestamp'])])
+
+    def remove(self, expense):
+        ids = self._columns['id'][:self._size]
+        position = np.searchsorted(ids, expense['id'])
+        if position == self._size or ids[position] != expense['id']:
+            return
+        # New arrays, not an in-place shift: frames may still be viewing the old ones
+        self._columns = {
+            name: np.delete(column[:self._size], position)
+            for name, column in self._columns.items()
+        }
+        self._size -= 1
+
+    def remove_many(self, expenses):
+        keep = ~np.isin(self._columns['id'][:self._size], [expense['id'] for expense in expenses])
+        self._columns = {name: column[:self._size][keep] for name, column in self._columns.items()}
+        self._size = int(keep.sum())
+
+    def recategorize(self, changes):
+        """Give moved expenses their new categories, in one new category column"""
+        ids = self._columns['id'][:self._size]
+        moved = np.fromiter((old['id'] for old, _ in changes), dtype=np.int64, count=len(changes))
+        positions = np.searchsorted(ids, moved)
+        found = positions < self._size
+        found[found] = ids[positions[found]] == moved[found]
+        # The whole buffer, so later appends still have room
+        categories = self._columns['category'].copy()
+        codes = self.categories.codes([new['category'] for _, new in changes])
+        categories[positions[found]] = codes[found]
+        self._columns = dict(self._columns, category=categories)
+
+    def column(self, name):
+        """Read-only view of one column's live rows"""
+        view = self._columns[name][:self._size]
+        view.flags.writeable = False
+        return view
+
+    def to_frame(self):
+        """DataFrame over the live buffers; categories and items as Categoricals"""
+        size, columns = self._size, self._columns
+        return pd.DataFrame({
+            'amount': columns['amount'][:size],
+            'item': pd.Categorical.from_codes(
+                columns['item'][:size], categories=self.items.index(), validate=False),
+            'category': pd.Categorical.from_codes(
+                columns['category'][:size], categories=self.categories.index(), validate=False),
+            'timestamp': columns['timestamp'][:size].view('datetime64[s]'),
+        }, copy=False)
@@ -0,0 +1,135 @@
+"""Spotting expenses that were saved twice
+
+Two expenses are duplicates when they have the same amount, the same item
+(ignoring case and spacing) and the same category, and were saved within
+DUPLICATE_WINDOW seconds of each other. Keys are bucketed by time so a
+lookup only checks the expense's own bucket and its two neighbours.
+"""
+import os
+import threading
+from datetime import datetime
+
+from resibo_classifier import normalize
+
+DUPLICATE_WINDOW = int(os.environ.get('RESIBO_DUPLICATE_WINDOW', '3600'))
+EPOCH = datetime(1970, 1, 1)
+
+
+def seconds(timestamp):
+    """Wall-clock seconds since 1970-01-01 of a '%Y-%m-%d %H:%M:%S' timestamp"""
+    return int((datetime.fromisoformat(timestamp) - EPOCH).total_seconds())
+
+
+def duplicate_key(amount, item, category):
+    return (round(amount * 100), normalize(item), category)
+
+
+class DuplicateIndex:
+    """Hash index over the expenses of the last window, for checking saves in O(1)
+
+    Double-submits and repeated imports land within minutes of the
+    original, so only expenses within window of the newest one are held;
+    older buckets are dropped as time moves on. Attach it to an expense
+    store. find_duplicates() covers the whole history.
+    """
+
+    def __init__(self, window=DUPLICATE_WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._buckets = {}  # time bucket -> {key: [expense, ...]}
+            self._newest = None
+
+    def load(self, store):
+        cutoff = datetime.now().timestamp() - 2 * self.window
+        since = datetime.fromtimestamp(cutoff).strftime("%Y-%m-%d %H:%M:%S")
+        self.clear()
+        with self._lock:
+            for expense in store.since(since) if self.window else ():
+                self._add(expense)
+
+    def add(self, expense):
+        if self.window:
+            with self._lock:
+                self._add(expense)
+
+    def _add(self, expense):
+        bucket = seconds(expense['timestamp']) // self.window
+        if self._newest is None or bucket > self._newest:
+            self._newest = bucket
+            for old in [old for old in self._buckets if old < bucket - 2]:
+                del self._buckets[old]
+        elif bucket < self._newest - 2:
+            return
+        key = duplicate_key(expense['amount'], expense['item'], expense['category'])
+        self._buckets.setdefault(bucket, {}).setdefault(key, []).append(expense)
+
+    def remove(self, expense):
+        if not self.window:
+            return
+        key = duplicate_key(expense['amount'], expense['item'], expense['category'])
+        with self._lock:
+            held = self._buckets.get(seconds(expense['timestamp']) // self.window, {}).get(key)
+            if held:
+                held[:] = [other for other in held if other['id'] != expense['id']]
+
+    def find(self, expense):
+        """An already saved expense that this one would duplicate, or None"""
+        return self.find_many([expense])[0]
+
+    def find_many(self, expenses, within_batch=True):
+        """Per expense, what it would duplicate: a saved expense, an earlier one of the batch, or None
+
+        Without within_batch only saved expenses count, for batches whose
+        rows may legitimately repeat (a week of notes, each "jeep 15").
+        """
+        if not self.window:
+            return [None] * len(expenses)
+        found = []
+        batch = {}
+        with self._lock:
+            for expense in expenses:
+                at = seconds(expense['timestamp'])
+                bucket = at // self.window
+                key = duplicate_key(expense['amount'], expense['item'], expense['category'])
+                nearby = (
+                    other
+                    for near in (bucket - 1, bucket, bucket + 1)
+                    for held in (self._buckets.get(near, {}).get(key, ()), batch.get((near, key), ()))
+                    for other in held
+                )
+                found.append(next((other for other in nearby
+                                   if abs(seconds(other['timestamp']) - at) <= self.window), None))
+                if within_batch:
+                    batch.setdefault((bucket, key), []).append(expense)
+        return found
+
+
+def find_duplicates(table, window=DUPLICATE_WINDOW):
+    """(duplicate id, original id) pairs among the expenses of an ExpenseTable
+
+    An expense is a duplicate of the matching one saved just before it, if
+    that was at most window seconds earlier; deleting every duplicate keeps
+    the first of each run. Each row's key is hashed to an integer code,
+    the rows are put in (key, time) order, and every row is compared with
+    the one before it, all in NumPy; only the distinct item texts are
+    normalized in Python.
+    """
+    import numpy as np
+    import pandas as pd
+
+    if not len(table):
+        return []
+    ids, times = table.column('id'), table.column('timestamp')
+    cents = np.rint(table.column('amount') * 100).astype(np.int64)
+    names = pd.factorize(np.array([normalize(item) for item in table.items.values], dtype=object))[0]
+    items = names[table.column('item')]
+    key = pd.factorize(cents * (names.max() + 1) + items)[0].astype(np.int64)
+    key = key * max(len(table.categories.values), 1) + table.column('category')
+    order = np.lexsort((ids, times, key))
+    ids, times, key = ids[order], times[order], key[order]
+    repeated = (key[1:] == key[:-1]) & (times[1:] - times[:-1] <= window)
+    return list(zip(ids[1:][repeated].tolist(), ids[:-1][repeated].tolist()))
@@ -0,0 +1,147 @@
+"""Chunked expense export as CSV, Parquet or Arrow IPC
+
+Exports read the store a page at a time and yield the file as a sequence
+of byte chunks, so memory use depends on CHUNK_ROWS, not on the size of
+the history. Parquet and Arrow need pyarrow, which Streamlit already
+depends on.
+"""
+import csv
+import io
+
+CHUNK_ROWS = 10_000
+COLUMNS = ['amount', 'item', 'category', 'timestamp']
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# format: (label, file extension, MIME type)
+FORMATS = {
+    'csv': ('CSV', 'csv', 'text/csv'),
+    'parquet': ('Parquet', 'parquet', 'application/vnd.apache.parquet'),
+    'arrow': ('Arrow IPC', 'arrow', 'application/vnd.apache.arrow.file'),
+}
+
+
+def export_chunks(store, fmt='csv', chunk_rows=CHUNK_ROWS):
+    """The store's expenses as an iterator of bytes in the given format"""
+    if fmt == 'csv':
+        return _csv_chunks(store, chunk_rows)
+    if fmt in ('parquet', 'arrow'):
+        return _arrow_chunks(store, fmt, chunk_rows)
+    raise ValueError(f"unknown export format {fmt!r}; choose from {', '.join(FORMATS)}")
+
+
+def _csv_chunks(store, chunk_rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(COLUMNS)
+    for rows in store.iter_chunks(chunk_rows):
+        writer.writerows(rows)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only stream that keeps what was written until take() collects it"""
+
+    def __init__(self):
+        self._parts = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def take(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+class ExportReader(io.RawIOBase):
+    """Read-only stream over export_chunks(), pulling the next chunk only when a read needs it
+
+    It can only seek back to the start, which begins the export again;
+    Streamlit rewinds a stream before reading it.
+    """
+
+    def __init__(self, store, fmt='csv', chunk_rows=CHUNK_ROWS):
+        self._export = (store, fmt, chunk_rows)
+        self._chunks = export_chunks(store, fmt, chunk_rows)
+        self._pending = memoryview(b'')
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._pending:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._pending = memoryview(chunk)
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        self._position += size
+        return size
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR and offset == 0:
+            return self._position
+        if whence != io.SEEK_SET or offset != 0:
+            raise io.UnsupportedOperation("an export can only be rewound to the start")
+        if self._position:
+            self._chunks = export_chunks(*self._export)
+            self._pending = memoryview(b'')
+            self._position = 0
+        return 0
+
+    def tell(self):
+        return self._position
+
+    def close(self):
+        # Dropping the generator closes it, and with it the store's cursor
+        self._chunks = iter(())
+        super().close()
+
+
+def _arrow_chunks(store, fmt, chunk_rows):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    schema = pa.schema([
+        ('amount', pa.float64()),
+        ('item', pa.string()),
+        ('category', pa.string()),
+        ('timestamp', pa.timestamp('s')),
+    ])
+    sink = _ChunkSink()
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(sink, schema)
+    else:
+        writer = pa.ipc.new_file(sink, schema)
+    with writer:
+        for rows in store.iter_chunks(chunk_rows):
+            amounts, items, categories, timestamps = zip(*rows)
+            writer.write_batch(pa.record_batch([
+                pa.array(amounts, pa.float64()),
+                pa.array(items, pa.string()),
+                pa.array(categories, pa.string()),
+                pc.strptime(pa.array(timestamps, pa.string()), format=TIMESTAMP_FORMAT, unit='s'),
+            ], schema=schema))
+            data = sink.take()
+            if data:
+                yield data
+    yield sink.take()
+
+
+def write_export(store, fmt, path):
+    """Write an export to a file, chunk by chunk"""
+    with open(path, 'wb') as f:
+        for chunk in export_chunks(store, fmt):
+            f.write(chunk)
@@ -0,0 +1,101 @@
+"""Finding and refiling past expenses when the category rules change"""
+import threading
+from array import array
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class ItemIndex:
+    """Inverted index from the letter trigrams of saved items to expense ids
+
+    Keywords match anywhere inside an item ("vet" in "vet visit" and in
+    "velvet"), so items are indexed by every three letters rather than by
+    word: the items that can contain a keyword are the ones holding all of
+    its trigrams, and a substring test settles the rest. Attach it to an
+    expense store; each save costs O(length of the item).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def __len__(self):
+        return len(self._ids)
+
+    def clear(self):
+        with self._lock:
+            self._ids = {}       # item -> ids of the expenses saved with it
+            self._postings = {}  # trigram of the lowercased item -> items
+
+    def load(self, store):
+        with self._lock:
+            self._ids = {}
+            self._postings = {}
+            for expense_id, _, item, _, _ in store.rows():
+                self._add(expense_id, item)
+
+    def add(self, expense):
+        with self._lock:
+            self._add(expense['id'], expense['item'])
+
+    def _add(self, expense_id, item):
+        ids = self._ids.get(item)
+        if ids is None:
+            ids = self._ids[item] = array('q')
+            for trigram in trigrams(item.lower()):
+                self._postings.setdefault(trigram, set()).add(item)
+        ids.append(expense_id)
+
+    def remove(self, expense):
+        item = expense['item']
+        with self._lock:
+            ids = self._ids.get(item)
+            if ids is None or expense['id'] not in ids:
+                return
+            ids.remove(expense['id'])
+            if ids:
+                return
+            del self._ids[item]
+            for trigram in trigrams(item.lower()):
+                items = self._postings[trigram]
+                items.discard(item)
+                if not items:
+                    del self._postings[trigram]
+
+    def recategorize(self, changes):
+        """Nothing to do: the items stay the same"""
+
+    def ids(self, item):
+        with self._lock:
+            return list(self._ids.get(item, ()))
+
+    def containing(self, keywords):
+        """Saved items with any of the keywords in them, ignoring case"""
+        found = set()
+        with self._lock:
+            for keyword in {keyword.lower() for keyword in keywords if keyword}:
+                if len(keyword) < 3:
+                    candidates = self._ids
+                else:
+                    postings = sorted((self._postings.get(trigram, ()) for trigram in trigrams(keyword)), key=len)
+                    candidates = postings[0].intersection(*postings[1:]) if postings[0] else ()
+                found.update(item for item in candidates if keyword in item.lower())
+        return found
+
+
+def refile(store, index, before, categorize):
+    """Move past expenses to the category their item gets now, in one batch
+
+    before maps items to the category they were given under the old rules;
+    an item's expenses move only if they are still filed there, so
+    categories the user picked by hand stay put. Returns how many moved.
+    """
+    moves = {}
+    for item, old in before.items():
+        new = categorize(item)
+        if new != old:
+            for expense_id in index.ids(item):
+                moves[expense_id] = (old, new)
+    return store.recategorize(moves) if moves else 0
@@ -0,0 +1,107 @@
+"""Spending insights text and category charts for the Analytics page"""
+
+
+def generate_spending_insights(df, total, largest_expense=None):
+    """Generate AI-powered insights
+
+    largest_expense, if the caller already knows it, saves a scan of the amounts.
+    """
+    
+    category_totals = df.groupby('category', observed=True)['amount'].sum().sort_values(ascending=False)
+    top_category = category_totals.index[0]
+    top_category_amount = category_totals.iloc[0]
+    top_category_pct = (top_category_amount / total) * 100
+    
+    num_expenses = len(df)
+    avg_expense = total / num_expenses
+    
+    category_counts = df['category'].value_counts()
+    most_frequent_category = category_counts.index[0]
+    most_frequent_count = category_counts.iloc[0]
+    
+    if largest_expense is None:
+        largest_expense = df.loc[df['amount'].idxmax()]
+    
+    insights = f"""
+**Overview:**
+You've logged **{num_expenses} expenses** totaling **₱{total:,.2f}**. Your average expense is **₱{avg_expense:,.2f}**.
+
+**🎯 Top Spending Category:**
+Your biggest spending area is **{top_category}** at **₱{top_category_amount:,.2f}** ({top_category_pct:.1f}% of total). 
+"""
+    
+    category_advice = {
+        'Food & Dining': "💡 **Tip:** Food takes up a large portion of your budget. Consider meal prepping or cooking at home more often to save money!",
+        'Transport': "💡 **Tip:** Transport costs add up quickly. Consider carpooling, using public transport, or planning your trips to minimize travel expenses.",
+        'Shopping': "💡 **Tip:** Shopping is your top expense. Try the 24-hour rule: wait a day before buying non-essentials to avoid impulse purchases.",
+        'Bills & Utilities': "💡 **Tip:** Bills are essential but check if you can optimize—compare internet/mobile plans, or save electricity with energy-efficient habits.",
+        'Entertainment': "💡 **Tip:** Entertainment spending is high. Look for free alternatives like parks, free events, or share subscriptions with friends/family.",
+        'Health & Wellness': "💡 **Tip:** Health is important! Consider generic medicines when possible, and use health insurance benefits to reduce costs.",
+        'Personal Care': "💡 **Tip:** Personal care matters, but check if you can DIY some services or find affordable alternatives.",
+        'Education': "💡 **Tip:** Education is an investment! Look for free online courses, second-hand books, or library resources to reduce costs.",
+    }
+    
+    if top_category in category_advice:
+        insights += f"\n{category_advice[top_category]}\n"
+    
+    insights += f"""
+**📊 Spending Behavior:**
+You spend most frequently on **{most_frequent_category}** ({most_frequent_count} transactions). 
+"""
+    
+    top_3_pct = (category_totals.head(3).sum() / total) * 100
+    if top_3_pct > 70:
+        insights += f"\n**🔍 Pattern Alert:** {top_3_pct:.0f}% of your spending is concentrated in just 3 categories. Consider if this balance aligns with your priorities."
+    else:
+        insights += f"\n**✅ Balanced Spending:** Your expenses are well-distributed across {len(category_totals)} categories."
+    
+    insights += f"""
+
+**🏆 Biggest Single Expense:**
+₱{largest_expense['amount']:,.2f} on **{largest_expense['item']}** ({largest_expense['category']})
+"""
+    
+    if num_expenses >= 10:
+        insights += "\n\n**🎉 Great job tracking!** You're building great financial awareness by consistently logging your expenses. Keep it up!"
+    elif num_expenses >= 5:
+        insights += "\n\n**👍 Good start!** Keep logging expenses to get more detailed insights and better understand your spending patterns."
+    
+    return insights
+
+
+def build_category_pie(category_totals):
+    """Donut chart of spending per category"""
+    import plotly.express as px
+    fig_pie = px.pie(
+        category_totals, 
+        values='Amount', 
+        names='Category',
+        hole=0.4,
+        color_discrete_sequence=px.colors.qualitative.Set3
+    )
+    fig_pie.update_traces(textposition='inside', textinfo='percent+label')
+    fig_pie.update_layout(showlegend=False, height=350, paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
+    return fig_pie
+
+def build_top_categories_bar(category_totals):
+    """Horizontal bar chart of the five biggest categories"""
+    import plotly.express as px
+    top_categories = category_totals.sort_values('Amount', ascending=False).head(5)
+    
+    fig_bar = px.bar(
+        top_categories,
+        x='Amount',
+        y='Category',
+        orientation='h',
+        color='Amount',
+        color_continuous_scale='Greens'
+    )
+    fig_bar.update_layout(
+        showlegend=False,
+        height=350,
+        yaxis={'categoryorder': 'total ascending'},
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)'
+    )
+    fig_bar.update_traces(text=top_categories['Amount'].apply(lambda x: f"₱{x:,.0f}"), textposition='outside')
+    return fig_bar
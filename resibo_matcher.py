@@ -0,0 +1,308 @@
+import re
+import threading
+from collections import deque
+
+# Priority given to nodes that complete no keyword
+NO_MATCH = float('inf')
+
+# Fuzzy matching: shorter words are never fuzzy-matched, words below
+# SHORT_WORD characters only with a vowel left out, words below LONG_WORD
+# characters with one missing, extra or swapped letter, and only words of
+# LONG_WORD or more also with a changed letter or a second typo
+WORD = re.compile(r"[\w'-]+")
+MIN_FUZZY_LENGTH = 3
+SHORT_WORD = 5
+LONG_WORD = 8
+VOWELS = frozenset('aeiou')
+
+
+def edit_distance(a, b, limit):
+    """Edits between a and b, counting a swap of neighbouring letters as one; None if over limit"""
+    if abs(len(a) - len(b)) > limit:
+        return None
+    before, previous = None, list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i] * (len(b) + 1)
+        for j, char_b in enumerate(b, 1):
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b))
+            if i > 1 and j > 1 and char_a == b[j - 2] and a[i - 2] == char_b:
+                value = min(value, before[j - 2] + 1)
+            current[j] = value
+        if min(current) > limit:
+            return None
+        before, previous = previous, current
+    return previous[-1] if previous[-1] <= limit else None
+
+
+def typo_allowance(word, max_distance):
+    """Most edits a fuzzy match of word may take"""
+    if len(word) < MIN_FUZZY_LENGTH:
+        return 0
+    return min(max_distance, 1) if len(word) < LONG_WORD else max_distance
+
+
+def word_distance(word, keyword, max_distance):
+    """Typos between a typed word and a keyword, or None if it isn't a fuzzy match
+
+    A word shorter than SHORT_WORD only matches a keyword that has one more
+    vowel inside it ("grb" for grab, "jep" for jeep): most short words are
+    one letter away from some keyword ("bun" and bus, "tax" and taxi)
+    without being a typo of it. Below LONG_WORD letters the same goes for
+    a changed letter ("paint" and print, "barker" and barber), so only a
+    missing, extra or swapped letter counts there.
+    """
+    if len(word) < SHORT_WORD:
+        if len(word) < MIN_FUZZY_LENGTH or len(keyword) != len(word) + 1 or max_distance < 1:
+            return None
+        dropped = any(keyword[i] in VOWELS and keyword[:i] + keyword[i + 1:] == word
+                      for i in range(1, len(keyword) - 1))
+        return 1 if dropped else None
+    limit = min(typo_allowance(word, max_distance), typo_allowance(keyword, max_distance))
+    distance = edit_distance(word, keyword, limit)
+    if distance == 1 and len(word) == len(keyword) and min(len(word), len(keyword)) < LONG_WORD:
+        # One edit between equal lengths is a changed letter or a swap; keep only the swap
+        diff = [i for i, (a, b) in enumerate(zip(word, keyword)) if a != b]
+        if len(diff) != 2 or diff[1] != diff[0] + 1:
+            return None
+    return distance
+
+
+def deletes(word, distance):
+    """word and every string made by deleting up to distance of its characters"""
+    variants = frontier = {word}
+    for _ in range(distance):
+        frontier = {variant[:i] + variant[i + 1:] for variant in frontier for i in range(len(variant))}
+        variants = variants | frontier
+    return variants
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton that maps keyword hits to prioritized categories
+
+    Categories keep the order they were added in, and the earliest category
+    with any keyword found in the text wins - the same rule as looping over
+    the categories and doing a substring test per keyword. Adding or removing
+    a category only touches that category's keywords; the failure links are
+    recomputed lazily on the next lookup. The default matcher is shared by
+    every session thread, so the lazy builds happen under a lock; add()
+    and remove() take it too, but a matcher that is changed while other
+    threads look things up in it can still answer with either version.
+
+    closest() finds keywords that are a typo or two away. Its
+    symmetric-delete index (every keyword with up to max_distance letters
+    deleted, mapped back to the keyword) is built on first use and then
+    kept up to date by add() and remove() like the automaton.
+    """
+
+    def __init__(self, categories=None):
+        self._goto = [{}]
+        self._fail = [0]
+        self._outputs = [set()]
+        self._best = [NO_MATCH]
+        self._categories = {}
+        self._order = []
+        self._dirty = False
+        self._fingerprint = None
+        self._priority = None
+        self._fuzzy = None
+        self._fuzzy_distance = 0
+        self._lock = threading.RLock()
+        self._max_words = 1
+        for category, keywords in (categories or {}).items():
+            self.add(category, keywords)
+
+    def __contains__(self, category):
+        return category in self._categories
+
+    def __len__(self):
+        return len(self._categories)
+
+    def fingerprint(self):
+        """Hashable snapshot of the categories and their keywords, in priority order
+
+        Two matchers with equal fingerprints categorize every text the same way.
+        """
+        if self._fingerprint is None:
+            self._fingerprint = tuple(
+                (category, frozenset(self._categories[category])) for category in self._order
+            )
+        return self._fingerprint
+
+    def add(self, category, keywords):
+        """Add a category, or replace its keywords and keep its priority"""
+        with self._lock:
+            self._add(category, keywords)
+
+    def _add(self, category, keywords):
+        if category in self._categories:
+            self._unlink(category)
+        else:
+            self._order.append(category)
+        keywords = {keyword.lower() for keyword in keywords}
+        self._categories[category] = keywords
+        for keyword in keywords:
+            node = self._insert(keyword)
+            if self._fuzzy is not None and not self._outputs[node]:
+                self._index_keyword(self._fuzzy, keyword, self._fuzzy_distance)
+            self._outputs[node].add(category)
+        self._dirty = True
+        self._fingerprint = None
+        self._priority = None
+
+    def remove(self, category):
+        """Drop a category and its keywords from the automaton"""
+        with self._lock:
+            if category not in self._categories:
+                return
+            self._unlink(category)
+            del self._categories[category]
+            self._order.remove(category)
+            self._dirty = True
+            self._fingerprint = None
+            self._priority = None
+
+    def match(self, text):
+        """Return the highest-priority category with a keyword in text, or None"""
+        if not self._categories:
+            return None
+        if self._dirty:
+            with self._lock:
+                # Another thread may have built it while this one waited
+                if self._dirty:
+                    self._build()
+
+        goto, fail, best_at = self._goto, self._fail, self._best
+        node = 0
+        best = best_at[0]
+        for char in text.lower():
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if best_at[node] < best:
+                best = best_at[node]
+                if best == 0:
+                    break
+
+        if best == NO_MATCH:
+            return None
+        return self._order[best]
+
+    def _insert(self, keyword):
+        node = 0
+        for char in keyword:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append(set())
+                self._best.append(NO_MATCH)
+            node = next_node
+        return node
+
+    def _find(self, keyword):
+        node = 0
+        for char in keyword:
+            node = self._goto[node].get(char)
+            if node is None:
+                return None
+        return node
+
+    def _unlink(self, category):
+        for keyword in self._categories[category]:
+            node = self._find(keyword)
+            if node is not None:
+                self._outputs[node].discard(category)
+                if self._fuzzy is not None and not self._outputs[node]:
+                    self._unindex_keyword(keyword)
+
+    def closest(self, text, max_distance=1):
+        """(category, keyword, distance) for the keyword nearest to a word or phrase in text, or None
+
+        Runs of as many words as the longest keyword are compared too, so
+        multi-word keywords can match. The fewest edits win, then the
+        earliest category.
+        """
+        if not self._categories or max_distance <= 0:
+            return None
+        with self._lock:
+            if self._fuzzy is None or self._fuzzy_distance < max_distance:
+                self._build_fuzzy(max_distance)
+            if self._priority is None:
+                self._priority = {category: idx for idx, category in enumerate(self._order)}
+            priority = self._priority
+        words = WORD.findall(text.lower())
+        best = None
+        for size in range(1, min(self._max_words, len(words)) + 1):
+            for start in range(len(words) - size + 1):
+                phrase = ' '.join(words[start:start + size])
+                # A short word can only be a keyword with a letter deleted, indexed as is
+                allowance = typo_allowance(phrase, max_distance) if len(phrase) >= SHORT_WORD else 0
+                candidates = set()
+                for variant in deletes(phrase, allowance):
+                    candidates.update(self._fuzzy.get(variant, ()))
+                for keyword in candidates:
+                    distance = word_distance(phrase, keyword, max_distance)
+                    if distance is None:
+                        continue
+                    category = min(self._outputs[self._find(keyword)], key=priority.__getitem__)
+                    rank = (distance, priority[category])
+                    if best is None or rank < best[0]:
+                        best = (rank, category, keyword)
+        return None if best is None else (best[1], best[2], best[0][0])
+
+    def _index_keyword(self, fuzzy, keyword, distance):
+        allowance = typo_allowance(keyword, distance)
+        if not allowance:
+            return
+        for variant in deletes(keyword, allowance):
+            fuzzy.setdefault(variant, set()).add(keyword)
+        self._max_words = max(self._max_words, len(keyword.split()))
+
+    def _unindex_keyword(self, keyword):
+        for variant in deletes(keyword, typo_allowance(keyword, self._fuzzy_distance)):
+            keywords = self._fuzzy.get(variant)
+            if keywords is not None:
+                keywords.discard(keyword)
+                if not keywords:
+                    del self._fuzzy[variant]
+
+    def _build_fuzzy(self, max_distance):
+        """Index every keyword for closest(); the caller holds _lock
+
+        The default matcher is shared by every session thread, so the index
+        is filled aside and only then replaces the old one, which covers a
+        smaller distance and is still right for the lookups using it.
+        """
+        fuzzy = {}
+        for keyword in set().union(*self._categories.values()):
+            self._index_keyword(fuzzy, keyword, max_distance)
+        self._fuzzy = fuzzy
+        self._fuzzy_distance = max_distance
+
+    def _build(self):
+        """Recompute failure links and per-node best priorities (BFS)"""
+        priority = {category: idx for idx, category in enumerate(self._order)}
+
+        def own_best(node):
+            return min((priority[c] for c in self._outputs[node]), default=NO_MATCH)
+
+        self._best[0] = own_best(0)
+        queue = deque()
+        for child in self._goto[0].values():
+            self._fail[child] = 0
+            queue.append(child)
+
+        while queue:
+            node = queue.popleft()
+            self._best[node] = min(own_best(node), self._best[self._fail[node]])
+            for char, child in self._goto[node].items():
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                queue.append(child)
+
+        self._dirty = False
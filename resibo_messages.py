@@ -0,0 +1,117 @@
+"""Localized replies and witty confirmation comments, loaded once from data files
+
+    messages/responses/<language>.json   reply texts, one file per language
+    messages/confirmations.json          the confirmation line, and per
+                                         category an emoji and a comment pool
+
+Adding a language or a category's comments is a matter of adding a file
+or an entry. Texts may substitute {item}, {amount}, {category}, {emoji}
+and {confidence}, with a format spec ("₱{amount:,.0f}"); each is parsed
+and rendered once with sample values when the catalog loads, so a typo in
+a name or a spec fails at startup and a lookup only renders the one text
+it returns.
+"""
+import json
+import random
+import string
+from functools import lru_cache
+from pathlib import Path
+
+MESSAGES_DIR = Path(__file__).parent / 'messages'
+DEFAULT_LANGUAGE = 'english'
+FIELDS = ('item', 'amount', 'category', 'emoji', 'confidence')
+# What each field is given when a template is tried out at load time
+SAMPLE = {'item': 'coffee', 'amount': 1234.5, 'category': 'Food & Dining', 'emoji': '🍽️', 'confidence': 0.5}
+
+
+def compile_template(text, fields=FIELDS):
+    """A renderer taking the values of fields positionally, in that order
+
+    Only names in fields with a plain format spec are allowed. Each name is
+    swapped for its position ("{amount:,.0f}" becomes "{1:,.0f}") and the
+    renderer is that text's own str.format, which skips building a keyword
+    dict per call. The text is rendered once with SAMPLE values, so a bad
+    spec fails here rather than on the first expense that uses it.
+    """
+    parts = []
+    for literal, field, spec, conversion in string.Formatter().parse(text):
+        parts.append(literal.replace('{', '{{').replace('}', '}}'))
+        if field is None:
+            continue
+        if field not in fields or conversion or '{' in spec:
+            raise ValueError(f"Unsupported substitution {{{field}}} in message {text!r}")
+        parts.append(f"{{{fields.index(field)}{':' + spec if spec else ''}}}")
+    render = ''.join(parts).format
+    try:
+        render(*(SAMPLE[field] for field in fields))
+    except (TypeError, ValueError) as error:
+        raise ValueError(f"Bad format spec in message {text!r}: {error}") from None
+    return render
+
+
+class MessageCatalog:
+    """Reply texts per language and confirmation comments per category
+
+    A language missing some replies falls back to DEFAULT_LANGUAGE's, and
+    a category without comments to the fallback category's pool.
+    """
+
+    def __init__(self, responses, confirmations, default_language=DEFAULT_LANGUAGE):
+        default = responses[default_language]
+        self._responses = {language: {**default, **texts} for language, texts in responses.items()}
+        self._default_responses = self._responses[default_language]
+        self._confirmation = compile_template(confirmations['confirmation'])
+        self._unsure = compile_template(confirmations['unsure'])
+        self._default_emoji = confirmations['default_emoji']
+        self.big_amount = confirmations['big_amount']
+        self._big_purchase = tuple(compile_template(text) for text in confirmations['big_purchase'])
+        categories = confirmations['categories']
+        self._emoji = {name: entry['emoji'] for name, entry in categories.items() if 'emoji' in entry}
+        self._comments = {
+            name: tuple(compile_template(text) for text in entry['comments'])
+            for name, entry in categories.items() if entry.get('comments')
+        }
+        self._fallback_comments = self._comments[confirmations['fallback']]
+
+    @classmethod
+    def load(cls, directory=MESSAGES_DIR):
+        directory = Path(directory)
+        responses = {
+            path.stem: json.loads(path.read_text(encoding='utf-8'))
+            for path in sorted((directory / 'responses').glob('*.json'))
+        }
+        confirmations = json.loads((directory / 'confirmations.json').read_text(encoding='utf-8'))
+        return cls(responses, confirmations)
+
+    @property
+    def languages(self):
+        return list(self._responses)
+
+    def text(self, language, key):
+        """The reply `key` in the language, or '' if there is none"""
+        return self._responses.get(language, self._default_responses).get(key, '')
+
+    def emoji(self, category):
+        return self._emoji.get(category, self._default_emoji)
+
+    def comments(self, category, amount):
+        """The comment renderers one is picked from for an expense"""
+        if amount >= self.big_amount:
+            return self._big_purchase
+        return self._comments.get(category, self._fallback_comments)
+
+    def confirmation(self, item, category, amount, confidence=1.0):
+        """The confirmation line for a pending expense and a comment picked at random"""
+        values = (item, amount, category, self.emoji(category), confidence)
+        confirmation = self._confirmation(*values)
+        if 0 < confidence < 1:
+            # The category came from a keyword that was spelled differently
+            confirmation += self._unsure(*values)
+        comment = random.choice(self.comments(category, amount))(*values)
+        return confirmation, comment
+
+
+@lru_cache(maxsize=None)
+def get_catalog():
+    """Load the message catalog once per process"""
+    return MessageCatalog.load()
@@ -0,0 +1,325 @@
+"""Expense text parsing: language detection, amount/item extraction and categorization
+
+Kept free of Streamlit so the same logic can run in worker processes.
+"""
+import os
+import re
+from functools import lru_cache
+
+from resibo_cache import VersionedCache
+from resibo_matcher import KeywordMatcher
+from resibo_messages import get_catalog
+
+# Language detection keywords
+LANGUAGE_PATTERNS = {
+    'tagalog': ['bumili', 'binili', 'binayad', 'bayad', 'gastos', 'gumastos', 'nagbayad'],
+    'bisaya': ['plete', 'palit', 'gipalit', 'gibayad', 'bayad', 'gasto']
+}
+
+# Category keywords for auto-classification
+CATEGORY_KEYWORDS = {
+    'Food & Dining': [
+        'food', 'meal', 'lunch', 'dinner', 'breakfast', 'snack', 'merienda',
+        'rice', 'bigas', 'ulam', 'kaon', 'pagkaon', 'sud-an',
+        'restaurant', 'jollibee', 'mcdo', 'mcdonald', 'kfc', 'pizza', 'burger',
+        'coffee', 'kape', 'starbucks', 'cafe', 'carinderia', 'turo-turo',
+        'grocery', 'groceries', 'palengke', 'market', 'supermarket', 'sari-sari',
+        'vegetables', 'gulay', 'meat', 'karne', 'fish', 'isda', 'fruits', 'prutas', 'egg', 'itlog'
+    ],
+    'Transport': [
+        'transport', 'fare', 'plete', 'pamasahe', 
+        'jeep', 'jeepney', 'tricycle', 'trike', 'habal-habal', 'motor',
+        'bus', 'taxi', 'grab', 'angkas', 'uber', 'sakay',
+        'gas', 'gasolina', 'diesel', 'fuel', 'parking'
+    ],
+    'Bills & Utilities': [
+        'bill', 'bills', 'bayad', 'utilities',
+        'electric', 'electricity', 'kuryente', 'meralco',
+        'water', 'tubig', 'maynilad',
+        'internet', 'wifi', 'pldt', 'globe', 'smart',
+        'phone', 'mobile', 'postpaid', 'plan'
+    ],
+    'Shopping': [
+        'shopping', 'shop', 'clothes', 'clothing', 'damit',
+        'shirt', 'pants', 'shoes', 'sapatos', 'sandals', 'tsinelas',
+        'bag', 'wallet', 'watch', 'accessories',
+        'gadget', 'phone', 'cellphone', 'laptop', 'earphones', 'charger'
+    ],
+    'Health & Wellness': [
+        'health', 'medicine', 'gamot', 'bulong', 'tambal',
+        'doctor', 'doktor', 'hospital', 'clinic', 'checkup',
+        'vitamins', 'supplement', 'pharmacy', 'botika', 'mercury',
+        'gym', 'fitness', 'workout', 'yoga', 'massage', 'hilot'
+    ],
+    'Personal Care': [
+        'haircut', 'gupit', 'salon', 'barber', 'parlor',
+        'shampoo', 'soap', 'sabon', 'toothpaste', 'deodorant',
+        'cosmetics', 'makeup', 'skincare', 'lotion', 'perfume', 'pabango',
+        'grooming', 'beauty', 'nails', 'spa'
+    ],
+    'Entertainment': [
+        'entertainment', 'movie', 'cinema', 'netflix', 'spotify',
+        'concert', 'gig', 'show', 'theater',
+        'games', 'gaming', 'ps5', 'xbox', 'nintendo', 'mobile legends', 'ml',
+        'hobby', 'books', 'libro', 'magazine', 'comics'
+    ],
+    'Education': [
+        'education', 'school', 'eskwela', 'tuition', 'enrollment',
+        'books', 'libro', 'notebook', 'pen', 'ballpen', 'school supplies',
+        'course', 'training', 'seminar', 'workshop', 'online class',
+        'photocopies', 'xerox', 'print', 'printing'
+    ],
+    'Gifts & Others': [
+        'gift', 'regalo', 'birthday', 'kaarawan',
+        'donation', 'donasyon', 'charity', 'church', 'simbahan',
+        'offering', 'abuloy', 'contribution'
+    ],
+    'Miscellaneous': []
+}
+
+# Most typos a keyword match may forgive when nothing matches exactly; 0 turns fuzzy matching off
+FUZZY_DISTANCE = int(os.environ.get('RESIBO_FUZZY_DISTANCE', '2'))
+# Least confidence at which the classifier learned from the user's corrections is believed
+LEARNED_CONFIDENCE = 0.6
+
+# Words dropped from the item text
+ITEM_STOPWORDS = frozenset([
+    'bumili', 'binili', 'bought', 'paid', 'for', 'ako', 'ng', 'sa', 'nako', 'ko',
+    'gipalit', 'gibayad', 'spent', 'halagang', 'kay', 'og'
+])
+
+# One scanner for the whole message: amounts (with an optional ₱ sign and
+# pesos/php unit), runs of letters, and any other single character
+TOKEN_PATTERN = re.compile(
+    r'(?P<sign>₱(?P<gap>\s*))?(?P<number>\d+(?:\.\d+)?)(?P<tail>\s*(?P<unit>pesos?|php)?)'
+    r'|(?P<word>[^\W\d]+)'
+    r'|(?P<other>.)',
+    re.IGNORECASE | re.DOTALL
+)
+
+# Anchored re-checks for dotted runs like "1.2.3", where the original
+# patterns can start partway into a number
+UNIT_AMOUNT_PATTERN = re.compile(r'(\d+(?:\.\d+)?)\s*(?:pesos?|php)', re.IGNORECASE)
+BARE_AMOUNT_PATTERN = re.compile(r'\b(\d+(?:\.\d+)?)\b')
+
+LANGUAGE_MATCHER = KeywordMatcher(LANGUAGE_PATTERNS)
+
+def _is_word_char(char):
+    return char.isalnum() or char == '_'
+
+def lex_expense(text):
+    """Scan text once and return (language, amount, item)
+
+    Gives the same answers as checking the language keywords, trying the
+    ₱ / pesos-php / bare-number patterns in order, and stripping amounts and
+    stopwords from the item - without rescanning the text for each step.
+    """
+    language = 'english'
+    peso_amount = unit_amount = bare_amount = None
+    pieces = []
+    word = ''
+    
+    for match in TOKEN_PATTERN.finditer(text):
+        kind = match.lastgroup
+        
+        if kind == 'word':
+            token = match.group()
+            # Tagalog outranks Bisaya, so stop looking once it is found
+            if language != 'tagalog':
+                hit = LANGUAGE_MATCHER.match(token)
+                if hit == 'tagalog' or (hit and language == 'english'):
+                    language = hit
+            # Letters on both sides of a removed amount join into one word
+            word += token
+            continue
+        
+        if kind == 'other':
+            if word:
+                if word.lower() not in ITEM_STOPWORDS:
+                    pieces.append(word)
+                word = ''
+            pieces.append(match.group())
+            continue
+        
+        number = match.group('number')
+        if match.group('sign') is not None:
+            if peso_amount is None:
+                peso_amount = float(number)
+            # A ₱ separated from its number by spaces stays in the item text
+            if match.group('gap'):
+                if word:
+                    if word.lower() not in ITEM_STOPWORDS:
+                        pieces.append(word)
+                    word = ''
+                pieces.append('₱' + match.group('gap'))
+        start, end = match.span('number')
+        if unit_amount is None and match.group('unit'):
+            unit_amount = float(number)
+            if start >= 2 and text[start - 1] == '.' and text[start - 2].isdigit():
+                # "1.2.3 pesos" reads as 2.3: start from the digits before the dot
+                chain = start - 2
+                while chain and text[chain - 1].isdigit():
+                    chain -= 1
+                chained = UNIT_AMOUNT_PATTERN.match(text, chain)
+                if chained:
+                    unit_amount = float(chained.group(1))
+        if bare_amount is None:
+            # A bare number needs a word boundary on each side (like \b...\b)
+            word_before = start > 0 and _is_word_char(text[start - 1])
+            word_after = end < len(text) and _is_word_char(text[end])
+            whole, _, fraction = number.partition('.')
+            if not word_before:
+                if not word_after:
+                    bare_amount = float(number)
+                elif fraction:
+                    bare_amount = float(whole)
+            elif fraction:
+                # "abc1.5" has no boundary before the 1, but has one before the 5
+                bare = BARE_AMOUNT_PATTERN.match(text, start + len(whole) + 1)
+                if bare:
+                    bare_amount = float(bare.group(1))
+    
+    if word and word.lower() not in ITEM_STOPWORDS:
+        pieces.append(word)
+    
+    if peso_amount is not None:
+        amount = peso_amount
+    elif unit_amount is not None:
+        amount = unit_amount
+    else:
+        amount = bare_amount
+    
+    item = ' '.join(''.join(pieces).split())
+    return language, amount, item or None
+
+def detect_language(text):
+    """Detect if text is in English, Tagalog, or Bisaya"""
+    return lex_expense(text)[0]
+
+def extract_amount(text):
+    """Extract numerical amount from text"""
+    return lex_expense(text)[1]
+
+def extract_item(text, amount):
+    """Extract item/service from text"""
+    return lex_expense(text)[2]
+
+@lru_cache(maxsize=None)
+def get_default_matcher():
+    """Compile the default category keywords once per process"""
+    return KeywordMatcher({
+        category: keywords
+        for category, keywords in CATEGORY_KEYWORDS.items()
+        if category != 'Miscellaneous'
+    })
+
+def categorize_item(item_text, custom_matcher=None, classifier=None):
+    """Auto-assign category based on item keywords"""
+    return categorize_with_confidence(item_text, custom_matcher, classifier)[0]
+
+def categorize_with_confidence(item_text, custom_matcher=None, classifier=None):
+    """Category for the item and how sure the match is, from 0 to 1
+
+    An item the user has re-categorized before goes where they put it, and
+    a keyword found as typed scores 1. Otherwise the nearest keyword within
+    FUZZY_DISTANCE typos (scoring 1 - typos / keyword length) and the
+    classifier's guess compete, and Miscellaneous scores 0.
+    """
+    if not item_text:
+        return 'Miscellaneous', 0.0
+    
+    if classifier is not None:
+        category = classifier.recall(item_text)
+        if category is not None:
+            return category, 1.0
+    
+    # Custom categories take priority over the defaults
+    matchers = [custom_matcher, get_default_matcher()] if custom_matcher else [get_default_matcher()]
+    for matcher in matchers:
+        category = matcher.match(item_text)
+        if category is not None:
+            return category, 1.0
+    
+    best = None
+    for matcher in matchers:
+        hit = matcher.closest(item_text, FUZZY_DISTANCE)
+        if hit is not None:
+            category, keyword, distance = hit
+            confidence = 1 - distance / len(keyword)
+            if best is None or confidence > best[1]:
+                best = (category, confidence)
+    
+    if classifier is not None:
+        category, confidence = classifier.predict(item_text)
+        if confidence >= LEARNED_CONFIDENCE and (best is None or confidence > best[1]):
+            best = (category, confidence)
+    return best or ('Miscellaneous', 0.0)
+
+def apply_classifier(results, classifier):
+    """Re-categorize parse results with what the classifier learned, scoring them in one batch
+
+    Follows categorize_with_confidence's rules, for results parsed without
+    the classifier (e.g. in bulk-import worker processes).
+    """
+    ready = [result for result in results if result['status'] == 'ready']
+    if not ready or not len(classifier):
+        return results
+    unsure = []
+    for result in ready:
+        category = classifier.recall(result['item'])
+        if category is not None:
+            result['category'], result['confidence'] = category, 1.0
+        elif result['confidence'] < 1:
+            unsure.append(result)
+    guesses = classifier.predict_many([result['item'] for result in unsure])
+    for result, (category, confidence) in zip(unsure, guesses):
+        if confidence >= LEARNED_CONFIDENCE and confidence > result['confidence']:
+            result['category'], result['confidence'] = category, round(confidence, 2)
+    return results
+
+def get_response_text(lang, message_type):
+    """Get localized response text"""
+    return get_catalog().text(lang, message_type)
+
+# Parse results shared by every session in the process, keyed on the
+# whitespace-normalized text and the custom categories in effect
+PARSE_CACHE = VersionedCache(maxsize=10_000)
+
+def process_expense_input(user_input, custom_matcher=None, classifier=None):
+    """Process user input and extract expense data"""
+    text = ' '.join(user_input.split())
+    # Custom categories and learned corrections change categorize_item's answer, so they are part of the key
+    categories = (custom_matcher.fingerprint() if custom_matcher else None,
+                  classifier.fingerprint() if classifier else None)
+    result = PARSE_CACHE.get(text, categories, lambda: _parse_expense(text, custom_matcher, classifier))
+    # Callers edit the result (category override, bulk line), so hand out a copy
+    return dict(result)
+
+def _parse_expense(user_input, custom_matcher, classifier):
+    detected_lang, amount, item = lex_expense(user_input)
+    
+    if amount is None:
+        return {
+            'status': 'missing_amount',
+            'language': detected_lang,
+            'message': get_response_text(detected_lang, 'missing_amount')
+        }
+    
+    if item is None or item == '':
+        return {
+            'status': 'missing_item',
+            'language': detected_lang,
+            'amount': amount,
+            'message': get_response_text(detected_lang, 'missing_item')
+        }
+    
+    category, confidence = categorize_with_confidence(item, custom_matcher, classifier)
+    
+    return {
+        'status': 'ready',
+        'language': detected_lang,
+        'amount': amount,
+        'item': item,
+        'category': category,
+        'confidence': round(confidence, 2)
+    }
@@ -0,0 +1,135 @@
+"""Newest and largest expenses, ready without a query"""
+import heapq
+import threading
+from collections import deque
+
+RANK_DEPTH = 20
+
+
+class ExpenseRanking:
+    """The depth newest expenses, and the depth largest overall and per category
+
+    Attach it to an expense store. Each save costs O(log depth) for the
+    largest lists and usually O(1) for the newest, and asking for up to
+    depth expenses is O(k) with no database access. A category's list is
+    loaded from the store the first time it is asked for. Deleting an
+    expense that one of the lists holds takes it out; if that list was
+    full, the store may have a replacement, so the list is reloaded from
+    the store then. Asking for more than depth goes to the store.
+    """
+
+    def __init__(self, depth=RANK_DEPTH):
+        self.depth = depth
+        self._store = None
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._recent = deque()    # newest first, by (timestamp, id)
+            self._largest = {None: []}  # None (every category) or a loaded category -> min-heap
+
+    def load(self, store):
+        with self._lock:
+            self._store = store
+            self._recent = deque(store.recent(self.depth))
+            self._largest = {None: _heap(store.largest(self.depth))}
+
+    def add(self, expense):
+        with self._lock:
+            self._add(expense)
+
+    def _add(self, expense):
+        key = (expense['timestamp'], expense['id'])
+        position = 0
+        # New expenses are almost always the newest, so this stops at once
+        for held in self._recent:
+            if (held['timestamp'], held['id']) < key:
+                break
+            position += 1
+        if position < self.depth:
+            self._recent.insert(position, expense)
+            if len(self._recent) > self.depth:
+                self._recent.pop()
+
+        entry = _entry(expense)
+        for category in (None, expense['category']):
+            heap = self._largest.get(category)
+            if heap is None:
+                continue  # not loaded yet; the store will have it when it is
+            if len(heap) < self.depth:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+
+    def remove(self, expense):
+        with self._lock:
+            self._remove(expense)
+
+    def _remove(self, expense):
+        expense_id = expense['id']
+        if any(held['id'] == expense_id for held in self._recent):
+            if len(self._recent) == self.depth:
+                self._recent = deque(self._store.recent(self.depth))
+            else:
+                self._recent = deque(held for held in self._recent if held['id'] != expense_id)
+
+        for category in (None, expense['category']):
+            heap = self._largest.get(category) or []
+            if not any(entry[1] == -expense_id for entry in heap):
+                continue
+            if len(heap) == self.depth:
+                heap = _heap(self._store.largest(self.depth, category))
+            else:
+                heap = _heap([entry[2] for entry in heap if entry[1] != -expense_id])
+            self._largest[category] = heap
+
+    def recategorize(self, changes):
+        """Swap in the moved expenses; their categories' lists are reloaded when next asked for"""
+        with self._lock:
+            moved = {new['id']: new for _, new in changes}
+            # Amounts and times don't change, so neither does any ordering
+            self._recent = deque(moved.get(held['id'], held) for held in self._recent)
+            heap = self._largest[None]
+            self._largest[None] = [(amount, key, moved.get(-key, expense)) for amount, key, expense in heap]
+            for old, new in changes:
+                self._largest.pop(old['category'], None)
+                self._largest.pop(new['category'], None)
+
+    def recent(self, limit):
+        """The newest expenses, newest first"""
+        if not 0 <= limit <= self.depth:
+            return self._store.recent(limit)
+        # list() copies the deque in one step, so a save on another thread can't interrupt it
+        return [dict(expense) for expense in list(self._recent)[:limit]]
+
+    def largest(self, limit, category=None):
+        """The biggest expenses, overall or in one category, biggest first"""
+        if not 0 <= limit <= self.depth:
+            return self._store.largest(limit, category)
+        heap = self._largest.get(category)
+        if heap is None:
+            return [dict(expense) for expense in self._load_category(category)[:limit]]
+        ranked = sorted(heap, reverse=True)
+        return [dict(entry[2]) for entry in ranked[:limit]]
+
+    def _load_category(self, category):
+        # Saves bump the store's version before telling the indexes, and add()
+        # waits for this lock, so an unchanged version means nothing was missed
+        version = self._store.version
+        expenses = self._store.largest(self.depth, category)
+        with self._lock:
+            if self._store.version == version:
+                self._largest[category] = _heap(expenses)
+        return expenses
+
+
+def _entry(expense):
+    # Ties on amount go to the older expense, as in the store's ORDER BY amount DESC, id
+    return (expense['amount'], -expense['id'], expense)
+
+
+def _heap(expenses):
+    heap = [_entry(expense) for expense in expenses]
+    heapq.heapify(heap)
+    return heap
@@ -0,0 +1,880 @@
+"""Durable expense storage
+
+SQLiteExpenseStore keeps the expenses in a single SQLite file in WAL mode,
+with the timestamp and category columns indexed. Expenses are partitioned
+by user: each store sees one user's rows, and stores on the same file
+share a ConnectionPool. Saves can go through an ExpenseWriter, which
+commits them in the background in groups.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date
+
+DEFAULT_DB_PATH = os.environ.get('RESIBO_DB', 'resibo.db')
+DEFAULT_USER = ''
+POOL_SIZE = 4
+BUSY_TIMEOUT_MS = 5000
+
+# Write-behind: queued saves are committed in groups of up to BATCH_SIZE,
+# or whatever arrived within FLUSH_INTERVAL seconds of the first one
+WRITE_QUEUE_SIZE = 10_000
+BATCH_SIZE = 1_000
+FLUSH_INTERVAL = 0.02
+RETRY_DELAY = 0.5
+# Tries at a commit while the database is locked before its group is dropped
+COMMIT_ATTEMPTS = 20
+ID_BLOCK = 256
+
+logger = logging.getLogger(__name__)
+
+EXPENSE_COLUMNS = ('amount', 'item', 'category', 'timestamp')
+PERIODS = ('day', 'week', 'month')
+EPOCH = date(1970, 1, 1)
+
+# Each entry upgrades the schema by one version (tracked in PRAGMA user_version)
+MIGRATIONS = [
+    """
+    CREATE TABLE expenses (
+        id INTEGER PRIMARY KEY,
+        amount REAL NOT NULL,
+        item TEXT NOT NULL,
+        category TEXT NOT NULL,
+        timestamp TEXT NOT NULL
+    );
+    CREATE INDEX idx_expenses_timestamp ON expenses(timestamp);
+    CREATE INDEX idx_expenses_category ON expenses(category);
+    """,
+    """
+    CREATE TABLE chat_messages (
+        session_id TEXT NOT NULL,
+        seq INTEGER NOT NULL,
+        role TEXT NOT NULL,
+        content TEXT NOT NULL,
+        PRIMARY KEY (session_id, seq)
+    ) WITHOUT ROWID;
+    """,
+    """
+    ALTER TABLE expenses ADD COLUMN user_id TEXT NOT NULL DEFAULT '';
+    DROP INDEX idx_expenses_timestamp;
+    DROP INDEX idx_expenses_category;
+    CREATE INDEX idx_expenses_user_timestamp ON expenses(user_id, timestamp);
+    CREATE INDEX idx_expenses_user_category ON expenses(user_id, category);
+    CREATE TABLE revisions (
+        user_id TEXT PRIMARY KEY,
+        revision INTEGER NOT NULL
+    ) WITHOUT ROWID;
+    CREATE TABLE custom_categories (
+        user_id TEXT NOT NULL,
+        name TEXT NOT NULL,
+        keywords TEXT NOT NULL,
+        UNIQUE (user_id, name)
+    );
+    """,
+    """
+    CREATE TABLE id_sequence (next_id INTEGER NOT NULL);
+    INSERT INTO id_sequence SELECT COALESCE(MAX(id), 0) + 1 FROM expenses;
+    """,
+    # Integer time columns computed from the timestamp text, and per-day,
+    # per-week (Monday first) and per-month category totals kept by triggers
+    """
+    ALTER TABLE expenses ADD COLUMN ts INTEGER
+        GENERATED ALWAYS AS (CAST(strftime('%s', timestamp) AS INTEGER)) VIRTUAL;
+    ALTER TABLE expenses ADD COLUMN day INTEGER GENERATED ALWAYS AS (ts / 86400) VIRTUAL;
+    ALTER TABLE expenses ADD COLUMN month INTEGER GENERATED ALWAYS AS (
+        CAST(strftime('%Y', timestamp) AS INTEGER) * 12 + CAST(strftime('%m', timestamp) AS INTEGER) - 1
+    ) VIRTUAL;
+    CREATE INDEX idx_expenses_user_day ON expenses(user_id, day);
+    CREATE TABLE rollups (
+        user_id TEXT NOT NULL,
+        period TEXT NOT NULL,
+        bucket INTEGER NOT NULL,
+        category TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        total REAL NOT NULL,
+        PRIMARY KEY (user_id, period, bucket, category)
+    ) WITHOUT ROWID;
+    INSERT INTO rollups
+        SELECT user_id, 'day', day, category, COUNT(*), SUM(amount) FROM expenses GROUP BY 1, 3, 4;
+    INSERT INTO rollups
+        SELECT user_id, 'week', (day + 3) / 7, category, COUNT(*), SUM(amount) FROM expenses GROUP BY 1, 3, 4;
+    INSERT INTO rollups
+        SELECT user_id, 'month', month, category, COUNT(*), SUM(amount) FROM expenses GROUP BY 1, 3, 4;
+    CREATE TRIGGER expenses_rollups_insert AFTER INSERT ON expenses BEGIN
+        INSERT INTO rollups VALUES
+            (NEW.user_id, 'day', NEW.day, NEW.category, 1, NEW.amount),
+            (NEW.user_id, 'week', (NEW.day + 3) / 7, NEW.category, 1, NEW.amount),
+            (NEW.user_id, 'month', NEW.month, NEW.category, 1, NEW.amount)
+        ON CONFLICT DO UPDATE SET count = count + 1, total = total + excluded.total;
+    END;
+    CREATE TRIGGER expenses_rollups_delete AFTER DELETE ON expenses
+    WHEN EXISTS (SELECT 1 FROM rollups WHERE user_id = OLD.user_id) BEGIN
+        UPDATE rollups SET count = count - 1, total = total - OLD.amount
+            WHERE user_id = OLD.user_id AND period = 'day' AND bucket = OLD.day AND category = OLD.category;
+        UPDATE rollups SET count = count - 1, total = total - OLD.amount
+            WHERE user_id = OLD.user_id AND period = 'week' AND bucket = (OLD.day + 3) / 7
+            AND category = OLD.category;
+        UPDATE rollups SET count = count - 1, total = total - OLD.amount
+            WHERE user_id = OLD.user_id AND period = 'month' AND bucket = OLD.month AND category = OLD.category;
+        DELETE FROM rollups WHERE user_id = OLD.user_id AND count = 0 AND category = OLD.category
+            AND ((period = 'day' AND bucket = OLD.day) OR (period = 'week' AND bucket = (OLD.day + 3) / 7)
+                 OR (period = 'month' AND bucket = OLD.month));
+    END;
+    """,
+    # Categories the user picked over the suggested one, for the learned categorizer
+    """
+    CREATE TABLE category_overrides (
+        user_id TEXT NOT NULL,
+        item TEXT NOT NULL,
+        category TEXT NOT NULL
+    );
+    CREATE INDEX idx_category_overrides_user ON category_overrides(user_id, category);
+    """,
+    # Bumped by every change to a user's custom categories or overrides
+    """
+    CREATE TABLE settings_revisions (
+        user_id TEXT PRIMARY KEY,
+        revision INTEGER NOT NULL
+    ) WITHOUT ROWID;
+    """,
+]
+
+RESERVE_IDS = "UPDATE id_sequence SET next_id = next_id + ? RETURNING next_id - ?"
+INSERT_EXPENSE = (
+    "INSERT INTO expenses (id, user_id, amount, item, category, timestamp) VALUES (?, ?, ?, ?, ?, ?)"
+)
+SELECT_EXPENSE = "SELECT id, amount, item, category, timestamp FROM expenses WHERE id = ? AND user_id = ?"
+DELETE_EXPENSE = "DELETE FROM expenses WHERE id = ? AND user_id = ?"
+CLEAR_EXPENSES = "DELETE FROM expenses WHERE user_id = ?"
+# Dropped before CLEAR_EXPENSES so the delete trigger skips its per-row bookkeeping
+CLEAR_ROLLUPS = "DELETE FROM rollups WHERE user_id = ?"
+UPDATE_CATEGORY = "UPDATE expenses SET category = ? WHERE id = ? AND user_id = ?"
+ADD_ROLLUP = (
+    "INSERT INTO rollups VALUES (?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT DO UPDATE SET count = count + excluded.count, total = total + excluded.total"
+)
+DELETE_EMPTY_ROLLUPS = "DELETE FROM rollups WHERE user_id = ? AND count = 0"
+SELECT_ROLLUPS = (
+    "SELECT bucket, category, count, total FROM rollups "
+    "WHERE user_id = ? AND period = ? AND bucket BETWEEN ? AND ? ORDER BY bucket"
+)
+SELECT_COUNT = "SELECT COUNT(*) FROM expenses WHERE user_id = ?"
+SELECT_CATEGORY_STATS = (
+    "SELECT category, COUNT(*), SUM(amount) FROM expenses WHERE user_id = ? GROUP BY category"
+)
+SELECT_RECENT = (
+    "SELECT id, amount, item, category, timestamp FROM expenses WHERE user_id = ? "
+    "ORDER BY timestamp DESC, id DESC LIMIT ?"
+)
+SELECT_LARGEST = (
+    "SELECT id, amount, item, category, timestamp FROM expenses WHERE user_id = ? "
+    "ORDER BY amount DESC, id LIMIT ?"
+)
+SELECT_LARGEST_IN_CATEGORY = (
+    "SELECT id, amount, item, category, timestamp FROM expenses WHERE user_id = ? AND category = ? "
+    "ORDER BY amount DESC, id LIMIT ?"
+)
+SELECT_SINCE = (
+    "SELECT id, amount, item, category, timestamp FROM expenses "
+    "WHERE user_id = ? AND timestamp >= ? ORDER BY timestamp, id"
+)
+SELECT_CATEGORY_ITEMS = "SELECT DISTINCT item FROM expenses WHERE user_id = ? AND category = ?"
+SELECT_ROWS = "SELECT id, amount, item, category, timestamp FROM expenses WHERE user_id = ? ORDER BY id"
+# Keyset pages in (timestamp, id) order; each one is a range scan of idx_expenses_user_timestamp
+SELECT_PAGE = (
+    "SELECT id, amount, item, category, timestamp FROM expenses "
+    "WHERE user_id = ? AND (timestamp, id) > (?, ?) ORDER BY timestamp, id LIMIT ?"
+)
+BUMP_REVISION = (
+    "INSERT INTO revisions (user_id, revision) VALUES (?, 1) "
+    "ON CONFLICT(user_id) DO UPDATE SET revision = revision + 1 RETURNING revision"
+)
+SELECT_REVISION = "SELECT revision FROM revisions WHERE user_id = ?"
+BUMP_SETTINGS_REVISION = (
+    "INSERT INTO settings_revisions (user_id, revision) VALUES (?, 1) "
+    "ON CONFLICT(user_id) DO UPDATE SET revision = revision + 1"
+)
+SELECT_SETTINGS_REVISION = "SELECT revision FROM settings_revisions WHERE user_id = ?"
+SELECT_CUSTOM_CATEGORIES = "SELECT name, keywords FROM custom_categories WHERE user_id = ? ORDER BY rowid"
+UPSERT_CUSTOM_CATEGORY = (
+    "INSERT INTO custom_categories (user_id, name, keywords) VALUES (?, ?, ?) "
+    "ON CONFLICT(user_id, name) DO UPDATE SET keywords = excluded.keywords"
+)
+DELETE_CUSTOM_CATEGORY = "DELETE FROM custom_categories WHERE user_id = ? AND name = ?"
+SELECT_OVERRIDES = "SELECT item, category FROM category_overrides WHERE user_id = ? ORDER BY rowid"
+INSERT_OVERRIDE = "INSERT INTO category_overrides (user_id, item, category) VALUES (?, ?, ?)"
+DELETE_OVERRIDES = "DELETE FROM category_overrides WHERE user_id = ? AND category = ?"
+INSERT_MESSAGE = "INSERT INTO chat_messages (session_id, seq, role, content) VALUES (?, ?, ?, ?)"
+SELECT_MESSAGES = (
+    "SELECT seq, role, content FROM chat_messages "
+    "WHERE session_id = ? AND seq < ? ORDER BY seq DESC LIMIT ?"
+)
+DELETE_MESSAGES = "DELETE FROM chat_messages WHERE session_id = ?"
+CLEAR_MESSAGES = "DELETE FROM chat_messages"
+
+
+def period_buckets(timestamp):
+    """Day, week and month bucket numbers of a '%Y-%m-%d %H:%M:%S' timestamp
+
+    The same numbers the rollup triggers compute: days since 1970-01-01,
+    Monday-first weeks counted from the week of 1970-01-01, and
+    year * 12 + month - 1.
+    """
+    moment = date.fromisoformat(timestamp[:10])
+    day = (moment - EPOCH).days
+    return {'day': day, 'week': (day + 3) // 7, 'month': moment.year * 12 + moment.month - 1}
+
+
+def summarize_rollup(rows):
+    """Total and (category, total) pairs, largest first, of store.rollup() rows"""
+    categories = {}
+    for _, category, _, amount in rows:
+        categories[category] = categories.get(category, 0.0) + amount
+    ranked = sorted(categories.items(), key=lambda pair: pair[1], reverse=True)
+    return sum(categories.values()), ranked
+
+
+class ConnectionPool:
+    """SQLite connections to one database file, shared by every store on it
+
+    Connections are opened on demand up to size and handed out one per
+    thread; a thread that asks again while holding one gets the same
+    connection back, so nested calls can't deadlock the pool. WAL mode lets
+    readers on different connections run alongside a writer.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH, size=POOL_SIZE):
+        self.path = path
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        with self.connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._migrate(conn)
+
+    def _open(self):
+        conn = sqlite3.connect(
+            self.path, check_same_thread=False, isolation_level=None, cached_statements=64
+        )
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        return conn
+
+    @staticmethod
+    def _migrate(conn):
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for number, script in enumerate(MIGRATIONS[version:], start=version + 1):
+            conn.executescript(f"BEGIN; {script} PRAGMA user_version = {number}; COMMIT;")
+
+    @contextmanager
+    def connection(self):
+        held = getattr(self._local, 'conn', None)
+        if held is not None:
+            yield held
+            return
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_open = self._opened < self.size
+                if can_open:
+                    self._opened += 1
+            conn = self._open() if can_open else self._idle.get()
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            self._idle.put(conn)
+
+    def close(self):
+        with self._lock:
+            for _ in range(self._opened):
+                self._idle.get().close()
+            self._opened = 0
+
+
+class ExpenseWriter:
+    """Background thread that group-commits submitted expenses
+
+    submit() puts expenses on a bounded queue and returns; a burst larger
+    than the queue blocks the submitter instead of growing memory. The
+    thread takes the first queued expense, gathers whatever else arrives
+    within FLUSH_INTERVAL (up to BATCH_SIZE), and inserts the group in one
+    transaction per store. flush() waits for the queue to drain, and the
+    queue is flushed at interpreter exit.
+
+    Crash safety: each group is committed atomically, and a committed
+    group survives a process crash (WAL, synchronous=NORMAL; an OS crash or
+    power cut can still lose the last commits, as with direct saves). What
+    a crash (kill -9, OOM) loses is everything submitted but not yet
+    committed: at most the queue's contents, normally the last
+    FLUSH_INTERVAL worth of saves. A commit that fails with a locked or
+    busy database is retried, up to COMMIT_ATTEMPTS times. Any other
+    failure, or running out of attempts, drops the group: it is logged, the
+    store reloads its indexes without it, and the error is kept for the
+    store's pop_write_error().
+    """
+
+    def __init__(self, max_queue=WRITE_QUEUE_SIZE, batch_size=BATCH_SIZE, interval=FLUSH_INTERVAL):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.batches = 0
+        self.written = 0
+        self.dropped = 0
+        self._queue = queue.Queue(max_queue)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='resibo-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def put(self, store, expense):
+        if self._closed:
+            raise RuntimeError("expense writer is closed")
+        self._queue.put((store, expense))
+
+    def flush(self):
+        self._queue.join()
+
+    def close(self):
+        """Write everything still queued and stop the thread"""
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._thread.join()
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.interval
+        while len(batch) < self.batch_size and batch[-1] is not None:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            groups = {}
+            for entry in batch:
+                if entry is not None:
+                    groups.setdefault(entry[0], []).append(entry[1])
+            for store, expenses in groups.items():
+                self._commit(store, expenses)
+            for _ in batch:
+                self._queue.task_done()
+            if batch[-1] is None:
+                return
+
+    def _commit(self, store, expenses):
+        for attempt in range(1, COMMIT_ATTEMPTS + 1):
+            try:
+                store._write_submitted(expenses)
+            except sqlite3.OperationalError as error:
+                if is_busy(error) and attempt < COMMIT_ATTEMPTS:
+                    logger.warning("expense writer: database busy, retrying (%d/%d)", attempt, COMMIT_ATTEMPTS)
+                    time.sleep(RETRY_DELAY)
+                    continue
+                self._drop(store, expenses, error)
+            except Exception as error:
+                self._drop(store, expenses, error)
+            else:
+                self.batches += 1
+                self.written += len(expenses)
+            return
+
+    def _drop(self, store, expenses, error):
+        logger.error("expense writer: dropped %d expenses", len(expenses), exc_info=error)
+        self.dropped += len(expenses)
+        store._drop_submitted(expenses, error)
+
+
+def is_busy(error):
+    """Whether an OperationalError means another connection holds the database"""
+    code = getattr(error, 'sqlite_errorcode', None)
+    if code is not None:
+        return code & 0xff in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    return 'locked' in str(error) or 'busy' in str(error)
+
+
+class SQLiteExpenseStore:
+    """Saved expenses of one user, in a SQLite database file in WAL mode
+
+    Expenses are dicts with 'amount', 'item', 'category' and 'timestamp';
+    rows read back also carry their 'id'.
+
+    In-memory indexes can be attached to a store: anything with load(store),
+    add(expense), remove(expense) and clear() is loaded once and then told
+    about every write, so it never has to rescan the history. An index
+    can also have remove_many(expenses) and recategorize(changes) to take
+    a batch of deletes or category moves at once; otherwise it sees them
+    one expense at a time.
+
+    version goes up on every change to the data, so anything derived from
+    the expenses can be cached against it. Every write transaction also
+    bumps the user's row in the revisions table, which is how sync()
+    notices writes made by other stores or processes. submit() hands saves
+    to an ExpenseWriter; until they are committed they are kept in
+    _pending, and every read merges them in, so the app (and a reload of
+    the indexes) sees its own saves at once.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH, user_id=DEFAULT_USER, pool=None, writer=None):
+        self.path = path
+        self.user_id = user_id
+        self._owns_pool = pool is None
+        self._pool = ConnectionPool(path) if pool is None else pool
+        self._writer = writer
+        self._owns_writer = writer is None
+        self._pending = {}
+        self._write_error = None
+        self._next_id = self._end_id = 0
+        self._indexes = []
+        self.version = 0
+        # Writes and index updates happen in the same order for every session thread
+        self._lock = threading.RLock()
+        self._revision = self._read_revision()
+
+    @contextmanager
+    def _transaction(self):
+        """Run the body in a write transaction; the caller holds the lock"""
+        with self._pool.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                self._revision = conn.execute(BUMP_REVISION, (self.user_id,)).fetchone()[0]
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def _query(self, sql, params=()):
+        with self._pool.connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def attach(self, index):
+        """Load an in-memory index and keep it in step with later writes"""
+        # Hold the lock so no write slips in between loading and attaching
+        with self._lock:
+            index.load(self)
+            self._indexes.append(index)
+            return index
+
+    def _reload_indexes(self):
+        self.version += 1
+        for index in self._indexes:
+            index.load(self)
+
+    def _notify_add(self, expenses):
+        self.version += 1
+        for index in self._indexes:
+            for expense in expenses:
+                index.add(expense)
+
+    def _notify_remove(self, expense):
+        self.version += 1
+        for index in self._indexes:
+            index.remove(expense)
+
+    def _notify_remove_many(self, expenses):
+        self.version += 1
+        for index in self._indexes:
+            remove_many = getattr(index, 'remove_many', None)
+            if remove_many is not None:
+                remove_many(expenses)
+                continue
+            for expense in expenses:
+                index.remove(expense)
+
+    def _notify_recategorize(self, changes):
+        self.version += 1
+        for index in self._indexes:
+            recategorize = getattr(index, 'recategorize', None)
+            if recategorize is not None:
+                recategorize(changes)
+                continue
+            for old, new in changes:
+                index.remove(old)
+                index.add(new)
+
+    def _notify_clear(self):
+        self.version += 1
+        for index in self._indexes:
+            index.clear()
+
+    def _read_revision(self):
+        row = self._query(SELECT_REVISION, (self.user_id,))
+        return row[0][0] if row else 0
+
+    def sync(self):
+        """Reload attached indexes if the data changed behind the store's back"""
+        with self._lock:
+            revision = self._read_revision()
+            if revision != self._revision:
+                self._revision = revision
+                self._reload_indexes()
+
+    def close(self):
+        if self._owns_writer and self._writer is not None:
+            self._writer.close()
+        self.flush()
+        if self._owns_pool:
+            self._pool.close()
+
+    def _reserve_id(self):
+        """Next id from this store's block, reserving a new block when it runs out"""
+        if self._next_id == self._end_id:
+            with self._pool.connection() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    self._next_id = conn.execute(RESERVE_IDS, (ID_BLOCK, ID_BLOCK)).fetchone()[0]
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+                conn.execute("COMMIT")
+            self._end_id = self._next_id + ID_BLOCK
+        self._next_id += 1
+        return self._next_id - 1
+
+    def submit(self, expenses):
+        """Save expenses without waiting for the disk and return their ids
+
+        Attached indexes see them at once; an ExpenseWriter commits them in
+        the background.
+        """
+        with self._lock:
+            if self._writer is None:
+                self._writer = ExpenseWriter()
+            saved = [
+                dict(zip(('id',) + EXPENSE_COLUMNS,
+                         (self._reserve_id(),) + tuple(expense[column] for column in EXPENSE_COLUMNS)))
+                for expense in expenses
+            ]
+            for expense in saved:
+                self._pending[expense['id']] = expense
+            self._notify_add(saved)
+        for expense in saved:
+            self._writer.put(self, expense)
+        return [expense['id'] for expense in saved]
+
+    def _write_submitted(self, expenses):
+        # Under the lock, so a sync() can't see the rows both on disk and in _pending
+        with self._lock:
+            with self._transaction() as conn:
+                conn.executemany(INSERT_EXPENSE, [
+                    (expense['id'], self.user_id) + tuple(expense[column] for column in EXPENSE_COLUMNS)
+                    for expense in expenses
+                ])
+            self._forget_submitted(expenses)
+
+    def _forget_submitted(self, expenses):
+        with self._lock:
+            for expense in expenses:
+                self._pending.pop(expense['id'], None)
+
+    def _drop_submitted(self, expenses, error):
+        """Give up on saves the writer couldn't commit; the indexes stop counting them"""
+        with self._lock:
+            self._forget_submitted(expenses)
+            self._write_error = error
+            self._reload_indexes()
+
+    def pop_write_error(self):
+        """The error that made the writer drop submitted expenses since the last call, or None"""
+        with self._lock:
+            error, self._write_error = self._write_error, None
+            return error
+
+    def flush(self):
+        """Wait until every submitted expense is on disk"""
+        # Never called with the lock held: the writer needs it to commit
+        if self._writer is not None:
+            self._writer.flush()
+
+    def add(self, expense):
+        """Save one expense and return its id"""
+        return self.add_many([expense])[0]
+
+    def add_many(self, expenses):
+        """Save a batch of expenses in one transaction and return their ids"""
+        with self._lock:
+            with self._transaction() as conn:
+                # Ids are handed out up front so the batch goes through one executemany
+                first_id = conn.execute(RESERVE_IDS, (len(expenses), len(expenses))).fetchone()[0]
+                saved = [
+                    dict(zip(('id',) + EXPENSE_COLUMNS,
+                             (expense_id,) + tuple(expense[column] for column in EXPENSE_COLUMNS)))
+                    for expense_id, expense in enumerate(expenses, start=first_id)
+                ]
+                conn.executemany(INSERT_EXPENSE, [
+                    (expense['id'], self.user_id) + tuple(expense[column] for column in EXPENSE_COLUMNS)
+                    for expense in saved
+                ])
+            self._notify_add(saved)
+        return [expense['id'] for expense in saved]
+
+    def delete(self, expense_id):
+        """Delete one expense by id"""
+        self.flush()
+        with self._lock:
+            with self._transaction() as conn:
+                row = conn.execute(SELECT_EXPENSE, (expense_id, self.user_id)).fetchone()
+                conn.execute(DELETE_EXPENSE, (expense_id, self.user_id))
+            if row is not None:
+                self._notify_remove(dict(zip(('id',) + EXPENSE_COLUMNS, row)))
+
+    def delete_many(self, expense_ids):
+        """Delete expenses by id in one transaction and return how many were found"""
+        self.flush()
+        with self._lock:
+            with self._transaction() as conn:
+                rows = [conn.execute(SELECT_EXPENSE, (expense_id, self.user_id)).fetchone()
+                        for expense_id in expense_ids]
+                removed = [dict(zip(('id',) + EXPENSE_COLUMNS, row)) for row in rows if row is not None]
+                conn.executemany(DELETE_EXPENSE, [(expense['id'], self.user_id) for expense in removed])
+            if removed:
+                self._notify_remove_many(removed)
+        return len(removed)
+
+    def clear(self):
+        """Delete every expense"""
+        self.flush()
+        with self._lock:
+            with self._transaction() as conn:
+                conn.execute(CLEAR_ROLLUPS, (self.user_id,))
+                conn.execute(CLEAR_EXPENSES, (self.user_id,))
+            self._notify_clear()
+
+    def recategorize(self, moves):
+        """Move expenses between categories in one transaction and return how many moved
+
+        moves maps expense ids to (from_category, to_category); an expense
+        no longer filed under from_category stays where it is. Attached
+        indexes get the moves as (old, new) expense pairs.
+        """
+        self.flush()
+        with self._lock:
+            with self._transaction() as conn:
+                changes = []
+                for expense_id, (source, target) in moves.items():
+                    row = conn.execute(SELECT_EXPENSE, (expense_id, self.user_id)).fetchone()
+                    if row is not None and row[3] == source and target != source:
+                        old = dict(zip(('id',) + EXPENSE_COLUMNS, row))
+                        changes.append((old, dict(old, category=target)))
+                conn.executemany(UPDATE_CATEGORY, [(new['category'], new['id'], self.user_id) for _, new in changes])
+                # No trigger watches updates, so the rollups get one net change per cell instead
+                cells = {}
+                for old, new in changes:
+                    for period, bucket in period_buckets(old['timestamp']).items():
+                        for category, sign in ((old['category'], -1), (new['category'], 1)):
+                            cell = cells.setdefault((period, bucket, category), [0, 0.0])
+                            cell[0] += sign
+                            cell[1] += sign * old['amount']
+                conn.executemany(ADD_ROLLUP, [
+                    (self.user_id,) + key + tuple(cell) for key, cell in cells.items() if cell[0] or cell[1]
+                ])
+                conn.execute(DELETE_EMPTY_ROLLUPS, (self.user_id,))
+            if changes:
+                self._notify_recategorize(changes)
+        return len(changes)
+
+    def _read(self, sql, params):
+        """Query the database and snapshot the still-queued saves in one step"""
+        if not self._pending:
+            return self._query(sql, params), []
+        # The writer commits and forgets a group under the lock, so nothing is seen twice
+        with self._lock:
+            return self._query(sql, params), list(self._pending.values())
+
+    def count(self):
+        """Number of saved expenses"""
+        rows, pending = self._read(SELECT_COUNT, (self.user_id,))
+        return rows[0][0] + len(pending)
+
+    def category_stats(self):
+        """(category, count, total) for every category"""
+        rows, pending = self._read(SELECT_CATEGORY_STATS, (self.user_id,))
+        if not pending:
+            return rows
+        stats = {category: [count, total] for category, count, total in rows}
+        for expense in pending:
+            entry = stats.setdefault(expense['category'], [0, 0.0])
+            entry[0] += 1
+            entry[1] += expense['amount']
+        return [(category, count, total) for category, (count, total) in stats.items()]
+
+    def recent(self, limit):
+        """The newest expenses, newest first"""
+        rows, pending = self._read(SELECT_RECENT, (self.user_id, limit))
+        expenses = [dict(zip(('id',) + EXPENSE_COLUMNS, row)) for row in rows]
+        if pending:
+            expenses = sorted(expenses + pending, key=lambda e: (e['timestamp'], e['id']), reverse=True)[:limit]
+        return expenses
+
+    def largest(self, limit, category=None):
+        """The biggest expenses, overall or in one category, biggest first"""
+        if category is None:
+            rows, pending = self._read(SELECT_LARGEST, (self.user_id, limit))
+        else:
+            rows, pending = self._read(SELECT_LARGEST_IN_CATEGORY, (self.user_id, category, limit))
+            pending = [expense for expense in pending if expense['category'] == category]
+        expenses = [dict(zip(('id',) + EXPENSE_COLUMNS, row)) for row in rows]
+        if pending:
+            expenses = sorted(expenses + pending, key=lambda e: (-e['amount'], e['id']))[:limit]
+        return expenses
+
+    def rollup(self, period, first, last=None):
+        """(bucket, category, count, total) for period buckets first..last, oldest first
+
+        period is 'day', 'week' or 'month'; bucket numbers come from
+        period_buckets().
+        """
+        if period not in PERIODS:
+            raise ValueError(f"period must be one of {PERIODS}")
+        last = first if last is None else last
+        rows, pending = self._read(SELECT_ROLLUPS, (self.user_id, period, first, last))
+        if not pending:
+            return rows
+        cells = {(bucket, category): [count, total] for bucket, category, count, total in rows}
+        for expense in pending:
+            bucket = period_buckets(expense['timestamp'])[period]
+            if first <= bucket <= last:
+                cell = cells.setdefault((bucket, expense['category']), [0, 0.0])
+                cell[0] += 1
+                cell[1] += expense['amount']
+        return sorted((bucket, category, count, total) for (bucket, category), (count, total) in cells.items())
+
+    def since(self, timestamp):
+        """Expenses saved at or after timestamp, oldest first"""
+        rows, pending = self._read(SELECT_SINCE, (self.user_id, timestamp))
+        expenses = [dict(zip(('id',) + EXPENSE_COLUMNS, row)) for row in rows]
+        if pending:
+            expenses = sorted(expenses + [expense for expense in pending if expense['timestamp'] >= timestamp],
+                              key=lambda e: (e['timestamp'], e['id']))
+        return expenses
+
+    def category_items(self, category):
+        """The distinct items of the expenses filed under category"""
+        rows, pending = self._read(SELECT_CATEGORY_ITEMS, (self.user_id, category))
+        return {row[0] for row in rows} | {expense['item'] for expense in pending if expense['category'] == category}
+
+    def rows(self):
+        """Every expense as an (id, amount, item, category, timestamp) tuple, in id order"""
+        rows, pending = self._read(SELECT_ROWS, (self.user_id,))
+        if pending:
+            rows = sorted(rows + [tuple(expense.values()) for expense in pending])
+        return rows
+
+    def iter_chunks(self, size):
+        """All expenses, oldest first, as lists of up to size (amount, item, category, timestamp) rows"""
+        # Queued saves first, so every page comes straight from the database
+        self.flush()
+        after = ('', 0)
+        while True:
+            rows = self._query(SELECT_PAGE, (self.user_id,) + after + (size,))
+            if not rows:
+                return
+            after = (rows[-1][4], rows[-1][0])
+            yield [row[1:] for row in rows]
+
+    def save_messages(self, session_id, messages):
+        """Store (seq, role, content) chat messages spilled from a session's history"""
+        with self._pool.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(INSERT_MESSAGE, [(session_id,) + tuple(message) for message in messages])
+            conn.execute("COMMIT")
+
+    def messages_before(self, session_id, seq, limit):
+        """Up to limit stored messages numbered below seq, oldest first"""
+        return self._query(SELECT_MESSAGES, (session_id, seq, limit))[::-1]
+
+    def clear_messages(self, session_id=None):
+        """Drop one session's stored messages, or every session's"""
+        with self._pool.connection() as conn:
+            if session_id is None:
+                conn.execute(CLEAR_MESSAGES)
+            else:
+                conn.execute(DELETE_MESSAGES, (session_id,))
+
+    def settings_revision(self):
+        """A number that changes whenever the custom categories or overrides do"""
+        row = self._query(SELECT_SETTINGS_REVISION, (self.user_id,))
+        return row[0][0] if row else 0
+
+    @contextmanager
+    def _settings_transaction(self):
+        with self._pool.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute(BUMP_SETTINGS_REVISION, (self.user_id,))
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def custom_categories(self):
+        """The user's custom categories as {name: keywords}, oldest first"""
+        return {name: json.loads(keywords)
+                for name, keywords in self._query(SELECT_CUSTOM_CATEGORIES, (self.user_id,))}
+
+    def save_custom_category(self, name, keywords):
+        """Add a custom category, or replace its keywords keeping its place"""
+        with self._settings_transaction() as conn:
+            conn.execute(UPSERT_CUSTOM_CATEGORY, (self.user_id, name, json.dumps(list(keywords))))
+
+    def delete_custom_category(self, name):
+        """Delete one custom category and the overrides that picked it"""
+        with self._settings_transaction() as conn:
+            conn.execute(DELETE_CUSTOM_CATEGORY, (self.user_id, name))
+            conn.execute(DELETE_OVERRIDES, (self.user_id, name))
+
+    def overrides(self):
+        """(item, category) pairs where the user changed the suggested category, oldest first"""
+        return self._query(SELECT_OVERRIDES, (self.user_id,))
+
+    def save_override(self, item, category):
+        """Remember that the user filed item under category instead of the suggestion"""
+        with self._settings_transaction() as conn:
+            conn.execute(INSERT_OVERRIDE, (self.user_id, item, category))
+
+
+class SQLiteBackend:
+    """Process-wide home of every user's store on one database file
+
+    Stores are created on first use and kept, so each user's attached
+    indexes are built once and shared by all of that user's sessions.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH, pool_size=POOL_SIZE):
+        self.path = path
+        self.pool = ConnectionPool(path, pool_size)
+        self.writer = ExpenseWriter()
+        self._stores = {}
+        self._lock = threading.Lock()
+
+    def store(self, user_id=DEFAULT_USER):
+        with self._lock:
+            store = self._stores.get(user_id)
+            if store is None:
+                store = self._stores[user_id] = SQLiteExpenseStore(self.path, user_id, self.pool, self.writer)
+            return store
+
+    def __len__(self):
+        return len(self._stores)
+
+    def close(self):
+        self.writer.close()
+        self.pool.close()
@@ -0,0 +1,107 @@
+"""Spending over time, bucketed on the server so the chart stays small
+
+The bucket size is the finest of hour, day, week and month that keeps the
+visible range within MAX_POINTS buckets, so the browser gets at most a
+few hundred points whether the history holds a hundred expenses or a
+million. Zooming in re-buckets just the selected range.
+"""
+import numpy as np
+
+MAX_POINTS = 400
+HOUR = 3600
+DAY = 24 * HOUR
+# Weeks start on Monday, as in the rollups; 1970-01-01 was a Thursday
+WEEK_OFFSET = 3 * DAY
+UNITS = (('hour', HOUR), ('day', DAY), ('week', 7 * DAY))
+
+
+def month_of(seconds):
+    """Months since 1970-01 of epoch seconds"""
+    return np.asarray(seconds).astype('datetime64[s]').astype('datetime64[M]').astype(np.int64)
+
+
+def pick_unit(start, end, max_points=MAX_POINTS):
+    """The finest bucket size that splits start..end (epoch seconds) into at most max_points"""
+    for unit, width in UNITS:
+        offset = WEEK_OFFSET if unit == 'week' else 0
+        if (end + offset) // width - (start + offset) // width < max_points:
+            return unit
+    return 'month'
+
+
+def spending_timeline(times, amounts, start=None, end=None, max_points=MAX_POINTS):
+    """Total and count per bucket of the expenses between start and end, empty buckets included
+
+    times are epoch seconds (ExpenseTable's timestamp column) and amounts
+    the matching amounts; start and end default to the first and last
+    expense. Returns a dict with the unit, each bucket's start as
+    datetime64[s], and the totals and counts.
+    """
+    times = np.asarray(times)
+    amounts = np.asarray(amounts)
+    if start is None or end is None:
+        start = int(times.min()) if start is None else start
+        end = int(times.max()) if end is None else end
+    inside = (times >= start) & (times <= end)
+    times, amounts = times[inside], amounts[inside]
+
+    unit = pick_unit(start, end, max_points)
+    if unit == 'month':
+        first, last = month_of(start), month_of(end)
+        buckets = month_of(times) - first
+        starts = np.arange(first, last + 1).astype('datetime64[M]').astype('datetime64[s]')
+    else:
+        width = dict(UNITS)[unit]
+        offset = WEEK_OFFSET if unit == 'week' else 0
+        first, last = (start + offset) // width, (end + offset) // width
+        buckets = (times + offset) // width - first
+        starts = (np.arange(first, last + 1) * width - offset).astype('datetime64[s]')
+    return {
+        'unit': unit,
+        'start': start,
+        'end': end,
+        'starts': starts,
+        'totals': np.bincount(buckets, weights=amounts, minlength=len(starts)),
+        'counts': np.bincount(buckets, minlength=len(starts)),
+    }
+
+
+def build_spending_timeline(timeline):
+    """WebGL line chart of a spending_timeline(); drag across it to pick a range to zoom into"""
+    import plotly.graph_objects as go
+
+    unit = timeline['unit']
+    fig = go.Figure(go.Scattergl(
+        x=timeline['starts'],
+        y=timeline['totals'],
+        customdata=timeline['counts'],
+        mode='lines+markers',
+        line=dict(color='#FF385C', width=2),
+        marker=dict(size=4),
+        hovertemplate=f'%{{x}}<br>₱%{{y:,.2f}} in %{{customdata}} expenses<extra>per {unit}</extra>',
+    ))
+    fig.update_layout(
+        height=350,
+        margin=dict(l=10, r=10, t=30, b=10),
+        title=f"Spending per {unit}",
+        dragmode='select',
+        selectdirection='h',
+        yaxis=dict(title='₱', rangemode='tozero'),
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+    )
+    return fig
+
+
+def selected_range(selection):
+    """Epoch seconds (start, end) of a box dragged across the chart, or None"""
+    boxes = selection.get('box') if selection else None
+    if not boxes or len(boxes[0].get('x', ())) != 2:
+        return None
+    edges = []
+    for value in boxes[0]['x']:
+        # Date axes report strings; numbers would be epoch milliseconds
+        moment = np.datetime64(int(value), 'ms') if isinstance(value, (int, float)) else np.datetime64(value)
+        edges.append(int(moment.astype('datetime64[s]').astype(np.int64)))
+    start, end = sorted(edges)
+    return (start, end) if end > start else None
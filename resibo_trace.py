@@ -0,0 +1,146 @@
+"""Per-rerun timing spans for finding where the app spends its time
+
+    from resibo_trace import TRACER
+
+    TRACER.begin_run(page='log')
+    with TRACER.span('process_expense_input'):
+        ...
+    TRACER.end_run()
+
+A run is one execution of the Streamlit script, tracked per thread (each
+session reruns on its own thread). Finished runs are kept in memory for
+the debug panel and, if RESIBO_TRACE_FILE is set, appended to it as JSON
+lines. Tracing is off unless RESIBO_TRACE=1 or enabled at runtime; while
+off, span() hands back one shared no-op context manager. Runs can be
+tagged with a session so each session's panel lists only its own.
+"""
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from datetime import datetime
+
+KEEP_RUNS = 50
+
+_NOOP = nullcontext()
+
+
+class _Span:
+    __slots__ = ('run', 'name', 'start')
+
+    def __init__(self, run, name):
+        self.run = run
+        self.name = name
+
+    def __enter__(self):
+        self.run['_depth'] += 1
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        run = self.run
+        run['_depth'] -= 1
+        run['spans'].append({
+            'name': self.name,
+            'depth': run['_depth'],
+            'start_ms': (self.start - run['_start']) * 1e3,
+            'ms': (end - self.start) * 1e3,
+        })
+        return False
+
+
+class Tracer:
+    """Collects the spans of each script run and keeps the last few runs"""
+
+    def __init__(self, enabled=False, keep=KEEP_RUNS, dump_path=None):
+        self.enabled = enabled
+        self.dump_path = dump_path
+        self.runs = deque(maxlen=keep)
+        self._ids = itertools.count(1)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def begin_run(self, **fields):
+        """Start timing a script run on this thread
+
+        A run still open here was cut short by st.rerun() or st.stop(), so
+        it is closed first and marked interrupted.
+        """
+        if getattr(self._local, 'run', None) is not None:
+            self.end_run(status='interrupted')
+        if not self.enabled:
+            return
+        self._local.run = dict(fields, run=next(self._ids), started=datetime.now().isoformat(timespec='milliseconds'),
+                               spans=[], _start=time.perf_counter(), _depth=0)
+
+    def annotate(self, **fields):
+        """Add fields (page, user, ...) to this thread's current run"""
+        run = getattr(self._local, 'run', None)
+        if run is not None:
+            run.update(fields)
+
+    def span(self, name):
+        """Context manager timing one step of the current run"""
+        run = getattr(self._local, 'run', None) if self.enabled else None
+        return _NOOP if run is None else _Span(run, name)
+
+    def end_run(self, status='complete'):
+        run = getattr(self._local, 'run', None)
+        if run is None:
+            return
+        self._local.run = None
+        total = (time.perf_counter() - run.pop('_start')) * 1e3
+        del run['_depth']
+        run.update(total_ms=total, status=status)
+        run['spans'].sort(key=lambda span: span['start_ms'])
+        with self._lock:
+            self.runs.append(run)
+            if self.dump_path:
+                with open(self.dump_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(run) + '\n')
+
+    def recent_runs(self, session=None):
+        """Finished runs, newest first; only those tagged with session, if given"""
+        with self._lock:
+            runs = list(reversed(self.runs))
+        return runs if session is None else [run for run in runs if run.get('session') == session]
+
+    def to_jsonl(self, session=None):
+        return ''.join(json.dumps(run) + '\n' for run in self.recent_runs(session))
+
+
+def build_waterfall(run):
+    """Horizontal bar chart of one run's spans on a shared time axis"""
+    import plotly.graph_objects as go
+
+    spans = run['spans']
+    labels = [f"{'  ' * span['depth']}{span['name']}" for span in spans]
+    fig = go.Figure(go.Bar(
+        y=labels,
+        x=[span['ms'] for span in spans],
+        base=[span['start_ms'] for span in spans],
+        orientation='h',
+        marker_color='#FF385C',
+        hovertemplate='%{y}: %{x:.1f} ms<extra></extra>',
+    ))
+    fig.update_layout(
+        height=120 + 24 * len(spans),
+        margin=dict(l=10, r=10, t=30, b=10),
+        title=f"Run {run['run']} ({'/'.join(filter(None, [run.get('page', '?'), run.get('fragment')]))}): "
+              f"{run['total_ms']:.1f} ms, {run['status']}",
+        xaxis_title='ms since the run started',
+        yaxis=dict(autorange='reversed'),
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+    )
+    return fig
+
+
+TRACER = Tracer(
+    enabled=os.environ.get('RESIBO_TRACE') == '1',
+    dump_path=os.environ.get('RESIBO_TRACE_FILE'),
+)
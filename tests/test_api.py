@@ -0,0 +1,37 @@
+"""ExpenseService: what the API endpoints save and report"""
+import pytest
+
+from resibo_api import ExpenseService, now
+from resibo_storage import DEFAULT_USER, SQLiteBackend
+
+
+@pytest.fixture
+def service(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / 'resibo.db'))
+    yield ExpenseService(backend)
+    backend.close()
+
+
+def test_repeated_batch_lines_are_all_saved(service):
+    results = service.batch(['jeep 15', 'jeep 15', 'jeep 15'], DEFAULT_USER, save=True, skip_duplicates=True)
+    assert [result['duplicate_of'] for result in results] == [None, None, None]
+    assert len({result['id'] for result in results}) == 3
+    assert service.summary(DEFAULT_USER)['count'] == 3
+
+
+def test_batch_skips_lines_already_saved(service):
+    first = service.batch(['jeep 15'], DEFAULT_USER, save=True, skip_duplicates=True)
+    again = service.batch(['jeep 15'], DEFAULT_USER, save=True, skip_duplicates=True)
+    assert again[0]['duplicate_of'] == again[0]['id'] == first[0]['id']
+    assert service.summary(DEFAULT_USER)['count'] == 1
+
+
+def test_top_categories_today_leaves_out_earlier_days(service):
+    service.save([
+        {'amount': 5000.0, 'item': 'rent', 'category': 'Bills & Utilities', 'timestamp': '2020-01-01 09:00:00'},
+        {'amount': 15.0, 'item': 'jeep', 'category': 'Transport', 'timestamp': now()},
+    ], DEFAULT_USER)
+    summary = service.summary(DEFAULT_USER)
+    assert summary['today'] == 15.0
+    assert summary['top_categories_today'] == [{'category': 'Transport', 'total': 15.0}]
+    assert summary['top_categories_all_time'][0] == {'category': 'Bills & Utilities', 'total': 5000.0}
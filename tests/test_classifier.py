@@ -0,0 +1,36 @@
+"""Learned categories: scoring a batch agrees with scoring items one at a time"""
+import pytest
+
+from resibo_classifier import CategoryClassifier, normalize, normalize_many
+
+CORRECTIONS = [
+    ('pandesal', 'Food & Dining'),
+    ('Jollibee Chickenjoy', 'Food & Dining'),
+    ('grab car to work', 'Transport'),
+    ('meralco bill', 'Bills & Utilities'),
+    ('école fees', 'Education'),
+]
+ITEMS = [
+    'pandesal', 'PANDESALS!', 'pandesal at bakery', 'grab-car', '  meralco   bill ', 'École',
+    'zzz', '', '!!', "kid's fees", 'a\x00b', 'tab\there', 'pandesal',
+]
+
+
+@pytest.fixture
+def classifier():
+    return CategoryClassifier().load(CORRECTIONS)
+
+
+def test_normalize_many_matches_normalize():
+    assert normalize_many(ITEMS) == [normalize(item) for item in ITEMS]
+
+
+def test_predict_many_matches_predict(classifier):
+    assert classifier.predict_many(ITEMS) == [classifier.predict(item) for item in ITEMS]
+    assert classifier.predict_many(ITEMS)[0] == ('Food & Dining', 1.0)
+    assert classifier.predict('zzz') == (None, 0.0)
+
+
+def test_forgotten_category_is_not_predicted(classifier):
+    classifier.forget('Food & Dining')
+    assert all(category != 'Food & Dining' for category, _ in classifier.predict_many(ITEMS))
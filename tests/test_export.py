@@ -0,0 +1,35 @@
+"""ExportReader: the streamed download gives the same file as export_chunks()"""
+import io
+
+import pytest
+
+from resibo_export import ExportReader, export_chunks
+from resibo_storage import SQLiteBackend
+
+
+@pytest.fixture
+def store(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / 'resibo.db'))
+    store = backend.store()
+    store.add_many([
+        {'amount': 15.0 + i, 'item': f'jeep {i}', 'category': 'Transport', 'timestamp': '2026-01-02 08:00:00'}
+        for i in range(25)
+    ])
+    yield store
+    backend.close()
+
+
+def test_reads_the_whole_export_a_chunk_at_a_time(store):
+    expected = b''.join(export_chunks(store, 'csv', chunk_rows=10))
+    reader = ExportReader(store, 'csv', chunk_rows=10)
+    parts = iter(lambda: reader.read(7), b'')
+    assert b''.join(parts) == expected
+
+
+def test_rewinding_starts_the_export_again(store):
+    reader = ExportReader(store)
+    reader.read(20)
+    assert reader.seek(0) == 0
+    assert reader.read() == b''.join(export_chunks(store))
+    with pytest.raises(io.UnsupportedOperation):
+        reader.seek(5)
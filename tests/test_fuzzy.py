@@ -0,0 +1,31 @@
+"""Typo matching: misspelt keywords are found, everyday words are left alone"""
+import pytest
+
+from resibo_parser import categorize_with_confidence
+
+
+@pytest.mark.parametrize('item', [
+    # One changed letter from a keyword
+    'paint', 'batch', 'barker', 'bun', 'pan', 'gum', 'pet',
+    # Two edits from a keyword
+    'diaper',
+    # A letter added to either end of a keyword
+    'tax', 'box', 'ice',
+])
+def test_everyday_words_stay_in_miscellaneous(item):
+    assert categorize_with_confidence(item) == ('Miscellaneous', 0.0)
+
+
+@pytest.mark.parametrize('item, category', [
+    ('jolibee', 'Food & Dining'),
+    ('kurente', 'Bills & Utilities'),
+    ('restaurnt', 'Food & Dining'),
+    ('medicne', 'Health & Wellness'),
+    ('electrcity', 'Bills & Utilities'),
+    ('grb', 'Transport'),
+    ('jep', 'Transport'),
+])
+def test_misspelt_keywords_are_matched(item, category):
+    found, confidence = categorize_with_confidence(item)
+    assert found == category
+    assert 0 < confidence < 1